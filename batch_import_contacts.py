@@ -1,34 +1,39 @@
 """
 Batch import 92K contacts from all_contacts.xlsx into RDS contacts table.
-Uses streaming Excel read + batch inserts of 500 rows to avoid memory/lag issues.
+Uses streaming Excel read + batch inserts (1000 rows to start, then sized by measured
+latency) to avoid memory/lag issues.
+
+Usage:
+    python batch_import_contacts.py                   # execute_values, commit per batch
+    python batch_import_contacts.py --copy            # COPY FROM STDIN per batch
+    python batch_import_contacts.py --copy --staging  # COPY into unlogged staging, then one INSERT ... SELECT
+    python batch_import_contacts.py --threaded        # parse on a background thread while batches are written
+    python batch_import_contacts.py --resume          # continue after the last committed batch of this file
+    python batch_import_contacts.py --batch-size 500  # fixed batches instead of adaptive sizing
 """
 
+import argparse
 import os
 import uuid
-import psycopg2
-from psycopg2.extras import execute_values
-from openpyxl import load_workbook
-from dotenv import load_dotenv
-
-load_dotenv()
-
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "port": os.getenv("DB_PORT", 5432),
-    "dbname": os.getenv("DB_NAME"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "sslmode": "require",
-}
+
+from import_pipeline import (
+    Checkpoint, CopySink, ExecuteValuesSink, add_batch_args, batch_controller, clean_text, connect, iter_excel_rows,
+    run_pipeline, write_log,
+)
 
 EXCEL_PATH = "./public/all_contacts.xlsx"
-BATCH_SIZE = 500
+REJECTED_LOG = os.path.expanduser("~/Desktop/batch_import_contacts_rejected.log")
+
+COLUMNS = [
+    "first_name", "last_name", "full_name", "phone", "email", "dob",
+    "address_line_1", "city", "state_county", "postal_code",
+    "source", "sales_signature_token",
+]
+STAGING_TABLE = "contacts_import_staging"
 
-INSERT_SQL = """
+INSERT_SQL = f"""
 INSERT INTO contacts
-    (first_name, last_name, full_name, phone, email, dob,
-     address_line_1, city, state_county, postal_code,
-     source, sales_signature_token)
+    ({", ".join(COLUMNS)})
 VALUES %s
 """
 
@@ -40,19 +45,9 @@ def parse_phone(val):
     return str(int(val)) if isinstance(val, (int, float)) else str(val).strip()
 
 
-def clean(val):
-    """Strip whitespace, convert 'nan'/empty to None."""
-    if val is None:
-        return None
-    s = str(val).strip()
-    if s.lower() in ("nan", "none", ""):
-        return None
-    return s
-
-
 def parse_dob(val):
     """Convert DD/MM/YYYY to YYYY-MM-DD for PostgreSQL."""
-    s = clean(val)
+    s = clean_text(val)
     if s is None:
         return None
     try:
@@ -69,16 +64,16 @@ def build_row(row_values):
     # Excel cols: [index, first_name, last_name, phone, email, dob, county, city, postcode, street_address]
     _, first_name, last_name, phone, email, dob, county, city, postcode, street_address = row_values
 
-    first_name = clean(first_name)
-    last_name = clean(last_name)
+    first_name = clean_text(first_name)
+    last_name = clean_text(last_name)
     full_name = " ".join(filter(None, [first_name, last_name])) or None
     phone = parse_phone(phone)
-    email = clean(email)
+    email = clean_text(email)
     dob_str = parse_dob(dob)
-    county = clean(county)
-    city = clean(city)
-    postcode = clean(postcode)
-    street_address = clean(street_address)
+    county = clean_text(county)
+    city = clean_text(city)
+    postcode = clean_text(postcode)
+    street_address = clean_text(street_address)
 
     return (
         first_name,
@@ -97,59 +92,49 @@ def build_row(row_values):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Bulk import contacts from Excel")
+    parser.add_argument("--copy", action="store_true", help="Load batches with COPY FROM STDIN")
+    parser.add_argument("--staging", action="store_true",
+                        help=f"With --copy, load into UNLOGGED {STAGING_TABLE} and INSERT ... SELECT at the end")
+    parser.add_argument("--threaded", action="store_true",
+                        help="Parse the next batches on a background thread while the current one is written")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip the rows of this file already committed by an earlier run")
+    add_batch_args(parser)
+    args = parser.parse_args()
+    if args.staging and not args.copy:
+        parser.error("--staging requires --copy")
+    if args.resume and args.staging:
+        parser.error("--resume can't be used with --staging (staged rows only land at the end)")
+
     print("Connecting to database...", flush=True)
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = connect(sslmode="require")
     conn.autocommit = False
-    cur = conn.cursor()
+
+    # Staged batches aren't in contacts until finish(), so there is nothing to resume
+    checkpoint = None if args.staging else Checkpoint(conn, "batch_import_contacts", EXCEL_PATH, resume=args.resume)
+    start = checkpoint.done() if checkpoint else 0
 
     print(f"Reading {EXCEL_PATH} in streaming mode...", flush=True)
-    wb = load_workbook(EXCEL_PATH, read_only=True)
-    ws = wb.active
-
-    batch = []
-    total_inserted = 0
-    errors = 0
-
-    rows = ws.iter_rows(min_row=2, values_only=True)  # skip header
-
-    for row_values in rows:
-        try:
-            record = build_row(row_values)
-            batch.append(record)
-        except Exception as e:
-            errors += 1
-            if errors <= 5:
-                print(f"  Skipping bad row: {e}", flush=True)
-            continue
-
-        if len(batch) >= BATCH_SIZE:
-            try:
-                execute_values(cur, INSERT_SQL, batch, page_size=BATCH_SIZE)
-                conn.commit()
-                total_inserted += len(batch)
-                print(f"  Inserted {total_inserted} rows...", flush=True)
-            except Exception as e:
-                conn.rollback()
-                print(f"  ERROR on batch at row ~{total_inserted}: {e}", flush=True)
-                errors += len(batch)
-            batch = []
-
-    # Insert remaining rows
-    if batch:
-        try:
-            execute_values(cur, INSERT_SQL, batch, page_size=BATCH_SIZE)
-            conn.commit()
-            total_inserted += len(batch)
-        except Exception as e:
-            conn.rollback()
-            print(f"  ERROR on final batch: {e}", flush=True)
-            errors += len(batch)
-
-    wb.close()
-    cur.close()
+    rows = iter_excel_rows(EXCEL_PATH, min_row=2 + start)  # skip header (and rows already imported)
+    batches = batch_controller(args, "contacts", cur=conn.cursor())
+    if args.copy:
+        sink = CopySink(conn, "contacts", COLUMNS, staging=STAGING_TABLE if args.staging else None)
+    else:
+        sink = ExecuteValuesSink(conn, INSERT_SQL, page_size=batches.maximum)  # one statement per batch
+
+    stats = run_pipeline(rows, build_row, sink, batch_size=batches, threaded=args.threaded,
+                         checkpoint=checkpoint, start=start)
     conn.close()
 
-    print(f"\nDone! Inserted: {total_inserted} | Errors: {errors}", flush=True)
+    # Rows isolated out of failed batches, with the database's reason
+    if stats.rejected:
+        write_log(REJECTED_LOG, "Batch Import Contacts - Rejected Rows",
+                  [f"{reason} | {dict(zip(COLUMNS, record))}" for record, reason in stats.rejected])
+        print(f"Rejected rows logged to {REJECTED_LOG}", flush=True)
+
+    print(f"\nDone! Inserted: {stats.written} | Errors: {stats.errors} | "
+          f"{stats.elapsed:.1f}s ({stats.rows_per_sec:,.0f} rows/sec, {stats.write_time:.1f}s writing)", flush=True)
 
 
 if __name__ == "__main__":
@@ -4,28 +4,37 @@ Copy contacts to leads table based on Excel Reference matching.
 
 - Match Excel Reference → contacts.reference
 - Copy: first_name, last_name, phone, email, dob, extra_lenders, ip_address, address, previous_addresses
-- Lender from Excel (merge multiple lenders for same person)
+- Lender from Excel (merge multiple lenders for same person; unions on the text[]
+  columns from migrations/import_008_lender_arrays.sql, which must be applied first)
 - extra_lender from contacts (already pushed from Excel)
 - Status = 'awaiting_call'
 - Dedupe: first_name + last_name + email + dob (merge lenders instead of skip)
+
+Usage:
+    python copy_contacts_to_leads.py
+    python copy_contacts_to_leads.py --ref-index   # look up only this file's references (contact_references)
+    python copy_contacts_to_leads.py --ref-cache   # resolve references from the local snapshot cache
+    python copy_contacts_to_leads.py --workers 4   # hash-partition rows by dedupe key across 4 processes
+    python copy_contacts_to_leads.py --full        # also reprocess rows unchanged since the last import
+    python copy_contacts_to_leads.py --batch-size 1000   # fixed write batches instead of adaptive sizing
+    python copy_contacts_to_leads.py --set-based   # stage the rows, one INSERT ... ON CONFLICT merges lenders in Postgres
+        # (needs migrations/import_007_leads_dedupe_key.sql applied; existing leads are not preloaded)
 """
 
-import pandas as pd
-import psycopg2
+import argparse
 import json
-from datetime import datetime
 import os
-from dotenv import load_dotenv
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-load_dotenv()
+from psycopg2.extras import execute_batch
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'),
-    'database': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'port': os.getenv('DB_PORT', 5432)
-}
+from import_pipeline import (
+    ExecuteValuesSink, ImportLedger, StatementSink, add_batch_args, add_ledger_args, add_reference_args,
+    batch_controller, clean_frame, connect, iter_frame_rows, load_reference_table, read_frame, reference_lookup,
+    require_columns, require_index, run_pipeline, stage_rows, timed, write_log,
+)
 
 EXCEL_FILE = './public/CONTACTED_NEW_FINAL_CLEANED (1).xlsx'
 LOG_FILE = os.path.expanduser('~/Desktop/copy_contacts_to_leads.log')
@@ -33,256 +42,233 @@ LOG_FILE = os.path.expanduser('~/Desktop/copy_contacts_to_leads.log')
 # TEST MODE: Set to None for all rows, or a number to limit
 TEST_LIMIT = None
 
+EXCEL_COLUMNS = ['Reference', 'Lender', 'EXTRA LENDER']
+EXCEL_DTYPES = {'Reference': str, 'Lender': 'category', 'EXTRA LENDER': 'category'}
+
+LEAD_STAGING_COLUMNS = [
+    ('row_no', 'INTEGER'),
+    ('reference', 'TEXT'),
+    ('contact_id', 'INTEGER'),
+    ('lender', 'TEXT'),
+    ('extra_lender', 'TEXT'),
+]
+
+# Must match the expressions of idx_leads_dedupe_key (import_007)
+LEAD_DEDUPE_KEY = """LOWER(COALESCE(first_name, '')), LOWER(COALESCE(last_name, '')),
+             LOWER(COALESCE(email, '')), COALESCE(dob, '-infinity'::date)"""
+
+CONTACT_COLUMNS = [
+    'first_name', 'last_name', 'phone', 'email', 'dob', 'extra_lenders', 'ip_address',
+    'address_line_1', 'city', 'state_county', 'postal_code', 'previous_addresses',
+]
+
+
+def lead_addresses(contact):
+    """Convert a contact's addresses to the leads format: (address, previous_addresses)"""
+    # Convert current address to leads format
+    current_addr = None
+    if contact['address_line_1']:
+        current_addr = {
+            'street': contact['address_line_1'] or '',
+            'city': contact['city'] or '',
+            'province': contact['state_county'] or '',  # county → province in leads
+            'postalCode': contact['postal_code'] or ''
+        }
 
-def clean_text(val):
-    if pd.isna(val) or str(val).strip() == '' or str(val).strip().lower() == 'nan':
-        return None
-    return str(val).strip()
-
-
-def clean_reference(val):
-    if pd.isna(val):
-        return None
-    ref_str = str(val).strip()
-    if ref_str.endswith('.0'):
-        ref_str = ref_str[:-2]
-    if ref_str == '' or ref_str.lower() == 'nan':
-        return None
-    return ref_str
-
-
-def merge_lenders(existing, new):
-    """Merge lenders, avoiding duplicates"""
-    if not existing:
-        return new if new else ''
-    if not new:
-        return existing
-
-    existing_set = set(l.strip() for l in existing.split(',') if l.strip())
-    new_clean = new.strip()
-
-    if new_clean and new_clean not in existing_set:
-        existing_set.add(new_clean)
-
-    return ','.join(sorted(existing_set))
-
-
-def merge_extra_lenders(existing, new):
-    """Merge extra lenders, avoiding duplicates, separated by newlines"""
-    if not existing:
-        return new if new else ''
-    if not new:
-        return existing
-
-    existing_set = set(l.strip() for l in existing.split('\n') if l.strip())
-    new_clean = new.strip()
-
-    if new_clean and new_clean not in existing_set:
-        existing_set.add(new_clean)
-
-    return '\n'.join(sorted(existing_set))
-
-
-def main():
-    print("=" * 60)
-    print("COPY CONTACTS TO LEADS (MERGE LENDERS)")
-    print("=" * 60)
-
-    # Read Excel
-    print("\n[1] Reading Excel file...", flush=True)
-    df = pd.read_excel(EXCEL_FILE)
-    df.columns = df.columns.str.strip()
-    df = df[df['Reference'].notna()]
-    print(f"    Rows with data: {len(df)}", flush=True)
-
-    if TEST_LIMIT:
-        df = df.head(TEST_LIMIT)
-        print(f"    TEST MODE: Limited to first {TEST_LIMIT} rows", flush=True)
-
-    total_rows = len(df)
-    print(f"    Total rows to process: {total_rows}", flush=True)
-
-    # Connect to DB
-    print("\n[2] Connecting to database...", flush=True)
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    print("    Connected!", flush=True)
-
-    # Build reference -> contact lookup
-    print("\n[3] Loading contacts...", flush=True)
-    cur.execute("""
-        SELECT id, reference, first_name, last_name, phone, email, dob,
-               extra_lenders, ip_address, address_line_1, city, state_county, postal_code,
-               previous_addresses
-        FROM contacts
-        WHERE reference IS NOT NULL AND reference != ''
-    """)
-    contacts_data = cur.fetchall()
-
-    ref_to_contact = {}
-    for row in contacts_data:
-        (cid, reference, first_name, last_name, phone, email, dob,
-         extra_lenders, ip_address, addr1, city, county, postal, prev_addr) = row
-
-        refs = [r.strip() for r in reference.split(',') if r.strip()]
-
-        # Convert current address to leads format
-        current_addr = None
-        if addr1:
-            current_addr = {
-                'street': addr1 or '',
-                'city': city or '',
-                'province': county or '',  # county → province in leads
-                'postalCode': postal or ''
-            }
-
-        # Convert previous_addresses from contacts format to leads format
-        converted_prev = []
-        if prev_addr and isinstance(prev_addr, list):
-            for pa in prev_addr:
-                converted_prev.append({
-                    'street': pa.get('address_line_1', '') or '',
-                    'city': pa.get('city', '') or '',
-                    'province': pa.get('county', '') or '',  # county → province
-                    'postalCode': pa.get('postal_code', '') or ''
-                })
-
-        for ref in refs:
-            ref_to_contact[ref] = {
-                'id': cid,
-                'first_name': first_name,
-                'last_name': last_name,
-                'phone': phone,
-                'email': email,
-                'dob': dob,
-                'extra_lenders': extra_lenders,
-                'ip_address': ip_address,
-                'address': current_addr,
-                'previous_addresses': converted_prev
-            }
-
-    print(f"    Loaded {len(ref_to_contact)} reference mappings", flush=True)
-
-    # Load existing leads for dedupe check (with their IDs for updating)
-    print("\n[4] Loading existing leads...", flush=True)
-    cur.execute("""
-        SELECT id, LOWER(COALESCE(first_name, '')), LOWER(COALESCE(last_name, '')),
-               LOWER(COALESCE(email, '')), dob, lender
-        FROM leads
-    """)
-    existing_leads = {}  # dedupe_key -> {id, lender, extra_lender}
+    # Convert previous_addresses from contacts format to leads format
+    converted_prev = []
+    prev_addr = contact['previous_addresses']
+    if prev_addr and isinstance(prev_addr, list):
+        for pa in prev_addr:
+            converted_prev.append({
+                'street': pa.get('address_line_1', '') or '',
+                'city': pa.get('city', '') or '',
+                'province': pa.get('county', '') or '',  # county → province
+                'postalCode': pa.get('postal_code', '') or ''
+            })
+
+    return current_addr, converted_prev
+
+
+def lender_set(value, sep=','):
+    """Lenders in a delimited string (or a list, e.g. a text[] column) as a set"""
+    if not value:
+        return set()
+    if isinstance(value, str):
+        value = value.split(sep)
+    return {l.strip() for l in value if l and l.strip()}
+
+
+def join_lenders(lenders, sep=','):
+    """The stored form of a lender set: sorted, joined by sep (',' lender, '\\n' extra_lender)"""
+    return sep.join(sorted(lenders))
+
+
+def dedupe_key(contact):
+    """(first_name, last_name, email, dob) as compared against existing leads"""
+    fn = (contact['first_name'] or '').lower()
+    ln = (contact['last_name'] or '').lower()
+    em = (contact['email'] or '').lower()
+    dob_str = str(contact['dob']) if contact['dob'] else ''
+    return (fn, ln, em, dob_str)
+
+
+def partition_of(key, workers):
+    """Stable partition number for a dedupe key (the same in every process)"""
+    return zlib.crc32('\x1f'.join(key).encode('utf-8')) % workers
+
+
+def load_existing_leads(cur, keys=None):
+    """
+    dedupe_key -> {id, lender, extra_lender} for existing leads, the lenders as
+    sets read from the text[] columns (migrations/import_008_lender_arrays.sql).
+
+    With keys, only leads whose name/email match one of them are fetched
+    (a worker's slice); otherwise all leads.
+    """
+    select = """
+        SELECT l.id, LOWER(COALESCE(l.first_name, '')), LOWER(COALESCE(l.last_name, '')),
+               LOWER(COALESCE(l.email, '')), l.dob, l.lender_list, l.extra_lender_list
+        FROM leads l
+    """
+    if keys is None:
+        cur.execute(select)
+    else:
+        names = sorted({key[:3] for key in keys})
+        cur.execute(select + """
+        JOIN (SELECT DISTINCT * FROM unnest(%s::text[], %s::text[], %s::text[])) AS k(fn, ln, em)
+          ON LOWER(COALESCE(l.first_name, '')) = k.fn
+         AND LOWER(COALESCE(l.last_name, '')) = k.ln
+         AND LOWER(COALESCE(l.email, '')) = k.em
+        """, ([n[0] for n in names], [n[1] for n in names], [n[2] for n in names]))
+
+    existing_leads = {}
     for row in cur.fetchall():
-        lead_id, fn, ln, em, dob, lender = row
+        lead_id, fn, ln, em, dob, lenders, extra_lenders = row
         dob_str = str(dob) if dob else ''
         dedupe_key = (fn, ln, em, dob_str)
-        existing_leads[dedupe_key] = {'id': lead_id, 'lender': lender or '', 'extra_lender': ''}
-    print(f"    Found {len(existing_leads)} existing leads", flush=True)
+        existing_leads[dedupe_key] = {'id': lead_id, 'lender': set(lenders or ()), 'extra_lender': set(extra_lenders or ())}
+    return existing_leads
+
 
-    # Process rows - collect all data first
-    print("\n[5] Processing rows...", flush=True)
+def plan_leads(rows, existing_leads):
+    """
+    Merge matched Excel rows into new leads / updates of existing leads.
 
+    rows are (idx, reference, lender, excel_extra_lender, contact) with contact
+    indexable by CONTACT_COLUMNS. Returns a dict with new_leads, leads_to_update,
+    the counters and log lines. Lenders are merged as sets and only joined into
+    strings on write, so a person with many rows costs one set union per row.
+    """
     # Track new leads to insert (dedupe_key -> lead data)
     new_leads = {}
-    # Track existing leads to update (lead_id -> new merged lender)
+    # Track existing leads to update (lead_id -> lenders to add)
     leads_to_update = {}
 
     matched = 0
-    not_found = 0
     merged_new = 0  # Merged within new batch
     merged_existing = 0  # Merged with existing DB leads
     logs = []
 
-    for idx, row in df.iterrows():
-        reference = clean_reference(row.get('Reference'))
-        lender = clean_text(row.get('Lender'))
-        excel_extra_lender = clean_text(row.get('EXTRA LENDER'))
-
-        if not reference:
-            logs.append(f"[SKIP] Row {idx}: No reference")
-            continue
-
-        if reference not in ref_to_contact:
-            logs.append(f"[NOT_FOUND] Row {idx}: Reference {reference}")
-            not_found += 1
-            continue
-
-        contact = ref_to_contact[reference]
-
-        # Build dedupe key
-        fn = (contact['first_name'] or '').lower()
-        ln = (contact['last_name'] or '').lower()
-        em = (contact['email'] or '').lower()
-        dob_str = str(contact['dob']) if contact['dob'] else ''
-        dedupe_key = (fn, ln, em, dob_str)
+    for idx, reference, lender, excel_extra_lender, contact in rows:
+        key = dedupe_key(contact)
 
+        lenders = lender_set(lender)
         # Combine extra lenders from contacts DB + Excel
-        combined_extra = merge_extra_lenders(contact['extra_lenders'] or '', excel_extra_lender or '')
+        combined_extra = lender_set(contact['extra_lenders'], '\n') | lender_set(excel_extra_lender, '\n')
 
         # Check if already exists in DB
-        if dedupe_key in existing_leads:
-            existing = existing_leads[dedupe_key]
-            lead_id = existing['id']
-
-            # Merge lender
-            new_lender = merge_lenders(existing['lender'], lender)
-            # Merge extra lender
-            new_extra = merge_extra_lenders(existing['extra_lender'], combined_extra)
-
-            changed = False
-            if new_lender != existing['lender']:
-                existing_leads[dedupe_key]['lender'] = new_lender
-                changed = True
-            if new_extra != existing['extra_lender']:
-                existing_leads[dedupe_key]['extra_lender'] = new_extra
-                changed = True
-
-            if changed:
-                leads_to_update[lead_id] = {'lender': new_lender, 'extra_lender': new_extra}
+        if key in existing_leads:
+            existing = existing_leads[key]
+
+            # Only lenders the lead doesn't have yet
+            new_lenders = lenders - existing['lender']
+            new_extra = combined_extra - existing['extra_lender']
+
+            if new_lenders or new_extra:
+                existing['lender'] |= new_lenders
+                existing['extra_lender'] |= new_extra
+                additions = leads_to_update.setdefault(existing['id'], {'lender': set(), 'extra_lender': set()})
+                additions['lender'] |= new_lenders
+                additions['extra_lender'] |= new_extra
                 logs.append(f"[MERGE_EXISTING] Row {idx}: {contact['first_name']} {contact['last_name']} + {lender}")
                 merged_existing += 1
             continue
 
         # Check if already in our new batch
-        if dedupe_key in new_leads:
-            # Merge lender with existing in batch
-            new_leads[dedupe_key]['lender'] = merge_lenders(new_leads[dedupe_key]['lender'], lender)
-            # Merge extra lender with existing in batch
-            new_leads[dedupe_key]['extra_lender'] = merge_extra_lenders(new_leads[dedupe_key]['extra_lender'], combined_extra)
+        if key in new_leads:
+            # Merge lenders with existing in batch
+            new_leads[key]['lender'] |= lenders
+            new_leads[key]['extra_lender'] |= combined_extra
             logs.append(f"[MERGE_NEW] Row {idx}: {contact['first_name']} {contact['last_name']} + {lender}")
             merged_new += 1
             continue
 
         # New lead - add to batch
         matched += 1
-        new_leads[dedupe_key] = {
+        address, previous_addresses = lead_addresses(contact)
+        new_leads[key] = {
             'reference': reference,
             'first_name': contact['first_name'],
             'last_name': contact['last_name'],
             'phone': contact['phone'],
             'email': contact['email'],
             'dob': contact['dob'],
-            'lender': lender or '',
+            'lender': lenders,
             'extra_lender': combined_extra,
             'ip_address': contact['ip_address'],
-            'address': contact['address'],
-            'previous_addresses': contact['previous_addresses'],
+            'address': address,
+            'previous_addresses': previous_addresses,
             'status': 'awaiting_call'
         }
 
-        logs.append(f"[ADD] Row {idx}: {contact['first_name']} {contact['last_name']} - Lender: {lender} - Extra: {combined_extra}")
+        logs.append(f"[ADD] Row {idx}: {contact['first_name']} {contact['last_name']} - Lender: {lender} - Extra: {join_lenders(combined_extra, ', ')}")
 
-    print(f"\n    Processed: {total_rows}", flush=True)
-    print(f"    New leads: {matched}", flush=True)
-    print(f"    Merged (new batch): {merged_new}", flush=True)
-    print(f"    Merged (existing): {merged_existing}", flush=True)
-    print(f"    Not Found: {not_found}", flush=True)
+    return {
+        'new_leads': new_leads,
+        'leads_to_update': leads_to_update,
+        'matched': matched,
+        'merged_new': merged_new,
+        'merged_existing': merged_existing,
+        'logs': logs,
+    }
+
+
+INSERT_LEADS_SQL = """
+    INSERT INTO leads (reference, first_name, last_name, phone, email, dob, lender,
+                       extra_lender, ip_address, address, previous_addresses, status)
+    VALUES %s
+"""
+
+# Union with what the lead has now, in Postgres (text[] columns from import_008)
+UPDATE_LEADS_SQL = """
+    UPDATE leads
+    SET lender = array_to_string(lender_union(lender_list, %s::text[]), ','),
+        extra_lender = array_to_string(lender_union(extra_lender_list, %s::text[]), E'\\n'),
+        updated_at = NOW()
+    WHERE id = %s
+"""
+
+
+def update_lead_pages(cur, page):
+    execute_batch(cur, UPDATE_LEADS_SQL, page, page_size=len(page))
+
+
+def write_leads(conn, new_leads, leads_to_update, args=None):
+    """
+    Insert new leads and apply merged lenders to existing ones.
+
+    Each step goes through run_pipeline: batches sized by a BatchController
+    (pinned by args.batch_size when given), committed one by one, with a failing
+    batch bisected so only its bad leads are lost. Returns log lines for those.
+    """
+    cur = conn.cursor()
+    logs = []
 
     # Insert new leads
     if new_leads:
         print(f"\n[6] Inserting {len(new_leads)} leads...", flush=True)
 
-        from psycopg2.extras import execute_batch
-
         insert_data = []
         for lead in new_leads.values():
             insert_data.append((
@@ -292,56 +278,290 @@ def main():
                 lead['phone'],
                 lead['email'],
                 lead['dob'],
-                lead['lender'],
-                lead['extra_lender'],
+                join_lenders(lead['lender']),
+                join_lenders(lead['extra_lender'], '\n'),
                 lead['ip_address'],
                 json.dumps(lead['address']) if lead['address'] else None,
                 json.dumps(lead['previous_addresses']) if lead['previous_addresses'] else '[]',
                 lead['status']
             ))
 
-        execute_batch(cur, """
-            INSERT INTO leads (reference, first_name, last_name, phone, email, dob, lender,
-                               extra_lender, ip_address, address, previous_addresses, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, insert_data, page_size=1000)
-
-        conn.commit()
-        print(f"    Inserted {len(new_leads)} leads!", flush=True)
+        batches = batch_controller(args, 'lead inserts', cur=cur)
+        sink = ExecuteValuesSink(conn, INSERT_LEADS_SQL, page_size=batches.maximum)  # one statement per batch
+        stats = run_pipeline(insert_data, None, sink, batch_size=batches)
+        for lead, error in stats.rejected:
+            logs.append(f"[INSERT_FAILED] Reference {lead[0]}: {lead[1]} {lead[2]} - {error}")
+        print(f"    Inserted {stats.written} leads!", flush=True)
 
     # Update existing leads with merged lenders
     if leads_to_update:
         print(f"\n[7] Updating {len(leads_to_update)} existing leads with merged lenders...", flush=True)
 
-        from psycopg2.extras import execute_batch
+        update_data = [(sorted(data['lender']), sorted(data['extra_lender']), lead_id)
+                       for lead_id, data in leads_to_update.items()]
 
-        update_data = [(data['lender'], data['extra_lender'], lead_id) for lead_id, data in leads_to_update.items()]
+        batches = batch_controller(args, 'lead updates', cur=cur)
+        stats = run_pipeline(update_data, None, StatementSink(conn, update_lead_pages), batch_size=batches,
+                             verb='Updated')
+        for (_, _, lead_id), error in stats.rejected:
+            logs.append(f"[UPDATE_FAILED] Lead {lead_id}: {error}")
+        print(f"    Updated {stats.written} leads!", flush=True)
 
-        execute_batch(cur, """
-            UPDATE leads SET lender = %s, extra_lender = %s, updated_at = NOW() WHERE id = %s
-        """, update_data, page_size=1000)
+    cur.close()
+    return logs
 
-        conn.commit()
-        print(f"    Updated {len(leads_to_update)} leads!", flush=True)
 
-    # Write log
-    print(f"\n[8] Writing log...", flush=True)
-    with open(LOG_FILE, 'w') as f:
-        f.write(f"Copy Contacts to Leads Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 80 + "\n")
-        f.write(f"Total rows: {total_rows}\n")
-        f.write(f"New leads inserted: {len(new_leads)}\n")
-        f.write(f"Merged within batch: {merged_new}\n")
-        f.write(f"Merged with existing: {merged_existing}\n")
-        f.write(f"Reference not found: {not_found}\n")
-        f.write("=" * 80 + "\n\n")
-        for log in logs:
-            f.write(log + "\n")
-    print(f"    Log: {LOG_FILE}", flush=True)
+def upsert_leads(conn, rows):
+    """
+    Set-based version of plan_leads + write_leads.
 
+    rows are (idx, reference, lender, excel_extra_lender, contact) with only
+    contact['id'] used: the rows are staged, joined to contacts, grouped by the
+    dedupe key (first row per person supplies the lead, lenders are merged across
+    all of them) and applied with one INSERT ... ON CONFLICT on idx_leads_dedupe_key
+    that merges lenders into existing leads server-side. Existing leads are
+    never loaded. Returns the same counters as plan_leads.
+    """
+    cur = conn.cursor()
+    with timed("Stage rows"):
+        stage_rows(cur, 'lead_rows', LEAD_STAGING_COLUMNS,
+                   [(idx, reference, contact['id'], lender, extra) for idx, reference, lender, extra, contact in rows])
+
+    # Rows folded into another row's lead
+    cur.execute(f"""
+        SELECT COUNT(*) - COUNT(DISTINCT ({LEAD_DEDUPE_KEY}))
+        FROM lead_rows s JOIN contacts c ON c.id = s.contact_id
+    """)
+    merged_new = cur.fetchone()[0]
+
+    with timed("Upsert leads"):
+        cur.execute(f"""
+            WITH src AS (
+                SELECT s.row_no, s.reference, s.lender,
+                       array_to_string(lender_union(c.extra_lender_list, lender_array(s.extra_lender, E'\\n')),
+                                       E'\\n') AS extra_lender,
+                       c.first_name, c.last_name, c.phone, c.email, c.dob, c.ip_address,
+                       c.address_line_1, c.city, c.state_county, c.postal_code, c.previous_addresses,
+                       LOWER(COALESCE(c.first_name, '')) AS fn, LOWER(COALESCE(c.last_name, '')) AS ln,
+                       LOWER(COALESCE(c.email, '')) AS em, COALESCE(c.dob, '-infinity'::date) AS db
+                FROM lead_rows s
+                JOIN contacts c ON c.id = s.contact_id
+            ),
+            people AS (
+                SELECT DISTINCT ON (fn, ln, em, db) *
+                FROM src
+                ORDER BY fn, ln, em, db, row_no
+            ),
+            merged AS (
+                SELECT fn, ln, em, db,
+                       merge_lender_list(NULL, string_agg(lender, ','), ',') AS lender,
+                       merge_lender_list(NULL, string_agg(extra_lender, E'\\n'), E'\\n') AS extra_lender
+                FROM src
+                GROUP BY fn, ln, em, db
+            )
+            INSERT INTO leads (reference, first_name, last_name, phone, email, dob, lender,
+                               extra_lender, ip_address, address, previous_addresses, status)
+            SELECT p.reference, p.first_name, p.last_name, p.phone, p.email, p.dob, m.lender,
+                   m.extra_lender, p.ip_address,
+                   lead_address(p.address_line_1, p.city, p.state_county, p.postal_code),
+                   lead_previous_addresses(p.previous_addresses), 'awaiting_call'
+            FROM people p
+            JOIN merged m USING (fn, ln, em, db)
+            ON CONFLICT ({LEAD_DEDUPE_KEY}) DO UPDATE
+            SET lender = array_to_string(lender_union(leads.lender_list, lender_array(EXCLUDED.lender, ',')), ','),
+                extra_lender = array_to_string(
+                    lender_union(leads.extra_lender_list, lender_array(EXCLUDED.extra_lender, E'\\n')), E'\\n'),
+                updated_at = NOW()
+            -- Only leads that gain a lender
+            WHERE NOT (leads.lender_list @> lender_array(EXCLUDED.lender, ',')
+                       AND leads.extra_lender_list @> lender_array(EXCLUDED.extra_lender, E'\\n'))
+            RETURNING id, first_name, last_name, lender, extra_lender, (xmax = 0) AS inserted
+        """)
+        result = cur.fetchall()
+    conn.commit()
     cur.close()
+
+    logs = []
+    inserted = updated = 0
+    for lead_id, first_name, last_name, lender, extra_lender, was_inserted in result:
+        if was_inserted:
+            inserted += 1
+            logs.append(f"[ADD] Lead {lead_id}: {first_name} {last_name} - Lender: {lender} - Extra: {extra_lender}")
+        else:
+            updated += 1
+            logs.append(f"[MERGE_EXISTING] Lead {lead_id}: {first_name} {last_name} -> {lender}")
+
+    return {
+        'new_leads': inserted,
+        'leads_to_update': updated,
+        'matched': inserted,
+        'merged_new': merged_new,
+        'merged_existing': updated,
+        'logs': logs,
+    }
+
+
+def run_partition(rows, args=None):
+    """
+    Worker: plan and write one partition with its own connection.
+
+    Every row of a person (dedupe key) is in the same partition, so only this
+    partition's existing leads are needed and lender merging stays correct.
+    """
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        existing_leads = load_existing_leads(cur, {dedupe_key(contact) for *_, contact in rows})
+        cur.close()
+        plan = plan_leads(rows, existing_leads)
+        plan['failed'] = write_leads(conn, plan['new_leads'], plan['leads_to_update'], args)
+    finally:
+        conn.close()
+
+    # Only counts and logs go back to the parent
+    plan['new_leads'] = len(plan['new_leads'])
+    plan['leads_to_update'] = len(plan['leads_to_update'])
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy contacts to leads by Excel reference")
+    add_reference_args(parser)
+    add_ledger_args(parser)
+    add_batch_args(parser)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Hash-partition rows by dedupe key across N processes, each with its own connection")
+    parser.add_argument('--set-based', action='store_true',
+                        help="Create and merge leads with one INSERT ... ON CONFLICT instead of preloading leads")
+    args = parser.parse_args()
+    if args.set_based and args.workers > 1:
+        parser.error("--set-based already runs as a single statement; drop --workers")
+
+    print("=" * 60)
+    print("COPY CONTACTS TO LEADS (MERGE LENDERS)")
+    print("=" * 60)
+
+    # Read Excel
+    df = read_frame(EXCEL_FILE, limit=TEST_LIMIT, required='Reference', strip_columns=True,
+                    columns=EXCEL_COLUMNS, dtype=EXCEL_DTYPES)
+    df = clean_frame(df, text=['Lender', 'EXTRA LENDER'], numbers=['Reference'])
+    total_rows = len(df)
+
+    # Connect to DB
+    print("\n[2] Connecting to database...", flush=True)
+    conn = connect()
+    cur = conn.cursor()
+    print("    Connected!", flush=True)
+    # import_007 and import_008 build indexes and rewrite tables, so they are applied out of band
+    if args.set_based:
+        require_index(cur, 'idx_leads_dedupe_key', 'import_007_leads_dedupe_key')
+    require_columns(cur, 'leads', ['lender_list', 'extra_lender_list'], 'import_008_lender_arrays')
+    require_columns(cur, 'contacts', ['extra_lender_list'], 'import_008_lender_arrays')
+
+    # Skip references whose rows are unchanged since the last import
+    ledger = ImportLedger(conn, 'copy_contacts_to_leads', enabled=not args.full)
+    df = ledger.changed_rows(df, 'Reference', EXCEL_COLUMNS)
+
+    # Build reference -> contact lookup
+    print("\n[3] Loading contacts...", flush=True)
+    # Stored column-wise; addresses are converted only for references that become new leads.
+    # Set-based mode reads contact columns in Postgres, so only ids are needed here.
+    columns = [] if args.set_based else CONTACT_COLUMNS
+    with reference_lookup(args, df) as lookup:
+        ref_to_contact = load_reference_table(cur, columns, **lookup)
+
+    # Match rows to contacts
+    rows = []
+    not_found = 0
+    logs = []
+    for idx, row in iter_frame_rows(df):
+        reference = row.get('Reference')
+
+        if not reference:
+            logs.append(f"[SKIP] Row {idx}: No reference")
+            continue
+
+        contact = ref_to_contact.get(reference)
+        if contact is None:
+            logs.append(f"[NOT_FOUND] Row {idx}: Reference {reference}")
+            not_found += 1
+            continue
+
+        rows.append((idx, reference, row.get('Lender'), row.get('EXTRA LENDER'), contact))
+
+    if args.set_based:
+        cur.close()
+
+        print(f"\n[4] Upserting leads for {len(rows)} matched rows...", flush=True)
+        plan = upsert_leads(conn, rows)
+        plans = [plan]
+        new_count = plan['new_leads']
+        update_count = plan['leads_to_update']
+    elif args.workers > 1:
+        # Workers get plain dicts (a ContactRow would pickle the whole table)
+        partitions = [[] for _ in range(args.workers)]
+        for idx, reference, lender, extra, contact in rows:
+            contact = {column: contact[column] for column in CONTACT_COLUMNS}
+            partitions[partition_of(dedupe_key(contact), args.workers)].append(
+                (idx, reference, lender, extra, contact))
+        cur.close()
+
+        # Workers open their own connections; conn stays unused until the ledger update
+        print(f"\n[4] Processing {len(rows)} matched rows in {args.workers} workers...", flush=True)
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            plans = list(pool.map(partial(run_partition, args=args), [p for p in partitions if p]))
+        new_count = sum(p['new_leads'] for p in plans)
+        update_count = sum(p['leads_to_update'] for p in plans)
+    else:
+        # Load existing leads for dedupe check (with their IDs for updating)
+        print("\n[4] Loading existing leads...", flush=True)
+        existing_leads = load_existing_leads(cur)
+        print(f"    Found {len(existing_leads)} existing leads", flush=True)
+        cur.close()
+
+        # Process rows - collect all data first
+        print("\n[5] Processing rows...", flush=True)
+        plan = plan_leads(rows, existing_leads)
+        plan['failed'] = write_leads(conn, plan['new_leads'], plan['leads_to_update'], args)
+        plans = [plan]
+        new_count = len(plan['new_leads'])
+        update_count = len(plan['leads_to_update'])
+
+    # Every matched row is now reflected in leads, unless a write failed: a lead
+    # merges several rows, so then none are recorded and the next run retries them
+    failed = [line for p in plans for line in p.get('failed', ())]
+    if not failed:
+        ledger.record(reference for _, reference, *_ in rows)
     conn.close()
 
+    matched = sum(p['matched'] for p in plans)
+    merged_new = sum(p['merged_new'] for p in plans)
+    merged_existing = sum(p['merged_existing'] for p in plans)
+    for p in plans:
+        logs.extend(p['logs'])
+    logs.extend(failed)
+
+    print(f"\n    Processed: {total_rows}", flush=True)
+    print(f"    New leads: {matched}", flush=True)
+    print(f"    Merged (new batch): {merged_new}", flush=True)
+    print(f"    Merged (existing): {merged_existing}", flush=True)
+    print(f"    Not Found: {not_found}", flush=True)
+    print(f"    Leads inserted: {new_count}, updated: {update_count}", flush=True)
+    if failed:
+        print(f"    Failed writes: {len(failed)} (see log; rows not recorded in the ledger)", flush=True)
+
+    # Write log
+    print(f"\n[8] Writing log...", flush=True)
+    write_log(LOG_FILE, "Copy Contacts to Leads Log", logs, {
+        'Total rows': total_rows,
+        'New leads inserted': new_count,
+        'Merged within batch': merged_new,
+        'Merged with existing': merged_existing,
+        'Reference not found': not_found,
+        'Unchanged (skipped)': ledger.skipped,
+    })
+    print(f"    Log: {LOG_FILE}", flush=True)
+
     print("\n" + "=" * 60)
     print("DONE!")
     print("=" * 60)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Find likely duplicate people among contacts (or leads).
+
+The importers only dedupe exact (first, last, email, dob) matches, so a typo in
+a name or email makes a second lead. This compares people within blocks
+(postcode, dob, email domain, phonetic surname, email, phone) over a sorted
+neighbourhood window (import_pipeline/duplicates.py) and writes the candidate
+clusters with their scores for review. Nothing in the database is changed.
+
+Usage:
+    python find_duplicate_contacts.py                   # contacts → ~/Desktop/duplicate_contacts.csv
+    python find_duplicate_contacts.py --leads           # leads instead → ~/Desktop/duplicate_leads.csv
+    python find_duplicate_contacts.py --threshold 0.9   # stricter match score (0-1, default 0.85)
+    python find_duplicate_contacts.py --window 20       # compare with more neighbours per block
+"""
+
+import argparse
+import os
+
+from import_pipeline import PERSON_COLUMNS, connect, find_duplicates, read_copy_frame, timed
+
+SOURCES = {
+    'contacts': "SELECT id, first_name, last_name, email, phone, dob, postal_code FROM contacts",
+    'leads': "SELECT id, first_name, last_name, email, phone, dob, address::jsonb->>'postalCode' FROM leads",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find likely duplicate contacts or leads")
+    parser.add_argument('--leads', action='store_true', help="Check leads instead of contacts")
+    parser.add_argument('--threshold', type=float, default=0.85,
+                        help="Minimum pair score (0-1) for two records to be clustered")
+    parser.add_argument('--window', type=int, default=10,
+                        help="Records compared with each record within a sorted block")
+    args = parser.parse_args()
+    source = 'leads' if args.leads else 'contacts'
+    clusters_file = os.path.expanduser(f'~/Desktop/duplicate_{source}.csv')
+    pairs_file = os.path.expanduser(f'~/Desktop/duplicate_{source}_pairs.csv')
+
+    print("=" * 60)
+    print(f"FIND DUPLICATE {source.upper()}")
+    print("=" * 60)
+
+    print("\n[1] Connecting to database...", flush=True)
+    conn = connect()
+    cur = conn.cursor()
+
+    print(f"\n[2] Loading {source}...", flush=True)
+    with timed(f"Load {source}"):
+        df = read_copy_frame(cur, SOURCES[source], PERSON_COLUMNS)
+    conn.rollback()
+    cur.close()
+    conn.close()
+    print(f"    {len(df)} {source}", flush=True)
+
+    print(f"\n[3] Comparing (window {args.window}, threshold {args.threshold})...", flush=True)
+    with timed("Find duplicates"):
+        clusters, pairs = find_duplicates(df, window=args.window, threshold=args.threshold)
+    cluster_count = clusters['cluster'].nunique()
+    print(f"    {cluster_count} candidate clusters covering {len(clusters)} {source}", flush=True)
+
+    print("\n[4] Writing results...", flush=True)
+    clusters.to_csv(clusters_file, index=False)
+    pairs.to_csv(pairs_file, index=False)
+    print(f"    Clusters: {clusters_file}", flush=True)
+    print(f"    Pairs: {pairs_file}", flush=True)
+
+    print("\n" + "=" * 60)
+    print("DONE!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,26 +3,35 @@
 Import previous addresses from Addresses_Parsed.xlsx.
 
 Matches by Reference → finds contact → pushes previous_addresses JSONB (no duplicates).
+
+Usage:
+    python import_addresses_from_excel.py          # one UPDATE per contact, commit per adaptive batch
+    python import_addresses_from_excel.py --bulk   # stage all updates, apply with one UPDATE ... FROM
+                                                   # (--batch-size N: one per N contacts)
+    python import_addresses_from_excel.py --server-merge
+        # like --bulk, but only new addresses are sent and Postgres merges them
+        # (migrations/import_004_canonical_address_key.sql)
+    python import_addresses_from_excel.py --ref-index
+        # look up only this file's references via contact_references
+        # (migrations/import_003_contact_references.sql, sync_contact_references.py)
+    python import_addresses_from_excel.py --ref-cache
+        # resolve references from the local incremental snapshot (~/.cache/crm_import)
+    python import_addresses_from_excel.py --full
+        # also reprocess rows unchanged since the last import (import_row_hashes ledger)
+    python import_addresses_from_excel.py --batch-size 100
+        # commit every 100 updates instead of adapting the batch size to measured latency
 """
 
-import pandas as pd
-import psycopg2
+import argparse
 import json
-from datetime import datetime
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from functools import partial
 
-# Database connection
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'),
-    'database': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'port': os.getenv('DB_PORT', 5432)
-}
+from import_pipeline import (
+    ROW_STATEMENTS, ImportLedger, StatementSink, add_batch_args, add_ledger_args, add_reference_args, address_columns,
+    addresses_by_row, batch_controller, clean_frame, connect, iter_frame_rows, load_reference_map, merge_addresses,
+    read_frame, reference_lookup, require_functions, run_pipeline, stage_rows, timed, write_log,
+)
 
 # File path
 EXCEL_FILE = './public/Addresses_Parsed.xlsx'
@@ -31,71 +40,152 @@ LOG_FILE = os.path.expanduser('~/Desktop/import_addresses.log')
 # TEST MODE: Set to None for all rows, or a number to limit
 TEST_LIMIT = 5
 
+ADDRESS_COLUMNS = address_columns('Address', 11)
+EXCEL_COLUMNS = ['Reference', *ADDRESS_COLUMNS]
+
+STAGING_COLUMNS = [
+    ('contact_id', 'INTEGER'),
+    ('previous_addresses', 'JSONB'),
+    ('address_line_1', 'TEXT'),
+    ('city', 'TEXT'),
+    ('county', 'TEXT'),
+    ('postal_code', 'TEXT'),
+]
+
+
+def update_contact_rows(cur, contacts):
+    """One UPDATE per (contact_id, addresses)"""
+    for contact_id, addresses in contacts:
+        # Get first address for individual columns (if not already set)
+        first_addr = addresses[0] if addresses else None
+
+        if first_addr:
+            cur.execute("""
+                UPDATE contacts
+                SET previous_addresses = %s,
+                    previous_address_line_1 = COALESCE(previous_address_line_1, %s),
+                    previous_city = COALESCE(previous_city, %s),
+                    previous_county = COALESCE(previous_county, %s),
+                    previous_postal_code = COALESCE(previous_postal_code, %s)
+                WHERE id = %s
+            """, [
+                json.dumps(addresses),
+                first_addr['address_line_1'],
+                first_addr['city'],
+                first_addr['county'],
+                first_addr['postal_code'],
+                contact_id
+            ])
+        else:
+            cur.execute("""
+                UPDATE contacts
+                SET previous_addresses = %s
+                WHERE id = %s
+            """, [json.dumps(addresses), contact_id])
+
+
+BULK_UPDATE_SQL = """
+    UPDATE contacts c
+    SET previous_addresses = s.previous_addresses,
+        previous_address_line_1 = COALESCE(c.previous_address_line_1, s.address_line_1),
+        previous_city = COALESCE(c.previous_city, s.city),
+        previous_county = COALESCE(c.previous_county, s.county),
+        previous_postal_code = COALESCE(c.previous_postal_code, s.postal_code)
+    FROM address_updates s
+    WHERE c.id = s.contact_id
+"""
 
-def clean_text(val):
-    """Clean text value, return None if NaN/empty"""
-    if pd.isna(val) or str(val).strip() == '' or str(val).strip().lower() == 'nan':
-        return None
-    return str(val).strip()
-
-
-def extract_addresses(row):
-    """Extract all addresses (1-11) from a row"""
-    addresses = []
-    for i in range(1, 12):
-        first_line = clean_text(row.get(f'Address {i} - First Line'))
-        town = clean_text(row.get(f'Address {i} - Town'))
-        postcode = clean_text(row.get(f'Address {i} - Postcode'))
-
-        # Only add if at least one field has data
-        if any([first_line, town, postcode]):
-            addresses.append({
-                'address_line_1': first_line or '',
-                'city': town or '',
-                'county': '',
-                'postal_code': postcode or ''
-            })
-    return addresses
+# s.previous_addresses only holds the new addresses; the first merged address is
+# the contact's existing first address if it has one, else the first new one
+SERVER_MERGE_UPDATE_SQL = """
+    UPDATE contacts c
+    SET previous_addresses = merge_previous_addresses(c.previous_addresses, m.previous_addresses),
+        previous_address_line_1 = COALESCE(c.previous_address_line_1, m.first_addr->>'address_line_1'),
+        previous_city = COALESCE(c.previous_city, m.first_addr->>'city'),
+        previous_county = COALESCE(c.previous_county, m.first_addr->>'county'),
+        previous_postal_code = COALESCE(c.previous_postal_code, m.first_addr->>'postal_code')
+    FROM (
+        SELECT s.contact_id, s.previous_addresses,
+               COALESCE(
+                   CASE WHEN jsonb_typeof(x.previous_addresses) = 'array' THEN x.previous_addresses->0 END,
+                   s.previous_addresses->0
+               ) AS first_addr
+        FROM address_updates s
+        JOIN contacts x ON x.id = s.contact_id
+    ) m
+    WHERE c.id = m.contact_id
+"""
 
 
+def update_staged(cur, contacts, server_merge=False):
+    """Stage (contact_id, addresses) updates in a temp table and apply them with a single UPDATE ... FROM"""
+    rows = []
+    for contact_id, addresses in contacts:
+        first_addr = addresses[0] if addresses else {}
+        rows.append((
+            contact_id,
+            json.dumps(addresses),
+            first_addr.get('address_line_1'),
+            first_addr.get('city'),
+            first_addr.get('county'),
+            first_addr.get('postal_code'),
+        ))
+
+    with timed("Staged updates (COPY)"):
+        staged = stage_rows(cur, 'address_updates', STAGING_COLUMNS, rows)
+    print(f"    Staged {staged} contact updates", flush=True)
+
+    with timed("UPDATE contacts FROM address_updates"):
+        cur.execute(SERVER_MERGE_UPDATE_SQL if server_merge else BULK_UPDATE_SQL)
+
+
+def update_contacts(conn, contacts_to_update, execute, batches, logs):
+    """
+    Write contact_id -> addresses through execute (update_contact_rows or
+    update_staged) with run_pipeline; a failing batch is bisected so only its
+    bad contacts are lost. Returns how many contacts were updated.
+    """
+    stats = run_pipeline(contacts_to_update.items(), None, StatementSink(conn, execute), batch_size=batches,
+                         verb='Updated')
+    for (contact_id, _), error in stats.rejected:
+        logs.append(f"[ERROR] Contact {contact_id}: {error}")
+    return stats.written
 def main():
+    parser = argparse.ArgumentParser(description="Import previous addresses from Excel")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Stage all updates in a temp table and apply them with one UPDATE ... FROM")
+    parser.add_argument('--server-merge', action='store_true',
+                        help="Like --bulk, but send only new addresses and merge them in Postgres")
+    add_reference_args(parser)
+    add_ledger_args(parser)
+    add_batch_args(parser)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("IMPORT ADDRESSES FROM EXCEL")
     print("=" * 60)
 
     # Read Excel file
-    print("\n[1] Reading Excel file...", flush=True)
-    df = pd.read_excel(EXCEL_FILE)
-
-    if TEST_LIMIT:
-        df = df.head(TEST_LIMIT)
-        print(f"    TEST MODE: Limited to first {TEST_LIMIT} rows", flush=True)
-
+    df = read_frame(EXCEL_FILE, limit=TEST_LIMIT, columns=EXCEL_COLUMNS, dtype={'Reference': str})
+    df = clean_frame(df, text=['Reference'])
     total_rows = len(df)
-    print(f"    Total rows to process: {total_rows}", flush=True)
 
     # Connect to database
     print("\n[2] Connecting to database...", flush=True)
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = connect()
     cur = conn.cursor()
     print("    Connected!", flush=True)
+    if args.server_merge:
+        require_functions(cur, ['canonical_address_key', 'merge_previous_addresses'], 'import_004_canonical_address_key')
 
-    # Build reference -> contact lookup
-    print("\n[3] Loading contacts and building reference map...", flush=True)
-    cur.execute("SELECT id, reference, previous_addresses FROM contacts WHERE reference IS NOT NULL AND reference != ''")
-    contacts_data = cur.fetchall()
-
-    ref_to_contact = {}
-    for contact_id, reference, prev_addresses in contacts_data:
-        # Split comma-separated references
-        refs = [r.strip() for r in reference.split(',') if r.strip()]
-        for ref in refs:
-            ref_to_contact[ref] = {
-                'id': contact_id,
-                'previous_addresses': prev_addresses or []
-            }
+    # Skip references whose rows are unchanged since the last import
+    ledger = ImportLedger(conn, 'import_addresses_from_excel', enabled=not args.full)
+    df = ledger.changed_rows(df, 'Reference', EXCEL_COLUMNS)
 
-    print(f"    Loaded {len(ref_to_contact)} reference mappings from {len(contacts_data)} contacts", flush=True)
+    # Build reference -> contact lookup (existing addresses stay server-side with --server-merge)
+    print("\n[3] Loading contacts and building reference map...", flush=True)
+    with reference_lookup(args, df) as lookup:
+        ref_to_contact = load_reference_map(cur, [] if args.server_merge else ['previous_addresses'], **lookup)
 
     # Process rows
     print("\n[4] Processing rows...", flush=True)
@@ -105,9 +195,12 @@ def main():
     not_found = 0
     no_addresses = 0
     logs = []
+    applied = []  # references whose contact was found (recorded in the ledger once written)
+
+    row_addresses, row_keys = addresses_by_row(df, 'Address', 11, keys=True)
 
-    for idx, row in df.iterrows():
-        reference = clean_text(row.get('Reference'))
+    for processed, (idx, row) in enumerate(iter_frame_rows(df), start=1):
+        reference = row.get('Reference')
 
         if not reference:
             logs.append(f"[SKIP] Row {idx}: No reference")
@@ -121,9 +214,10 @@ def main():
 
         contact = ref_to_contact[reference]
         contact_id = contact['id']
+        applied.append(reference)
 
         # Extract addresses from this row
-        new_addresses = extract_addresses(row)
+        new_addresses = row_addresses[processed - 1]
 
         if not new_addresses:
             no_addresses += 1
@@ -131,28 +225,16 @@ def main():
 
         matched += 1
 
-        # Merge addresses for this contact
-        if contact_id not in contacts_to_update:
-            existing = contact['previous_addresses'] if isinstance(contact['previous_addresses'], list) else []
-            contacts_to_update[contact_id] = {
-                'addresses': existing.copy(),
-                'keys': set()
-            }
-            # Build existing keys
-            for addr in existing:
-                key = (addr.get('address_line_1', ''), addr.get('city', ''), addr.get('postal_code', ''))
-                contacts_to_update[contact_id]['keys'].add(key)
-
-        # Add new addresses (no duplicates)
-        for addr in new_addresses:
-            key = (addr.get('address_line_1', ''), addr.get('city', ''), addr.get('postal_code', ''))
-            if key not in contacts_to_update[contact_id]['keys']:
-                contacts_to_update[contact_id]['addresses'].append(addr)
-                contacts_to_update[contact_id]['keys'].add(key)
-                logs.append(f"[ADD] Contact {contact_id}: {addr['address_line_1']}, {addr['city']}, {addr['postal_code']}")
+        # Merge addresses for this contact (no duplicates)
+        existing = contacts_to_update.get(contact_id, [] if args.server_merge else contact['previous_addresses'])
+        merged = merge_addresses(existing, new_addresses, row_keys[processed - 1])
+        # With --server-merge Postgres drops addresses the contact already has, so these are only sent
+        label = 'SENT' if args.server_merge else 'ADD'
+        for addr in merged[len(existing) if isinstance(existing, list) else 0:]:
+            logs.append(f"[{label}] Contact {contact_id}: {addr['address_line_1']}, {addr['city']}, {addr['postal_code']}")
+        contacts_to_update[contact_id] = merged
 
         # Print progress every 500
-        processed = idx + 1
         if processed % 500 == 0:
             print(f"    Processed {processed}/{total_rows} rows... (Matched: {matched})", flush=True)
 
@@ -166,60 +248,29 @@ def main():
     if contacts_to_update:
         print(f"\n[5] Updating {len(contacts_to_update)} contacts...", flush=True)
 
-        updated = 0
-        for i, (contact_id, data) in enumerate(contacts_to_update.items()):
-            try:
-                # Get first address for individual columns (if not already set)
-                first_addr = data['addresses'][0] if data['addresses'] else None
-
-                if first_addr:
-                    cur.execute("""
-                        UPDATE contacts
-                        SET previous_addresses = %s,
-                            previous_address_line_1 = COALESCE(previous_address_line_1, %s),
-                            previous_city = COALESCE(previous_city, %s),
-                            previous_county = COALESCE(previous_county, %s),
-                            previous_postal_code = COALESCE(previous_postal_code, %s)
-                        WHERE id = %s
-                    """, [
-                        json.dumps(data['addresses']),
-                        first_addr['address_line_1'],
-                        first_addr['city'],
-                        first_addr['county'],
-                        first_addr['postal_code'],
-                        contact_id
-                    ])
-                else:
-                    cur.execute("""
-                        UPDATE contacts
-                        SET previous_addresses = %s
-                        WHERE id = %s
-                    """, [json.dumps(data['addresses']), contact_id])
-
-                updated += 1
-
-                if (i + 1) % 100 == 0:
-                    conn.commit()
-                    print(f"    Updated {i + 1}/{len(contacts_to_update)} contacts", flush=True)
-
-            except Exception as e:
-                logs.append(f"[ERROR] Contact {contact_id}: {str(e)}")
-
-        conn.commit()
+        if args.bulk or args.server_merge:
+            # One staged UPDATE for everything, unless --batch-size splits it
+            execute = partial(update_staged, server_merge=args.server_merge)
+            batches = args.batch_size or len(contacts_to_update)
+        else:
+            execute = update_contact_rows
+            batches = batch_controller(args, 'contact updates', cur=cur, **ROW_STATEMENTS)
+        updated = update_contacts(conn, contacts_to_update, execute, batches, logs)
         print(f"    Total updated: {updated} contacts", flush=True)
+        if updated != len(contacts_to_update):
+            applied = []  # some updates failed: leave this run's rows unrecorded so they're retried
+
+    ledger.record(applied)
 
     # Write log
     print(f"\n[6] Writing log file...", flush=True)
-    with open(LOG_FILE, 'w') as f:
-        f.write(f"Import Addresses Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 80 + "\n")
-        f.write(f"Total rows: {total_rows}\n")
-        f.write(f"Matched: {matched}\n")
-        f.write(f"Not Found: {not_found}\n")
-        f.write(f"Contacts Updated: {len(contacts_to_update)}\n")
-        f.write("=" * 80 + "\n\n")
-        for log in logs:
-            f.write(log + "\n")
+    write_log(LOG_FILE, "Import Addresses Log", logs, {
+        'Total rows': total_rows,
+        'Matched': matched,
+        'Not Found': not_found,
+        'Contacts Updated': len(contacts_to_update),
+        'Unchanged (skipped)': ledger.skipped,
+    })
     print(f"    Log saved to: {LOG_FILE}", flush=True)
 
     # Close connection
@@ -1,36 +1,50 @@
 #!/usr/bin/env python3
 """
 Import Claims - FAST BATCH MODE
+
+Usage:
+    python import_claims.py
+    python import_claims.py --ref-index   # check references via contact_references instead of loading them all
+    python import_claims.py --batch-size 1000   # fixed insert pages instead of adaptive sizing
 """
 
-import os
-import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_values
+import argparse
 
-DB_HOST = os.getenv('DB_HOST', 'rowan-rose-solicitors-clients-list.cjme82cqwljz.eu-north-1.rds.amazonaws.com')
-DB_NAME = os.getenv('DB_NAME', 'client_credentials')
-DB_USER = os.getenv('DB_USER', 'postgres')
-DB_PASSWORD = os.getenv('DB_PASSWORD', 'admin123')
+from import_pipeline import (
+    ExecuteValuesSink, add_batch_args, batch_controller, connect, iter_frame_rows, load_contacts_by_email,
+    load_reference_owners, normalize_email, read_excel_cached, require_columns, run_pipeline, split_references,
+)
 
 EXCEL_FILE = 'public/CLAIMS .xlsx'
+EXCEL_COLUMNS = ['Reference', 'lender', 'Email']
 FAILED_FILE = 'failed.txt'
 
+INSERT_SQL = """
+    INSERT INTO cases (contact_id, lender, status, reference_specified, loa_generated, claim_value)
+    VALUES %s
+"""
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Import claims from Excel")
+    parser.add_argument('--ref-index', action='store_true',
+                        help="Look up only this file's references via contact_references instead of scanning contacts")
+    add_batch_args(parser)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("CLAIMS IMPORT - FAST BATCH MODE")
     print("=" * 60)
 
     # Read Excel
     print(f"\nReading {EXCEL_FILE}...")
-    df = pd.read_excel(EXCEL_FILE)
+    df = read_excel_cached(EXCEL_FILE, columns=EXCEL_COLUMNS, dtype={'Reference': str, 'lender': 'category'})
     total = len(df)
     print(f"Found {total} rows")
 
     # Connect
     print(f"\nConnecting...")
-    conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+    conn = connect()
     cur = conn.cursor()
 
     # Add column if needed
@@ -43,16 +57,19 @@ def main():
         cur.execute("ALTER TABLE cases ADD COLUMN reference_specified VARCHAR(50)")
         conn.commit()
 
-    # Load contacts
+    # Load only the contacts whose email is in this file (joined on the email_normalized index)
     print("Loading contacts...")
-    cur.execute("SELECT id, email, reference FROM contacts WHERE email IS NOT NULL")
-    contacts = {}
-    for cid, email, ref in cur.fetchall():
-        if email:
-            refs_set = set(r.strip() for r in (ref or '').split(',') if r.strip())
-            contacts[email.lower().strip()] = {'id': cid, 'refs': refs_set}
+    require_columns(cur, 'contacts', ['email_normalized'], 'import_010_email_normalized')
+    reference_column = 'NULL' if args.ref_index else 'reference'
+    contacts = {email: {'id': cid, 'refs': set(split_references(ref))}
+                for email, (cid, ref) in load_contacts_by_email(cur, df['Email'], [reference_column]).items()}
     print(f"Loaded {len(contacts)} contacts")
 
+    # reference -> contact ids, for just the references in this file
+    if args.ref_index:
+        ref_owners = load_reference_owners(cur, df['Reference'].astype(str).str.strip().unique().tolist())
+        print(f"Found {len(ref_owners)} of this file's references in contact_references")
+
     # Load existing
     print("Loading existing cases...")
     cur.execute("SELECT reference_specified FROM cases WHERE reference_specified IS NOT NULL")
@@ -65,38 +82,48 @@ def main():
     failed_list = []
     skipped = 0
 
-    for idx, row in df.iterrows():
+    for idx, row in iter_frame_rows(df):
         if (idx + 1) % 2000 == 0:
             print(f"  [{idx+1}/{total}] to_insert: {len(to_insert)}, failed: {len(failed_list)}")
 
         ref = str(row['Reference']).strip()
-        lender = str(row['lender']).strip()
-        email = str(row['Email']).strip().lower()
+        lender = str(row['lender'] or '').strip()
+        email = normalize_email(row['Email'])
 
         if ref in existing:
             skipped += 1
             continue
 
+        if not lender:
+            failed_list.append(f"{ref}\t\t{email}\tNo lender")
+            continue
+
         contact = contacts.get(email)
         if not contact:
             failed_list.append(f"{ref}\t{lender}\t{email}\tEmail not found")
             continue
 
-        if ref not in contact['refs']:
+        if args.ref_index:
+            ref_matches = contact['id'] in ref_owners.get(ref, ())
+        else:
+            ref_matches = ref in contact['refs']
+        if not ref_matches:
             failed_list.append(f"{ref}\t{lender}\t{email}\tRef not in contact")
             continue
 
         to_insert.append((contact['id'], lender, 'LOA SIGNED', ref, False, 0))
         existing.add(ref)
 
-    # Batch insert
+    # Batch insert (committed per batch; a failing batch is bisected down to its bad rows)
     print(f"\nBatch inserting {len(to_insert)} cases...")
+    inserted = 0
     if to_insert:
-        execute_values(cur, """
-            INSERT INTO cases (contact_id, lender, status, reference_specified, loa_generated, claim_value)
-            VALUES %s
-        """, to_insert, page_size=1000)
-        conn.commit()
+        batches = batch_controller(args, 'cases', cur=cur)
+        sink = ExecuteValuesSink(conn, INSERT_SQL, page_size=batches.maximum)  # one statement per batch
+        stats = run_pipeline(to_insert, None, sink, batch_size=batches)
+        inserted = stats.written
+        for (_, lender, _, ref, *_), error in stats.rejected:
+            failed_list.append(f"{ref}\t{lender}\t\tInsert failed: {error}")
     print("Done!")
 
     # Write failed
@@ -111,7 +138,7 @@ def main():
 
     print("\n" + "=" * 60)
     print("DONE!")
-    print(f"Inserted: {len(to_insert)}")
+    print(f"Inserted: {inserted}")
     print(f"Skipped:  {skipped}")
     print(f"Failed:   {len(failed_list)}")
     print("=" * 60)
@@ -11,26 +11,29 @@ Maps:
 - Complaint Paragraph → complaint_paragraph in cases
 - Previous Address 1 → individual columns in contacts
 - Previous Address 1-12 → previous_addresses JSONB in contacts (no duplicates)
+
+Usage:
+    python import_claims_from_excel.py            # per-case UPDATEs + multi-row INSERT batches
+    python import_claims_from_excel.py --upsert   # INSERT ... ON CONFLICT (reference_specified) per batch
+        # (needs migrations/import_001_cases_reference_unique.sql applied)
+    python import_claims_from_excel.py --server-merge   # send only new addresses, merge in Postgres
+    python import_claims_from_excel.py --resume   # skip rows this file's earlier run already committed
+    python import_claims_from_excel.py --full     # also reprocess rows unchanged since the last import
+    python import_claims_from_excel.py --batch-size 100   # fixed batches instead of adaptive sizing
 """
 
-import pandas as pd
-import psycopg2
+import argparse
 import json
-from datetime import datetime
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from functools import partial
+from operator import itemgetter
 
-# Database connection
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'),
-    'database': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'port': os.getenv('DB_PORT', 5432)
-}
+from import_pipeline import (
+    ROW_STATEMENTS, Checkpoint, ImportLedger, StatementSink, add_batch_args, add_ledger_args, address_columns,
+    addresses_by_row, batch_controller, clean_frame, connect, iter_frame_rows, load_contacts_by_email,
+    merge_addresses, read_frame, require_columns, require_functions, require_index, run_pipeline, split_references,
+    stage_rows, write_log,
+)
 
 # File paths
 EXCEL_FILE = './public/client_with_addresses (1).xlsx'
@@ -40,78 +43,212 @@ SUCCESS_LOG = os.path.expanduser('~/Desktop/import_claims_success.log')
 # TEST MODE: Set to None for all rows, or a number to limit
 TEST_LIMIT = None  # Full import
 
-
-def clean_text(val):
-    """Clean text value, return None if NaN/empty"""
-    if pd.isna(val) or str(val).strip() == '' or str(val).strip().lower() == 'nan':
-        return None
-    return str(val).strip()
-
-
-def extract_previous_addresses(row):
-    """Extract all previous addresses (1-12) from a row"""
-    addresses = []
-    for i in range(1, 13):
-        first_line = clean_text(row.get(f'Previous Address {i} - First Line'))
-        town = clean_text(row.get(f'Previous Address {i} - Town'))
-        county = clean_text(row.get(f'Previous Address {i} - County'))
-        postcode = clean_text(row.get(f'Previous Address {i} - Postcode'))
-
-        # Only add if at least one field has data
-        if any([first_line, town, county, postcode]):
-            addresses.append({
-                'address_line_1': first_line or '',
-                'city': town or '',
-                'county': county or '',
-                'postal_code': postcode or ''
-            })
-    return addresses
+ADDRESS_COLUMNS = address_columns('Previous Address', 12, county=True)
+TEXT_COLUMNS = ['Lead ID', 'Status', 'CREDIT LIMIT & INCREASES', 'Complaint Paragraph', 'EXTRA LENDERS']
+EXCEL_COLUMNS = ['Email address', 'Introducer', *TEXT_COLUMNS, *ADDRESS_COLUMNS]
+EXCEL_DTYPES = {'Lead ID': str, 'Introducer': 'category', 'Status': 'category'}
+
+UPSERT_STAGING_COLUMNS = [
+    ('row_no', 'INTEGER'),
+    ('contact_id', 'INTEGER'),
+    ('lender', 'TEXT'),
+    ('reference_specified', 'TEXT'),
+    ('status', 'TEXT'),
+    ('credit_limit_increases', 'TEXT'),
+    ('complaint_paragraph', 'TEXT'),
+]
+
+
+def remaining(items, checkpoint, phase):
+    """Items of phase whose source row is past what the checkpoint has committed"""
+    done = checkpoint.done(phase)
+    return [item for item in items if item['row'] > done]
+
+
+def write_phase(conn, items, execute, batches, checkpoint, phase, verb):
+    """
+    Write items through execute (a StatementSink) with run_pipeline, checkpointed as phase.
+
+    A failing batch is bisected so only its bad items are lost. Returns what
+    execute returned for the committed batches and the (item, error) rejects.
+    """
+    sink = StatementSink(conn, execute)
+    stats = run_pipeline(items, None, sink, batch_size=batches, checkpoint=checkpoint, phase=phase,
+                         position=itemgetter('row'), verb=verb)
+    return sink.returned, stats.rejected
+
+
+def update_cases(cur, cases):
+    """UPDATE each existing case; returns the cases"""
+    for c in cases:
+        cur.execute("""
+            UPDATE cases
+            SET status = %s,
+                credit_limit_increases = %s,
+                complaint_paragraph = %s
+            WHERE id = %s
+        """, [c['status'], c['credit_limit_increases'], c['complaint_paragraph'], c['case_id']])
+    return cases
+
+
+def insert_cases(cur, cases):
+    """Insert new cases with one multi-row INSERT; returns (id, contact_id, lender, reference) rows"""
+    values_template = ','.join(['(%s, %s, %s, %s, %s, %s, %s, false)' for _ in cases])
+    values = []
+    for c in cases:
+        values.extend([
+            c['contact_id'],
+            c['lender'],
+            c['reference_specified'],
+            c['status'],
+            0,  # claim_value
+            c['credit_limit_increases'],
+            c['complaint_paragraph']
+        ])
+
+    cur.execute(f"""
+        INSERT INTO cases (contact_id, lender, reference_specified, status, claim_value, credit_limit_increases, complaint_paragraph, loa_generated)
+        VALUES {values_template}
+        RETURNING id, contact_id, lender, reference_specified
+    """, values)
+    return cur.fetchall()
+
+
+def upsert_cases(cur, cases):
+    """
+    Insert or update cases keyed on reference_specified, one set-based statement per batch.
+
+    Existing cases only get status/credit_limit_increases/complaint_paragraph
+    updated, as in the row-by-row path; within a batch the last row for a
+    reference wins. Returns (id, contact_id, lender, reference, inserted) rows.
+    """
+    stage_rows(cur, 'case_upserts', UPSERT_STAGING_COLUMNS, [
+        (i, c['contact_id'], c['lender'], c['reference_specified'], c['status'],
+         c['credit_limit_increases'], c['complaint_paragraph'])
+        for i, c in enumerate(cases)
+    ])
+    cur.execute("""
+        INSERT INTO cases (contact_id, lender, reference_specified, status, claim_value,
+                           credit_limit_increases, complaint_paragraph, loa_generated)
+        SELECT DISTINCT ON (reference_specified)
+               contact_id, lender, reference_specified, status, 0,
+               credit_limit_increases, complaint_paragraph, false
+        FROM case_upserts
+        ORDER BY reference_specified, row_no DESC
+        ON CONFLICT (reference_specified) DO UPDATE
+        SET status = EXCLUDED.status,
+            credit_limit_increases = EXCLUDED.credit_limit_increases,
+            complaint_paragraph = EXCLUDED.complaint_paragraph
+        RETURNING id, contact_id, lender, reference_specified, (xmax = 0) AS inserted
+    """)
+    return cur.fetchall()
+
+
+def update_contacts(cur, contacts, server_merge=False):
+    """UPDATE each contact's extra_lenders and addresses; returns the contacts"""
+    if server_merge:
+        addresses_sql = "merge_previous_addresses(previous_addresses, %s::jsonb)"
+    else:
+        addresses_sql = "%s"
+
+    for c in contacts:
+        # Update with first address in individual columns + JSONB + extra_lenders
+        if c['first_addr']:
+            cur.execute(f"""
+                UPDATE contacts
+                SET extra_lenders = COALESCE(%s, extra_lenders),
+                    previous_addresses = {addresses_sql},
+                    previous_address_line_1 = COALESCE(%s, previous_address_line_1),
+                    previous_city = COALESCE(%s, previous_city),
+                    previous_county = COALESCE(%s, previous_county),
+                    previous_postal_code = COALESCE(%s, previous_postal_code)
+                WHERE id = %s
+            """, [
+                c['extra_lenders'],
+                json.dumps(c['previous_addresses']),
+                c['first_addr']['address_line_1'],
+                c['first_addr']['city'],
+                c['first_addr']['county'],
+                c['first_addr']['postal_code'],
+                c['contact_id']
+            ])
+        else:
+            cur.execute(f"""
+                UPDATE contacts
+                SET extra_lenders = COALESCE(%s, extra_lenders),
+                    previous_addresses = {addresses_sql}
+                WHERE id = %s
+            """, [c['extra_lenders'], json.dumps(c['previous_addresses']), c['contact_id']])
+    return contacts
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Import claims from Excel")
+    parser.add_argument('--upsert', action='store_true',
+                        help="Write cases with INSERT ... ON CONFLICT (reference_specified) DO UPDATE per batch")
+    parser.add_argument('--server-merge', action='store_true',
+                        help="Send only new addresses and merge them into previous_addresses in Postgres")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip work an earlier run on this file already committed (per phase)")
+    add_ledger_args(parser)
+    add_batch_args(parser)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("IMPORT CLAIMS FROM EXCEL (UPSERT)")
     print("=" * 60)
 
     # Read Excel file
-    print("\n[1] Reading Excel file...", flush=True)
-    df = pd.read_excel(EXCEL_FILE)
-
-    if TEST_LIMIT:
-        df = df.head(TEST_LIMIT)
-        print(f"    ⚠️  TEST MODE: Limited to first {TEST_LIMIT} rows", flush=True)
-
+    df = read_frame(EXCEL_FILE, limit=TEST_LIMIT, columns=EXCEL_COLUMNS, dtype=EXCEL_DTYPES)
+    df = clean_frame(df, text=TEXT_COLUMNS, lower=['Email address'], upper=['Introducer'])
     total_rows = len(df)
-    print(f"    Total rows to process: {total_rows}", flush=True)
 
     # Connect to database
     print("\n[2] Connecting to database...", flush=True)
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = connect()
     cur = conn.cursor()
     print("    Connected!", flush=True)
 
-    # Get all contacts with their references
+    if args.server_merge:
+        require_functions(cur, ['canonical_address_key', 'merge_previous_addresses'], 'import_004_canonical_address_key')
+
+    # Skip Lead IDs whose rows are unchanged since the last import
+    ledger = ImportLedger(conn, 'import_claims_from_excel', enabled=not args.full)
+    df = ledger.changed_rows(df, 'Lead ID', EXCEL_COLUMNS)
+
+    # Phases below record the last committed source row with each commit; row
+    # numbers are positions in the ledger-filtered frame, so --full runs resume separately
+    checkpoint = Checkpoint(conn, 'import_claims_from_excel' + (':full' if args.full else ''), EXCEL_FILE,
+                            resume=args.resume)
+
+    # Get the contacts with this file's emails, joined on the email_normalized index
+    # (existing addresses stay server-side with --server-merge)
     print("\n[3] Loading contacts from database...", flush=True)
-    cur.execute("SELECT id, email, reference, previous_addresses FROM contacts WHERE email IS NOT NULL")
-    contacts_data = cur.fetchall()
+    require_columns(cur, 'contacts', ['email_normalized'], 'import_010_email_normalized')
+    addresses_column = 'NULL' if args.server_merge else 'previous_addresses'
+    contacts = load_contacts_by_email(cur, df['Email address'].dropna(), ['reference', addresses_column])
 
     # Build email -> contact lookup
-    email_to_contact = {}
-    for contact_id, email, reference, prev_addresses in contacts_data:
-        if email:
-            email_lower = email.strip().lower()
-            email_to_contact[email_lower] = {
-                'id': contact_id,
-                'reference': reference or '',
-                'previous_addresses': prev_addresses or []
-            }
+    email_to_contact = {
+        email: {
+            'id': contact_id,
+            'references': split_references(reference),
+            'previous_addresses': prev_addresses or []
+        }
+        for email, (contact_id, reference, prev_addresses) in contacts.items()
+    }
 
     print(f"    Loaded {len(email_to_contact)} contacts", flush=True)
 
-    # Get existing reference_specified values
-    cur.execute("SELECT reference_specified, id FROM cases WHERE reference_specified IS NOT NULL")
-    existing_refs = {row[0]: row[1] for row in cur.fetchall()}
-    print(f"    Loaded {len(existing_refs)} existing reference_specified values", flush=True)
+    if args.upsert:
+        # Postgres decides insert vs update, so there is no need to preload existing cases
+        require_index(cur, 'idx_cases_reference_specified_unique', 'import_001_cases_reference_unique')
+        existing_refs = {}
+    else:
+        # Get existing reference_specified values
+        cur.execute("SELECT reference_specified, id FROM cases WHERE reference_specified IS NOT NULL")
+        existing_refs = {row[0]: row[1] for row in cur.fetchall()}
+        print(f"    Loaded {len(existing_refs)} existing reference_specified values", flush=True)
 
     # Process rows
     print("\n[4] Processing rows...", flush=True)
@@ -120,6 +257,7 @@ def main():
     cases_to_update = []
     contacts_to_update = []
     failed_logs = []
+    applied = []  # matched Lead IDs, recorded in the ledger unless they failed
 
     matched = 0
     not_matched = 0
@@ -127,18 +265,17 @@ def main():
     will_update = 0
     will_insert = 0
 
-    for idx, row in df.iterrows():
-        lead_id = clean_text(row.get('Lead ID'))
-        email = clean_text(row.get('Email address'))
-        lender = clean_text(row.get('Introducer'))
+    row_addresses, row_keys = addresses_by_row(df, 'Previous Address', 12, county=True, keys=True)
+
+    for processed, (idx, row) in enumerate(iter_frame_rows(df), start=1):
+        lead_id = row.get('Lead ID')
+        email = row.get('Email address')
+        lender = row.get('Introducer')
 
         if not lead_id or not email or not lender:
             failed_logs.append(f"[MISSING_DATA] Row {idx}: Lead ID={lead_id}, Email={email}, Lender={lender}")
             continue
 
-        email = email.lower()
-        lender = lender.upper()
-
         # Find contact by email
         if email not in email_to_contact:
             failed_logs.append(f"[EMAIL_NOT_FOUND] Lead ID: {lead_id}, Email: {email}, Lender: {lender}")
@@ -147,26 +284,27 @@ def main():
 
         contact = email_to_contact[email]
         contact_id = contact['id']
-        references = contact['reference'].split(',') if contact['reference'] else []
 
         # Check if lead_id exists in contact's references
-        if lead_id not in references:
-            failed_logs.append(f"[REFERENCE_NOT_MATCH] Lead ID: {lead_id}, Email: {email}, Lender: {lender}, Contact ID: {contact_id}, Existing Refs: {contact['reference']}")
+        if lead_id not in contact['references']:
+            failed_logs.append(f"[REFERENCE_NOT_MATCH] Lead ID: {lead_id}, Email: {email}, Lender: {lender}, Contact ID: {contact_id}, Existing Refs: {','.join(contact['references'])}")
             not_matched += 1
             continue
 
         # Match found!
         matched += 1
+        applied.append(lead_id)
 
         # Extract case data
-        status = clean_text(row.get('Status')) or 'New Lead'
-        credit_limit = clean_text(row.get('CREDIT LIMIT & INCREASES'))
-        complaint_paragraph = clean_text(row.get('Complaint Paragraph'))
+        status = row.get('Status') or 'New Lead'
+        credit_limit = row.get('CREDIT LIMIT & INCREASES')
+        complaint_paragraph = row.get('Complaint Paragraph')
 
         # Check if reference already exists in cases
         if lead_id in existing_refs:
             # UPDATE existing case
             cases_to_update.append({
+                'row': processed,
                 'case_id': existing_refs[lead_id],
                 'contact_id': contact_id,
                 'lender': lender,
@@ -179,6 +317,7 @@ def main():
         else:
             # INSERT new case
             cases_to_insert.append({
+                'row': processed,
                 'contact_id': contact_id,
                 'lender': lender,
                 'reference_specified': lead_id,
@@ -189,27 +328,18 @@ def main():
             will_insert += 1
 
         # Extract contact update data
-        extra_lenders = clean_text(row.get('EXTRA LENDERS'))
-        new_addresses = extract_previous_addresses(row)
+        extra_lenders = row.get('EXTRA LENDERS')
+        new_addresses = row_addresses[processed - 1]
 
         # Get first address for individual columns
         first_addr = new_addresses[0] if new_addresses else None
 
-        # Merge with existing addresses (no duplicates)
-        existing_addresses = contact['previous_addresses'] if isinstance(contact['previous_addresses'], list) else []
-        existing_keys = set()
-        for addr in existing_addresses:
-            key = (addr.get('address_line_1', ''), addr.get('city', ''), addr.get('postal_code', ''))
-            existing_keys.add(key)
-
-        merged_addresses = existing_addresses.copy()
-        for addr in new_addresses:
-            key = (addr.get('address_line_1', ''), addr.get('city', ''), addr.get('postal_code', ''))
-            if key not in existing_keys:
-                merged_addresses.append(addr)
-                existing_keys.add(key)
+        # Merge with existing addresses (no duplicates); with --server-merge Postgres merges them
+        merged_addresses = merge_addresses(contact['previous_addresses'], new_addresses, row_keys[processed - 1])
 
         contacts_to_update.append({
+            'row': processed,
+            'lead_id': lead_id,
             'contact_id': contact_id,
             'extra_lenders': extra_lenders,
             'previous_addresses': merged_addresses,
@@ -217,155 +347,94 @@ def main():
         })
 
         # Print progress every 100
-        processed = idx + 1
         if processed % 100 == 0:
             print(f"    Processed {processed}/{total_rows} rows... (Matched: {matched}, Update: {will_update}, Insert: {will_insert})", flush=True)
 
     print(f"\n    Final: Processed {total_rows} rows", flush=True)
     print(f"    Matched: {matched}", flush=True)
     print(f"    Will Update: {will_update}", flush=True)
-    print(f"    Will Insert: {will_insert}", flush=True)
+    print(f"    Will {'Upsert' if args.upsert else 'Insert'}: {will_insert}", flush=True)
     print(f"    Reference Not Match: {not_matched}", flush=True)
     print(f"    Email Not Found: {email_not_found}", flush=True)
 
+    # On --resume, drop what earlier runs committed
+    cases_to_update = remaining(cases_to_update, checkpoint, 'case_updates')
+    cases_to_insert = remaining(cases_to_insert, checkpoint, 'case_upserts' if args.upsert else 'case_inserts')
+    contacts_to_update = remaining(contacts_to_update, checkpoint, 'contacts')
+
     # Update existing cases
     success_logs = []
+    failed = set()  # Lead IDs with a failed write, left out of the ledger
 
     if cases_to_update:
         print(f"\n[5] Updating {len(cases_to_update)} existing cases...", flush=True)
-
-        updated = 0
-        for i, c in enumerate(cases_to_update):
-            try:
-                cur.execute("""
-                    UPDATE cases
-                    SET status = %s,
-                        credit_limit_increases = %s,
-                        complaint_paragraph = %s
-                    WHERE id = %s
-                """, [c['status'], c['credit_limit_increases'], c['complaint_paragraph'], c['case_id']])
+        batches = batch_controller(args, 'case updates', cur=cur, **ROW_STATEMENTS)
+        updated_cases, rejected = write_phase(conn, cases_to_update, update_cases, batches, checkpoint,
+                                              'case_updates', 'Updated')
+        for c, error in rejected:
+            failed.add(c['reference_specified'])
+            failed_logs.append(f"[UPDATE_FAILED] Case ID: {c['case_id']}, Reference: {c['reference_specified']}, Error: {error}")
+        for c in updated_cases:
+            success_logs.append(f"[UPDATED] Case ID: {c['case_id']}, Contact ID: {c['contact_id']}, Lender: {c['lender']}, Reference: {c['reference_specified']}")
+        print(f"    Total updated: {len(updated_cases)} cases", flush=True)
+
+    # Upsert all matched cases
+    if args.upsert and cases_to_insert:
+        print(f"\n[5] Upserting {len(cases_to_insert)} cases in adaptive batches...", flush=True)
+        batches = batch_controller(args, 'case upserts', cur=cur)
+        result, rejected = write_phase(conn, cases_to_insert, upsert_cases, batches, checkpoint,
+                                       'case_upserts', 'Upserted')
+        for c, error in rejected:
+            failed.add(c['reference_specified'])
+            failed_logs.append(f"[UPSERT_FAILED] Contact ID: {c['contact_id']}, Lender: {c['lender']}, Reference: {c['reference_specified']}, Error: {error}")
+        inserted = updated = 0
+        for case_id, contact_id, lender, reference, was_inserted in result:
+            action = 'INSERTED' if was_inserted else 'UPDATED'
+            success_logs.append(f"[{action}] Case ID: {case_id}, Contact ID: {contact_id}, Lender: {lender}, Reference: {reference}")
+            if was_inserted:
+                inserted += 1
+            else:
                 updated += 1
-                success_logs.append(f"[UPDATED] Case ID: {c['case_id']}, Contact ID: {c['contact_id']}, Lender: {c['lender']}, Reference: {c['reference_specified']}")
-
-                if (i + 1) % 100 == 0:
-                    conn.commit()
-                    print(f"    Updated {i + 1}/{len(cases_to_update)} cases", flush=True)
-            except Exception as e:
-                failed_logs.append(f"[UPDATE_FAILED] Case ID: {c['case_id']}, Reference: {c['reference_specified']}, Error: {str(e)}")
-
-        conn.commit()
-        print(f"    Total updated: {updated} cases", flush=True)
+        print(f"\n    Total inserted: {inserted} cases, updated: {updated} cases", flush=True)
 
     # Insert new cases
-    if cases_to_insert:
-        print(f"\n[6] Inserting {len(cases_to_insert)} new cases in batches of 100...", flush=True)
-
-        inserted = 0
-        batch_size = 100
-
-        for i in range(0, len(cases_to_insert), batch_size):
-            batch = cases_to_insert[i:i + batch_size]
-
-            try:
-                values_template = ','.join(['(%s, %s, %s, %s, %s, %s, %s, false)' for _ in batch])
-                values = []
-                for c in batch:
-                    values.extend([
-                        c['contact_id'],
-                        c['lender'],
-                        c['reference_specified'],
-                        c['status'],
-                        0,  # claim_value
-                        c['credit_limit_increases'],
-                        c['complaint_paragraph']
-                    ])
-
-                cur.execute(f"""
-                    INSERT INTO cases (contact_id, lender, reference_specified, status, claim_value, credit_limit_increases, complaint_paragraph, loa_generated)
-                    VALUES {values_template}
-                    RETURNING id, contact_id, lender, reference_specified
-                """, values)
-
-                inserted_rows = cur.fetchall()
-                conn.commit()
-
-                for row in inserted_rows:
-                    success_logs.append(f"[INSERTED] Case ID: {row[0]}, Contact ID: {row[1]}, Lender: {row[2]}, Reference: {row[3]}")
-
-                inserted += len(batch)
-                print(f"    Inserted batch {i//batch_size + 1}: {inserted}/{len(cases_to_insert)} cases", flush=True)
-            except Exception as e:
-                conn.rollback()
-                for c in batch:
-                    failed_logs.append(f"[INSERT_FAILED] Contact ID: {c['contact_id']}, Lender: {c['lender']}, Reference: {c['reference_specified']}, Error: {str(e)}")
-                print(f"    Batch {i//batch_size + 1} FAILED: {str(e)}", flush=True)
-
-        print(f"\n    Total inserted: {inserted} cases", flush=True)
+    if cases_to_insert and not args.upsert:
+        print(f"\n[6] Inserting {len(cases_to_insert)} new cases in adaptive batches...", flush=True)
+        batches = batch_controller(args, 'case inserts', cur=cur)
+        inserted_rows, rejected = write_phase(conn, cases_to_insert, insert_cases, batches, checkpoint,
+                                              'case_inserts', 'Inserted')
+        for c, error in rejected:
+            failed.add(c['reference_specified'])
+            failed_logs.append(f"[INSERT_FAILED] Contact ID: {c['contact_id']}, Lender: {c['lender']}, Reference: {c['reference_specified']}, Error: {error}")
+        for row in inserted_rows:
+            success_logs.append(f"[INSERTED] Case ID: {row[0]}, Contact ID: {row[1]}, Lender: {row[2]}, Reference: {row[3]}")
+        print(f"\n    Total inserted: {len(inserted_rows)} cases", flush=True)
 
     # Update contacts
     if contacts_to_update:
         print(f"\n[7] Updating {len(contacts_to_update)} contacts...", flush=True)
-
-        updated = 0
-        for i, c in enumerate(contacts_to_update):
-            try:
-                # Update with first address in individual columns + JSONB + extra_lenders
-                if c['first_addr']:
-                    cur.execute("""
-                        UPDATE contacts
-                        SET extra_lenders = COALESCE(%s, extra_lenders),
-                            previous_addresses = %s,
-                            previous_address_line_1 = COALESCE(%s, previous_address_line_1),
-                            previous_city = COALESCE(%s, previous_city),
-                            previous_county = COALESCE(%s, previous_county),
-                            previous_postal_code = COALESCE(%s, previous_postal_code)
-                        WHERE id = %s
-                    """, [
-                        c['extra_lenders'],
-                        json.dumps(c['previous_addresses']),
-                        c['first_addr']['address_line_1'],
-                        c['first_addr']['city'],
-                        c['first_addr']['county'],
-                        c['first_addr']['postal_code'],
-                        c['contact_id']
-                    ])
-                else:
-                    cur.execute("""
-                        UPDATE contacts
-                        SET extra_lenders = COALESCE(%s, extra_lenders),
-                            previous_addresses = %s
-                        WHERE id = %s
-                    """, [c['extra_lenders'], json.dumps(c['previous_addresses']), c['contact_id']])
-
-                updated += 1
-
-                if (i + 1) % 100 == 0:
-                    conn.commit()
-                    print(f"    Updated {i + 1}/{len(contacts_to_update)} contacts", flush=True)
-            except Exception as e:
-                failed_logs.append(f"[CONTACT_UPDATE_FAILED] Contact ID: {c['contact_id']}, Error: {str(e)}")
-
-        conn.commit()
-        print(f"    Total updated: {updated} contacts", flush=True)
+        batches = batch_controller(args, 'contact updates', cur=cur, **ROW_STATEMENTS)
+        updated_contacts, rejected = write_phase(conn, contacts_to_update,
+                                                 partial(update_contacts, server_merge=args.server_merge),
+                                                 batches, checkpoint, 'contacts', 'Updated')
+        for c, error in rejected:
+            failed.add(c['lead_id'])
+            failed_logs.append(f"[CONTACT_UPDATE_FAILED] Contact ID: {c['contact_id']}, Error: {error}")
+        print(f"    Total updated: {len(updated_contacts)} contacts", flush=True)
+
+    # Record the Lead IDs that went through without errors
+    ledger.record(lead_id for lead_id in applied if lead_id not in failed)
 
     # Write success logs
     if success_logs:
         print(f"\n[8] Writing {len(success_logs)} success entries to log...", flush=True)
-        with open(SUCCESS_LOG, 'w') as f:
-            f.write(f"Import Claims Success Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 80 + "\n\n")
-            for log in success_logs:
-                f.write(log + "\n")
+        write_log(SUCCESS_LOG, "Import Claims Success Log", success_logs)
         print(f"    Success log saved to: {SUCCESS_LOG}", flush=True)
 
     # Write failed logs
     if failed_logs:
         print(f"\n[9] Writing {len(failed_logs)} failed entries to log...", flush=True)
-        with open(FAILED_LOG, 'w') as f:
-            f.write(f"Import Claims Failed Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 80 + "\n\n")
-            for log in failed_logs:
-                f.write(log + "\n")
+        write_log(FAILED_LOG, "Import Claims Failed Log", failed_logs)
         print(f"    Failed log saved to: {FAILED_LOG}", flush=True)
 
     # Close connection
@@ -3,26 +3,27 @@
 Import phone, extra_lenders, and previous_addresses from CONTACTED_NEW_FINAL_CLEANED (1).xlsx
 
 Matches by Reference → finds contact → updates phone, extra_lenders, previous_addresses
+
+Usage:
+    python import_phone_lender_addresses.py
+    python import_phone_lender_addresses.py --server-merge   # send only new addresses, merge in Postgres
+    python import_phone_lender_addresses.py --ref-index      # look up only this file's references (contact_references)
+    python import_phone_lender_addresses.py --ref-cache      # resolve references from the local snapshot cache
+    python import_phone_lender_addresses.py --full           # also reprocess rows unchanged since the last import
+    python import_phone_lender_addresses.py --batch-size 1000   # fixed update pages instead of adaptive sizing
 """
 
-import pandas as pd
-import psycopg2
+import argparse
 import json
-from datetime import datetime
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from psycopg2.extras import execute_batch
 
-# Database connection
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'),
-    'database': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'port': os.getenv('DB_PORT', 5432)
-}
+from import_pipeline import (
+    ImportLedger, StatementSink, add_batch_args, add_ledger_args, add_reference_args, address_columns,
+    addresses_by_row, batch_controller, clean_frame, connect, iter_frame_rows, load_reference_map, merge_addresses,
+    read_frame, reference_lookup, require_functions, run_pipeline, write_log,
+)
 
 # File path
 EXCEL_FILE = './public/CONTACTED_NEW_FINAL_CLEANED (1).xlsx'
@@ -31,104 +32,46 @@ LOG_FILE = os.path.expanduser('~/Desktop/import_phone_lender_addresses.log')
 # TEST MODE: Set to None for all rows, or a number to limit
 TEST_LIMIT = None
 
-
-def clean_text(val):
-    """Clean text value, return None if NaN/empty"""
-    if pd.isna(val) or str(val).strip() == '' or str(val).strip().lower() == 'nan':
-        return None
-    return str(val).strip()
-
-
-def clean_phone(val):
-    """Clean phone number - convert float to string, remove .0"""
-    if pd.isna(val):
-        return None
-    # Convert to string and remove decimal
-    phone_str = str(val).strip()
-    if phone_str.endswith('.0'):
-        phone_str = phone_str[:-2]
-    if phone_str == '' or phone_str.lower() == 'nan':
-        return None
-    return phone_str
-
-
-def clean_reference(val):
-    """Clean reference - convert float to int string"""
-    if pd.isna(val):
-        return None
-    # Convert to string and remove decimal
-    ref_str = str(val).strip()
-    if ref_str.endswith('.0'):
-        ref_str = ref_str[:-2]
-    if ref_str == '' or ref_str.lower() == 'nan':
-        return None
-    return ref_str
-
-
-def extract_addresses(row):
-    """Extract all previous addresses (1-3) from a row"""
-    addresses = []
-    for i in range(1, 4):  # Previous Address 1-3
-        first_line = clean_text(row.get(f'Previous Address {i} - First Line'))
-        town = clean_text(row.get(f'Previous Address {i} - Town'))
-        postcode = clean_text(row.get(f'Previous Address {i} - Postcode'))
-
-        # Only add if at least one field has data
-        if any([first_line, town, postcode]):
-            addresses.append({
-                'address_line_1': first_line or '',
-                'city': town or '',
-                'county': '',
-                'postal_code': postcode or ''
-            })
-    return addresses
+ADDRESS_COLUMNS = address_columns('Previous Address', 3)
+EXCEL_COLUMNS = ['Reference', 'phone', 'EXTRA LENDER', *ADDRESS_COLUMNS]
+EXCEL_DTYPES = {'Reference': str, 'phone': str, 'EXTRA LENDER': 'category'}
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Import phone, extra lenders and addresses from Excel")
+    parser.add_argument('--server-merge', action='store_true',
+                        help="Send only new addresses and merge them into previous_addresses in Postgres")
+    add_reference_args(parser)
+    add_ledger_args(parser)
+    add_batch_args(parser)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("IMPORT PHONE, EXTRA LENDERS & ADDRESSES FROM EXCEL")
     print("=" * 60)
 
-    # Read Excel file
-    print("\n[1] Reading Excel file...", flush=True)
-    df = pd.read_excel(EXCEL_FILE)
-    print(f"    Raw rows in Excel: {len(df)}", flush=True)
-
-    # Filter out empty rows (no Reference = no data)
-    df = df[df['Reference'].notna()]
-    print(f"    Rows with data: {len(df)}", flush=True)
-
-    if TEST_LIMIT:
-        df = df.head(TEST_LIMIT)
-        print(f"    TEST MODE: Limited to first {TEST_LIMIT} rows", flush=True)
-
+    # Read Excel file (rows without a Reference have no data)
+    df = read_frame(EXCEL_FILE, limit=TEST_LIMIT, required='Reference', columns=EXCEL_COLUMNS, dtype=EXCEL_DTYPES)
+    df = clean_frame(df, text=['EXTRA LENDER'], numbers=['Reference', 'phone'])
     total_rows = len(df)
-    print(f"    Total rows to process: {total_rows}", flush=True)
 
     # Connect to database
     print("\n[2] Connecting to database...", flush=True)
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = connect()
     cur = conn.cursor()
     print("    Connected!", flush=True)
+    if args.server_merge:
+        require_functions(cur, ['canonical_address_key', 'merge_previous_addresses'], 'import_004_canonical_address_key')
 
-    # Build reference -> contact lookup
+    # Skip references whose rows are unchanged since the last import
+    ledger = ImportLedger(conn, 'import_phone_lender_addresses', enabled=not args.full)
+    df = ledger.changed_rows(df, 'Reference', EXCEL_COLUMNS)
+
+    # Build reference -> contact lookup (existing addresses stay server-side with --server-merge)
     print("\n[3] Loading contacts and building reference map...", flush=True)
-    cur.execute("SELECT id, reference, phone, extra_lenders, previous_addresses FROM contacts WHERE reference IS NOT NULL AND reference != ''")
-    contacts_data = cur.fetchall()
-
-    ref_to_contact = {}
-    for contact_id, reference, phone, extra_lenders, prev_addresses in contacts_data:
-        # Split comma-separated references
-        refs = [r.strip() for r in reference.split(',') if r.strip()]
-        for ref in refs:
-            ref_to_contact[ref] = {
-                'id': contact_id,
-                'phone': phone,
-                'extra_lenders': extra_lenders,
-                'previous_addresses': prev_addresses or []
-            }
-
-    print(f"    Loaded {len(ref_to_contact)} reference mappings from {len(contacts_data)} contacts", flush=True)
+    columns = ['phone', 'extra_lenders'] if args.server_merge else ['phone', 'extra_lenders', 'previous_addresses']
+    with reference_lookup(args, df) as lookup:
+        ref_to_contact = load_reference_map(cur, columns, **lookup)
 
     # Process rows
     print("\n[4] Processing rows...", flush=True)
@@ -138,9 +81,12 @@ def main():
     not_found = 0
     no_data = 0
     logs = []
+    applied = []  # references whose contact was found (recorded in the ledger once written)
+
+    row_addresses, row_keys = addresses_by_row(df, 'Previous Address', 3, keys=True)
 
-    for idx, row in df.iterrows():
-        reference = clean_reference(row.get('Reference'))
+    for position, (idx, row) in enumerate(iter_frame_rows(df)):
+        reference = row.get('Reference')
 
         if not reference:
             logs.append(f"[SKIP] Row {idx}: No reference")
@@ -154,11 +100,12 @@ def main():
 
         contact = ref_to_contact[reference]
         contact_id = contact['id']
+        applied.append(reference)
 
         # Extract data
-        phone = clean_phone(row.get('phone'))
-        extra_lender = clean_text(row.get('EXTRA LENDER'))
-        addresses = extract_addresses(row)
+        phone = row.get('phone')
+        extra_lender = row.get('EXTRA LENDER')
+        addresses = row_addresses[position]
 
         # Check if we have any data to update
         if not phone and not extra_lender and not addresses:
@@ -168,19 +115,11 @@ def main():
 
         matched += 1
 
-        # Merge previous_addresses (no duplicates)
-        existing_addresses = contact['previous_addresses'] if isinstance(contact['previous_addresses'], list) else []
-        existing_keys = set()
-        for addr in existing_addresses:
-            key = (addr.get('address_line_1', ''), addr.get('city', ''), addr.get('postal_code', ''))
-            existing_keys.add(key)
-
-        merged_addresses = existing_addresses.copy()
-        for addr in addresses:
-            key = (addr.get('address_line_1', ''), addr.get('city', ''), addr.get('postal_code', ''))
-            if key not in existing_keys:
-                merged_addresses.append(addr)
-                existing_keys.add(key)
+        # Merge previous_addresses (no duplicates); with --server-merge Postgres merges them
+        if args.server_merge:
+            merged_addresses = merge_addresses([], addresses, row_keys[position])
+        else:
+            merged_addresses = merge_addresses(contact['previous_addresses'], addresses, row_keys[position])
 
         updates.append({
             'contact_id': contact_id,
@@ -207,56 +146,63 @@ def main():
     if updates:
         print(f"\n[5] Updating {len(updates)} contacts (BULK MODE)...", flush=True)
 
-        from psycopg2.extras import execute_batch
-
         # Separate updates by type for bulk processing
         phone_updates = [(upd['phone'], upd['contact_id']) for upd in updates if upd['phone']]
         lender_updates = [(upd['extra_lenders'], upd['contact_id']) for upd in updates if upd['extra_lenders']]
         addr_updates = [(json.dumps(upd['previous_addresses']), upd['contact_id']) for upd in updates if upd['previous_addresses']]
 
-        try:
-            # Bulk update phones
-            if phone_updates:
-                print(f"    Updating {len(phone_updates)} phone numbers...", flush=True)
-                execute_batch(cur, "UPDATE contacts SET phone = %s WHERE id = %s", phone_updates, page_size=1000)
-                conn.commit()
-                print(f"    Phones done!", flush=True)
-
-            # Bulk update extra_lenders
-            if lender_updates:
-                print(f"    Updating {len(lender_updates)} extra_lenders...", flush=True)
-                execute_batch(cur, "UPDATE contacts SET extra_lenders = %s WHERE id = %s", lender_updates, page_size=1000)
-                conn.commit()
-                print(f"    Extra lenders done!", flush=True)
-
-            # Bulk update previous_addresses
-            if addr_updates:
-                print(f"    Updating {len(addr_updates)} previous_addresses...", flush=True)
-                execute_batch(cur, "UPDATE contacts SET previous_addresses = %s WHERE id = %s", addr_updates, page_size=1000)
-                conn.commit()
-                print(f"    Addresses done!", flush=True)
-
-            updated = len(updates)
-
-        except Exception as e:
-            logs.append(f"[ERROR] Bulk update failed: {str(e)}")
-
-        conn.commit()
-        print(f"    Total updated: {updated} contacts", flush=True)
+        failed = set()  # contact ids with a failed update
+
+        def update_in_pages(name, sql, rows):
+            """(value, contact_id) rows through run_pipeline, one execute_batch page per batch"""
+            def execute(cur, page):
+                execute_batch(cur, sql, page, page_size=len(page))
+
+            stats = run_pipeline(rows, None, StatementSink(conn, execute),
+                                 batch_size=batch_controller(args, name, cur=cur), verb='Updated')
+            for (_, contact_id), error in stats.rejected:
+                failed.add(contact_id)
+                logs.append(f"[ERROR] Contact {contact_id}: {name} not updated: {error}")
+
+        # Bulk update phones
+        if phone_updates:
+            print(f"    Updating {len(phone_updates)} phone numbers...", flush=True)
+            update_in_pages('phones', "UPDATE contacts SET phone = %s WHERE id = %s", phone_updates)
+            print(f"    Phones done!", flush=True)
+
+        # Bulk update extra_lenders
+        if lender_updates:
+            print(f"    Updating {len(lender_updates)} extra_lenders...", flush=True)
+            update_in_pages('extra_lenders', "UPDATE contacts SET extra_lenders = %s WHERE id = %s", lender_updates)
+            print(f"    Extra lenders done!", flush=True)
+
+        # Bulk update previous_addresses
+        if addr_updates:
+            print(f"    Updating {len(addr_updates)} previous_addresses...", flush=True)
+            if args.server_merge:
+                sql = "UPDATE contacts SET previous_addresses = merge_previous_addresses(previous_addresses, %s::jsonb) WHERE id = %s"
+            else:
+                sql = "UPDATE contacts SET previous_addresses = %s WHERE id = %s"
+            update_in_pages('previous_addresses', sql, addr_updates)
+            print(f"    Addresses done!", flush=True)
+
+        # References of contacts with a failed update are left unrecorded so they're retried
+        failed_refs = {upd['reference'] for upd in updates if upd['contact_id'] in failed}
+        applied = [reference for reference in applied if reference not in failed_refs]
+        print(f"    Total updated: {sum(1 for upd in updates if upd['contact_id'] not in failed)} contacts", flush=True)
+
+    ledger.record(applied)
 
     # Write log
     print(f"\n[6] Writing log file...", flush=True)
-    with open(LOG_FILE, 'w') as f:
-        f.write(f"Import Phone/Lender/Addresses Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 80 + "\n")
-        f.write(f"Total rows: {total_rows}\n")
-        f.write(f"Matched: {matched}\n")
-        f.write(f"Not Found: {not_found}\n")
-        f.write(f"No Data: {no_data}\n")
-        f.write(f"Contacts Updated: {len(updates)}\n")
-        f.write("=" * 80 + "\n\n")
-        for log in logs:
-            f.write(log + "\n")
+    write_log(LOG_FILE, "Import Phone/Lender/Addresses Log", logs, {
+        'Total rows': total_rows,
+        'Matched': matched,
+        'Not Found': not_found,
+        'No Data': no_data,
+        'Unchanged (skipped)': ledger.skipped,
+        'Contacts Updated': len(updates),
+    })
     print(f"    Log saved to: {LOG_FILE}", flush=True)
 
     # Close connection
@@ -0,0 +1,59 @@
+"""
+Shared streaming import engine for the Excel → Postgres scripts.
+
+Each importer is a thin job definition: a reader (readers), a per-row transform
+and a sink (sinks), wired together by run_pipeline, plus the shared DB config,
+cleaning (cell-level and vectorized), reference-map, email and address helpers, and
+adaptive batch sizing (batching).
+"""
+
+from .addresses import (
+    address_columns, address_frame, address_key, addresses_by_row, extract_addresses, merge_addresses,
+)
+from .batching import ROW_STATEMENTS, BatchController, lock_waits
+from .bulk_read import iter_copy_chunks, read_copy_frame
+from .checkpoints import Checkpoint
+from .cli import add_batch_args, add_ledger_args, add_reference_args, batch_controller, reference_lookup
+from .cleaning import clean_number_string, clean_phone, clean_reference, clean_text
+from .db import DB_CONFIG, apply_migration, connect, require_columns, require_functions, require_index
+from .duplicates import PERSON_COLUMNS, find_duplicates, jaro_winkler, soundex
+from .emails import load_contacts_by_email, normalize_email
+from .excel_cache import file_hash, load_excel, read_excel_cached
+from .ledger import ImportLedger, key_hashes
+from .isolation import bisect_rows
+from .logs import write_log
+from .normalize import clean_frame, clean_number_string_column, clean_text_column, unique_values
+from .pipeline import PipelineStats, batched, prefetch, run_pipeline, transform_rows
+from .readers import iter_excel_rows, iter_frame_rows, read_frame
+from .refcache import ReferenceCache
+from .references import (
+    ContactRow, ReferenceTable, load_reference_map, load_reference_owners, load_reference_table,
+    split_references,
+)
+from .sinks import CopySink, ExecuteValuesSink, Sink, StatementSink, copy_text_buffer
+from .staging import stage_rows, timed
+from .sync import DerivedTable, run_sync, sync_derived_table
+from .xlsx import SharedStrings, iter_xlsx_rows, read_xlsx_frame
+
+__all__ = [
+    'DB_CONFIG', 'apply_migration', 'connect', 'require_columns', 'require_functions', 'require_index',
+    'Checkpoint',
+    'add_batch_args', 'add_ledger_args', 'add_reference_args', 'batch_controller', 'reference_lookup',
+    'iter_copy_chunks', 'read_copy_frame',
+    'clean_text', 'clean_number_string', 'clean_phone', 'clean_reference',
+    'clean_frame', 'clean_text_column', 'clean_number_string_column', 'unique_values',
+    'address_columns', 'address_frame', 'address_key', 'addresses_by_row', 'extract_addresses', 'merge_addresses',
+    'ReferenceCache', 'ReferenceTable', 'ContactRow',
+    'load_reference_map', 'load_reference_owners', 'load_reference_table', 'split_references',
+    'load_contacts_by_email', 'normalize_email',
+    'iter_excel_rows', 'iter_frame_rows', 'read_frame', 'read_excel_cached', 'load_excel', 'file_hash',
+    'iter_xlsx_rows', 'read_xlsx_frame', 'SharedStrings',
+    'Sink', 'ExecuteValuesSink', 'StatementSink', 'CopySink', 'copy_text_buffer',
+    'stage_rows', 'timed', 'bisect_rows',
+    'DerivedTable', 'run_sync', 'sync_derived_table',
+    'BatchController', 'ROW_STATEMENTS', 'lock_waits',
+    'PipelineStats', 'batched', 'prefetch', 'run_pipeline', 'transform_rows',
+    'ImportLedger', 'key_hashes',
+    'PERSON_COLUMNS', 'find_duplicates', 'jaro_winkler', 'soundex',
+    'write_log',
+]
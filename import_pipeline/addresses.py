@@ -0,0 +1,140 @@
+"""
+Previous-address extraction and merging (contacts.previous_addresses format).
+
+Addresses are deduped on a canonical key: first line and town trimmed,
+whitespace-collapsed and lower-cased, postcode upper-cased without spaces.
+canonical_address_key() in migrations/import_004_canonical_address_key.sql is
+the server-side twin used by merge_previous_addresses().
+"""
+
+import re
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import clean_text
+from .normalize import clean_text_column
+
+ADDRESS_PARTS = {
+    'address_line_1': 'First Line',
+    'city': 'Town',
+    'county': 'County',
+    'postal_code': 'Postcode',
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _fold(value) -> str:
+    return _WHITESPACE.sub(' ', str(value or '')).strip().lower()
+
+
+def address_key(addr: dict) -> str:
+    """Canonical dedupe key used for contacts.previous_addresses"""
+    postcode = _WHITESPACE.sub('', str(addr.get('postal_code') or '')).upper()
+    return f"{_fold(addr.get('address_line_1'))}|{_fold(addr.get('city'))}|{postcode}"
+
+
+def address_key_column(line1: pd.Series, city: pd.Series, postcode: pd.Series) -> pd.Series:
+    """address_key for whole columns of ''-filled strings"""
+    def fold(col):
+        return col.str.replace(r'\s+', ' ', regex=True).str.strip().str.lower()
+
+    return fold(line1) + '|' + fold(city) + '|' + postcode.str.replace(r'\s+', '', regex=True).str.upper()
+
+
+def address_columns(prefix: str, count: int, county: bool = False) -> List[str]:
+    """Column names read by extract_addresses, e.g. for clean_frame"""
+    parts = ['First Line', 'Town', 'County', 'Postcode'] if county else ['First Line', 'Town', 'Postcode']
+    return [f'{prefix} {i} - {part}' for i in range(1, count + 1) for part in parts]
+
+
+def extract_addresses(row, prefix: str, count: int, county: bool = False) -> List[dict]:
+    """
+    Extract '<prefix> N - First Line/Town/[County/]Postcode' columns (N = 1..count)
+    from a row, skipping groups with no data.
+    """
+    addresses = []
+    for i in range(1, count + 1):
+        first_line = clean_text(row.get(f'{prefix} {i} - First Line'))
+        town = clean_text(row.get(f'{prefix} {i} - Town'))
+        county_val = clean_text(row.get(f'{prefix} {i} - County')) if county else None
+        postcode = clean_text(row.get(f'{prefix} {i} - Postcode'))
+
+        # Only add if at least one field has data
+        if any([first_line, town, county_val, postcode]):
+            addresses.append({
+                'address_line_1': first_line or '',
+                'city': town or '',
+                'county': county_val or '',
+                'postal_code': postcode or ''
+            })
+    return addresses
+
+
+def address_frame(df: pd.DataFrame, prefix: str, count: int, county: bool = False) -> pd.DataFrame:
+    """
+    All '<prefix> N - ...' column groups of df as one long frame, in one pass.
+
+    One row per non-empty address: row (0-based position in df), slot (N),
+    address_line_1/city/county/postal_code ('' when empty, as extract_addresses
+    has them) and key (address_key).
+    """
+    n = len(df)
+    empty = np.full(n, None, dtype=object)
+    fields = {}
+    for field, part in ADDRESS_PARTS.items():
+        columns = [f'{prefix} {i} - {part}' for i in range(1, count + 1)]
+        fields[field] = np.concatenate([
+            clean_text_column(df[c]).to_numpy(dtype=object) if c in df.columns and (county or field != 'county')
+            else empty
+            for c in columns
+        ]) if count else np.empty(0, dtype=object)
+
+    long = pd.DataFrame({
+        'row': np.tile(np.arange(n), count),
+        'slot': np.repeat(np.arange(1, count + 1), n),
+        **fields,
+    })
+    long = long[long[list(ADDRESS_PARTS)].notna().any(axis=1)]
+    long = long.sort_values(['row', 'slot'], kind='stable').reset_index(drop=True)
+    for field in ADDRESS_PARTS:
+        long[field] = long[field].fillna('').astype(object)
+    long['key'] = address_key_column(long['address_line_1'], long['city'], long['postal_code'])
+    return long
+
+
+def addresses_by_row(df: pd.DataFrame, prefix: str, count: int, county: bool = False,
+                     keys: bool = False):
+    """
+    extract_addresses for every row of df at once, as a list aligned with df's rows.
+
+    With keys=True returns (addresses, address_keys): the second list holds each
+    address's address_key, computed column-wise by address_frame, for
+    merge_addresses(..., new_keys=).
+    """
+    out = [[] for _ in range(len(df))]
+    out_keys = [[] for _ in range(len(df))]
+    long = address_frame(df, prefix, count, county)
+    for row, line1, city, county_val, postcode, key in zip(
+            long['row'], long['address_line_1'], long['city'], long['county'], long['postal_code'], long['key']):
+        out[row].append({'address_line_1': line1, 'city': city, 'county': county_val, 'postal_code': postcode})
+        out_keys[row].append(key)
+    return (out, out_keys) if keys else out
+
+
+def merge_addresses(existing: Optional[list], new: List[dict], new_keys: Optional[List[str]] = None) -> List[dict]:
+    """
+    Append new addresses to existing ones, skipping duplicates.
+
+    new_keys are the new addresses' address_keys when already computed
+    (addresses_by_row(keys=True)); only existing addresses are keyed here then.
+    """
+    merged = list(existing) if isinstance(existing, list) else []
+    keys = {address_key(addr) for addr in merged}
+    for addr, key in zip(new, new_keys if new_keys is not None else map(address_key, new)):
+        if key not in keys:
+            merged.append(addr)
+            keys.add(key)
+    return merged
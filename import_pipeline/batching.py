@@ -0,0 +1,149 @@
+"""
+Adaptive batch sizing for DB writes.
+
+A BatchController replaces a script's fixed batch size. It times every batch
+and sizes the next one AIMD-style within [minimum, maximum]: while batches finish
+under `target` seconds and their per-row time holds steady, the size grows by
+`step` rows; when a batch overruns the target, its per-row time jumps past
+`slowdown` x the running average (slow statements), other sessions are queued on
+locks, or the batch fails with a lock/timeout error, the size is cut by
+`backoff`. Size changes are printed as they happen and summary() reports where
+the size settled, so the sizes that suit the database can be read off a run.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional
+
+# Default starting size and bounds, in rows, for multi-row statements
+# (execute_values / execute_batch pages, COPY, staged set-based statements)
+INITIAL_SIZE = 1000
+MINIMUM_SIZE = 100
+MAXIMUM_SIZE = 5000
+
+# One statement per row: smaller batches, so a slow batch holds fewer row locks
+ROW_STATEMENTS = {'initial': 100, 'minimum': 20, 'maximum': 2000}
+
+# SQLSTATEs that mean "too much at once" rather than "bad data"
+BACKOFF_ERRORS = {
+    '40001',  # serialization_failure
+    '40P01',  # deadlock_detected
+    '55P03',  # lock_not_available (lock_timeout)
+    '57014',  # query_canceled (statement_timeout)
+}
+
+
+def lock_waits(cur) -> int:
+    """Sessions in this database currently waiting on a lock"""
+    cur.execute("""
+        SELECT COUNT(*) FROM pg_stat_activity
+        WHERE datname = current_database() AND wait_event_type = 'Lock'
+    """)
+    return cur.fetchone()[0]
+
+
+class BatchController:
+    """
+    AIMD batch size for one kind of write.
+
+    Use batches(items) to cut work into lists of the current size and
+    measure(rows) around each batch's write + commit. Pass cur to also back off
+    while other sessions wait on locks (one pg_stat_activity query per batch).
+    minimum == maximum pins the size (see cli.batch_controller / --batch-size).
+    """
+
+    def __init__(self, name: str, initial: int = INITIAL_SIZE, minimum: int = MINIMUM_SIZE,
+                 maximum: int = MAXIMUM_SIZE,
+                 step: Optional[int] = None, backoff: float = 0.5, target: float = 2.0,
+                 slowdown: float = 2.0, cur=None):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = max(minimum, min(maximum, initial))
+        self.step = step or max(1, self.size // 4)
+        self.backoff = backoff
+        self.target = target
+        self.slowdown = slowdown
+        self.cur = cur
+        self.per_row = None  # running average of seconds per row
+        self.rows = 0
+        self.seconds = 0.0
+        self.batches_run = 0
+        self.backoffs = 0
+        self.smallest = self.largest = self.size
+
+    @property
+    def fixed(self) -> bool:
+        return self.minimum >= self.maximum
+
+    def batches(self, items: Iterable) -> Iterator[List]:
+        """Yield lists of items, each as long as the size at the time it is cut"""
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= self.size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @contextmanager
+    def measure(self, rows: int):
+        """Time the wrapped batch and record it; lock/timeout errors back off before re-raising"""
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.failed(e)
+            raise
+        self.record(rows, time.monotonic() - started)
+
+    def record(self, rows: int, seconds: float):
+        """Feed back one successful batch of rows that took seconds"""
+        if rows <= 0:
+            return
+        self.rows += rows
+        self.seconds += seconds
+        self.batches_run += 1
+        per_row = seconds / rows
+
+        reason = None
+        if seconds > self.target:
+            reason = f"slow batch, {seconds:.2f}s > {self.target:.1f}s target"
+        elif self.per_row is not None and per_row > self.per_row * self.slowdown:
+            reason = f"statement time up, {per_row * 1000:.2f}ms/row vs {self.per_row * 1000:.2f}ms avg"
+        elif self.cur is not None and not self.fixed:
+            waiting = lock_waits(self.cur)
+            if waiting:
+                reason = f"{waiting} session(s) waiting on locks"
+        self.per_row = per_row if self.per_row is None else 0.8 * self.per_row + 0.2 * per_row
+
+        if reason:
+            self._resize(int(self.size * self.backoff), reason)
+        elif rows >= self.size:
+            # Only grow on full batches: a short tail says nothing about a bigger size
+            self._resize(self.size + self.step, None)
+
+    def failed(self, error: Exception):
+        """Back off after a batch failed for lock or timeout reasons (data errors are left alone)"""
+        code = getattr(error, 'pgcode', None)
+        if code in BACKOFF_ERRORS:
+            self._resize(int(self.size * self.backoff), f"{type(error).__name__} ({code})")
+
+    def _resize(self, size: int, reason: Optional[str]):
+        size = max(self.minimum, min(self.maximum, size))
+        if size == self.size:
+            return
+        if reason:
+            self.backoffs += 1
+            print(f"    [{self.name}] batch size {self.size} -> {size}: {reason}", flush=True)
+        else:
+            print(f"    [{self.name}] batch size {self.size} -> {size}", flush=True)
+        self.size = size
+        self.smallest = min(self.smallest, size)
+        self.largest = max(self.largest, size)
+
+    def summary(self) -> str:
+        rate = self.rows / self.seconds if self.seconds else 0.0
+        return (f"[{self.name}] {self.batches_run} batches, final size {self.size} "
+                f"(range {self.smallest}-{self.largest}, {self.backoffs} backoffs), {rate:,.0f} rows/sec")
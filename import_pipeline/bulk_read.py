@@ -0,0 +1,148 @@
+"""
+Bulk reads with COPY (SELECT ...) TO STDOUT.
+
+Much cheaper than fetchall() on a client-side cursor for whole-table loads:
+Postgres streams text rows, which are parsed a chunk at a time into DataFrames
+(all values str or None) instead of building a Python tuple per row up front.
+The COPY runs on a background thread feeding a bounded queue, so at most a
+couple of chunks are held in memory at once.
+"""
+
+import csv
+import io
+import json
+import queue
+import re
+import threading
+from typing import Iterable, Iterator, Sequence
+
+import pandas as pd
+
+_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v', '\\': '\\'}
+_ESCAPE_RE = re.compile(r'\\(.)')
+_DONE = object()
+
+
+class _ChunkWriter:
+    """File-like target for copy_expert that hands off complete-line chunks"""
+
+    def __init__(self, chunks: queue.Queue, chunk_rows: int, stop: threading.Event):
+        self.chunks = chunks
+        self.chunk_rows = chunk_rows
+        self.stop = stop
+        self.parts = []
+        self.lines = 0
+
+    def write(self, data):
+        if self.stop.is_set():
+            return len(data)  # consumer gone: discard until the cancel lands
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        self.parts.append(data)
+        self.lines += data.count('\n')
+        if self.lines >= self.chunk_rows:
+            text = ''.join(self.parts)
+            cut = text.rfind('\n') + 1
+            self.chunks.put(text[:cut])
+            self.parts = [text[cut:]]
+            self.lines = 0
+        return len(data)
+
+    def flush_remaining(self):
+        text = ''.join(self.parts)
+        if text:
+            self.chunks.put(text)
+
+
+def _unescape(value):
+    if value is None or '\\' not in value:
+        return value
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def _parse_chunk(text: str, columns: Sequence[str], json_columns: Iterable[str]) -> pd.DataFrame:
+    df = pd.read_csv(io.StringIO(text), sep='\t', header=None, names=list(columns), dtype=str,
+                     quoting=csv.QUOTE_NONE, keep_default_na=False, na_values=['\\N'],
+                     skip_blank_lines=False)
+    for column in df.columns:
+        values = df[column].to_numpy(dtype=object)
+        values[pd.isna(values)] = None
+        if any(isinstance(v, str) and '\\' in v for v in values):
+            values = [_unescape(v) for v in values]
+        if column in json_columns:
+            values = [json.loads(v) if v is not None else None for v in values]
+        df[column] = pd.Series(values, index=df.index, dtype=object)
+    return df
+
+
+def iter_copy_chunks(cur, query: str, columns: Sequence[str], params=None, chunk_rows: int = 50000,
+                     json_columns: Iterable[str] = ()) -> Iterator[pd.DataFrame]:
+    """
+    Stream a SELECT through COPY TO STDOUT as DataFrames of up to ~chunk_rows rows.
+
+    columns names the SELECT's output columns in order; json_columns are decoded
+    with json.loads. The COPY runs under a savepoint (unless the connection is in
+    autocommit): stopping early cancels it and a failing COPY re-raises, in both
+    cases after rolling back to that savepoint, so the caller's transaction and
+    its uncommitted work are left as they were. Committing or rolling back is
+    always the caller's decision.
+    """
+    sql = cur.mogrify(query, params).decode() if params is not None else query
+    conn = cur.connection
+    savepoint = not conn.autocommit
+    chunks = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    json_columns = set(json_columns)
+
+    def run_copy():
+        writer = _ChunkWriter(chunks, chunk_rows, stop)
+        try:
+            cur.copy_expert(f"COPY ({sql}) TO STDOUT", writer)
+            writer.flush_remaining()
+            chunks.put(_DONE)
+        except Exception as e:
+            chunks.put(e)
+
+    if savepoint:
+        cur.execute("SAVEPOINT copy_chunks")
+    thread = threading.Thread(target=run_copy, daemon=True)
+    thread.start()
+    finished = failed = False
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                finished = True
+                return
+            if isinstance(item, Exception):
+                finished = failed = True
+                thread.join()
+                if savepoint:
+                    cur.execute("ROLLBACK TO SAVEPOINT copy_chunks")
+                    cur.execute("RELEASE SAVEPOINT copy_chunks")
+                raise item
+            yield _parse_chunk(item, columns, json_columns)
+    finally:
+        if not finished:
+            stop.set()
+            if thread.is_alive():
+                conn.cancel()
+            while thread.is_alive() or not chunks.empty():
+                try:
+                    chunks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        thread.join()
+        if savepoint and not failed:
+            if not finished:
+                cur.execute("ROLLBACK TO SAVEPOINT copy_chunks")
+            cur.execute("RELEASE SAVEPOINT copy_chunks")
+
+
+def read_copy_frame(cur, query: str, columns: Sequence[str], params=None, chunk_rows: int = 50000,
+                    json_columns: Iterable[str] = ()) -> pd.DataFrame:
+    """iter_copy_chunks collected into a single DataFrame"""
+    frames = list(iter_copy_chunks(cur, query, columns, params, chunk_rows, json_columns))
+    if not frames:
+        return pd.DataFrame(columns=list(columns), dtype=object)
+    return pd.concat(frames, ignore_index=True)
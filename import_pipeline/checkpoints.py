@@ -0,0 +1,50 @@
+"""
+Checkpoints for resumable imports.
+
+A Checkpoint tracks, per (job, input file hash, phase), how many source rows
+have been committed. record() is called on the importer's cursor just before
+each batch commit, so the checkpoint and the batch commit together; after an
+SSL drop or failover, --resume starts from the first uncommitted row instead
+of re-running (and re-inserting) the whole file.
+"""
+
+from typing import Dict
+
+from .db import apply_migration
+from .excel_cache import file_hash
+
+
+class Checkpoint:
+    def __init__(self, conn, job: str, path: str, resume: bool = False):
+        """Without resume, any earlier progress for this job and file is discarded"""
+        self.job = job
+        self.source_hash = file_hash(path)
+        self.progress: Dict[str, int] = {}
+        apply_migration(conn, 'import_005_import_checkpoints')
+
+        with conn.cursor() as cur:
+            if resume:
+                cur.execute("SELECT phase, done FROM import_checkpoints WHERE job = %s AND source_hash = %s",
+                            (job, self.source_hash))
+                self.progress = dict(cur.fetchall())
+            else:
+                cur.execute("DELETE FROM import_checkpoints WHERE job = %s AND source_hash = %s",
+                            (job, self.source_hash))
+        conn.commit()
+
+        for phase, done in sorted(self.progress.items()):
+            print(f"    Resuming {phase}: {done} rows already committed", flush=True)
+
+    def done(self, phase: str = 'rows') -> int:
+        """Source rows of phase already committed (0 on a fresh run)"""
+        return self.progress.get(phase, 0)
+
+    def record(self, cur, done: int, phase: str = 'rows'):
+        """Mark rows 1..done of phase as committed; call before the batch's commit"""
+        cur.execute("""
+            INSERT INTO import_checkpoints (job, source_hash, phase, done)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (job, source_hash, phase) DO UPDATE
+            SET done = EXCLUDED.done, updated_at = NOW()
+        """, (self.job, self.source_hash, phase, done))
+        self.progress[phase] = done
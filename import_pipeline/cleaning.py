@@ -0,0 +1,28 @@
+"""
+Cell-level cleaning helpers shared by the importers.
+"""
+
+import pandas as pd
+
+
+def clean_text(val):
+    """Clean text value, return None if NaN/empty"""
+    if val is None or pd.isna(val):
+        return None
+    s = str(val).strip()
+    if s == '' or s.lower() in ('nan', 'none'):
+        return None
+    return s
+
+
+def clean_number_string(val):
+    """Clean a value Excel may have stored as float - remove trailing .0"""
+    s = clean_text(val)
+    if s is not None and s.endswith('.0'):
+        s = s[:-2]
+    return s or None
+
+
+# Phone numbers and references both come through as floats from pandas
+clean_phone = clean_number_string
+clean_reference = clean_number_string
@@ -0,0 +1,58 @@
+"""
+Command-line options shared by the importers.
+"""
+
+import argparse
+from contextlib import contextmanager
+from typing import Iterator
+
+import pandas as pd
+
+from .batching import BatchController
+from .normalize import unique_values
+from .refcache import ReferenceCache
+
+
+def add_reference_args(parser: argparse.ArgumentParser):
+    """--ref-index / --ref-cache: how load_reference_map finds contacts"""
+    parser.add_argument('--ref-index', action='store_true',
+                        help="Look up only this file's references via contact_references instead of scanning contacts")
+    parser.add_argument('--ref-cache', action='store_true',
+                        help="Resolve references from the local incremental snapshot (~/.cache/crm_import)")
+
+
+def add_ledger_args(parser: argparse.ArgumentParser):
+    """--full: bypass the row-hash ledger (ImportLedger) and process every row"""
+    parser.add_argument('--full', action='store_true',
+                        help="Process every row, not only rows new or changed since the last import")
+
+
+@contextmanager
+def reference_lookup(args, df: pd.DataFrame, column: str = 'Reference') -> Iterator[dict]:
+    """
+    load_reference_map keyword arguments for the chosen --ref-* option:
+        with reference_lookup(args, df) as lookup:
+            ref_to_contact = load_reference_map(cur, columns, **lookup)
+    A --ref-cache ReferenceCache is closed on leaving the block.
+    """
+    if args.ref_cache:
+        with ReferenceCache() as cache:
+            yield {'references': unique_values(df, column), 'cache': cache}
+    elif args.ref_index:
+        yield {'references': unique_values(df, column)}
+    else:
+        yield {}
+
+
+def add_batch_args(parser: argparse.ArgumentParser):
+    """--batch-size: pin the write batch size instead of letting BatchController adapt it"""
+    parser.add_argument('--batch-size', type=int, metavar='N',
+                        help="Write in fixed batches of N rows (default: adapt to measured latency)")
+
+
+def batch_controller(args, name: str, **kwargs) -> BatchController:
+    """BatchController for name, pinned to --batch-size when one was given"""
+    size = getattr(args, 'batch_size', None)
+    if size:
+        kwargs.update(initial=size, minimum=size, maximum=size)
+    return BatchController(name, **kwargs)
@@ -0,0 +1,75 @@
+"""
+Shared database configuration for the Excel → Postgres importers.
+"""
+
+import os
+from pathlib import Path
+from typing import Sequence
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / 'migrations'
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST'),
+    'database': os.getenv('DB_NAME'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD'),
+    'port': os.getenv('DB_PORT', 5432)
+}
+
+
+def connect(**overrides):
+    """Open a connection using DB_CONFIG, e.g. connect(sslmode='require')"""
+    return psycopg2.connect(**{**DB_CONFIG, **overrides})
+
+
+def apply_migration(conn, name: str):
+    """Run migrations/<name>.sql (written to be idempotent) and commit"""
+    sql = (MIGRATIONS_DIR / f'{name}.sql').read_text()
+    with conn.cursor() as cur:
+        cur.execute(sql)
+    conn.commit()
+
+
+def _require(migration: str, missing: str):
+    raise SystemExit(f"{missing}: apply migrations/{migration}.sql first (outside busy hours)")
+
+
+def require_columns(cur, table: str, columns: Sequence[str], migration: str):
+    """
+    Exit unless table has all of columns.
+
+    Migrations that take heavy locks (table rewrites, unique indexes) are
+    applied once by an operator, not on every importer run; the importers only
+    check that they are in place.
+    """
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = ANY(%s)
+    """, (table, list(columns)))
+    missing = sorted(set(columns) - {row[0] for row in cur.fetchall()})
+    if missing:
+        _require(migration, f"{table} is missing {', '.join(missing)}")
+
+
+def require_index(cur, index: str, migration: str):
+    """Exit unless index exists (see require_columns)"""
+    cur.execute("SELECT to_regclass(%s)", (index,))
+    if cur.fetchone()[0] is None:
+        _require(migration, f"index {index} does not exist")
+
+
+
+def require_functions(cur, functions: Sequence[str], migration: str):
+    """Exit unless every named SQL function exists (see require_columns)"""
+    cur.execute("""
+        SELECT DISTINCT p.proname FROM pg_proc p
+        WHERE pg_function_is_visible(p.oid) AND p.proname = ANY(%s)
+    """, (list(functions),))
+    missing = sorted(set(functions) - {row[0] for row in cur.fetchall()})
+    if missing:
+        _require(migration, f"function {', '.join(missing)} does not exist")
@@ -0,0 +1,264 @@
+"""
+Fuzzy duplicate detection for contacts/leads.
+
+Comparing every pair of 100K people is 5 billion comparisons. Instead, each
+blocking key (postcode, dob, email domain, surname sound + first initial, and
+exact email / phone to catch re-typed names) sorts the people by that key and
+then by name, and each person is compared only with the next `window` people
+sharing its key (sorted neighbourhood). That is at most len(keys) * window
+comparisons per person, so the work grows linearly.
+
+Candidate pairs are scored from name similarity (Jaro-Winkler) plus agreement on
+dob, email, phone and postcode. Pairs at or above the threshold are joined into
+clusters. rapidfuzz is used for Jaro-Winkler when installed; otherwise a pure
+Python version is used.
+"""
+
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from rapidfuzz.distance import JaroWinkler
+    HAVE_RAPIDFUZZ = True
+except ImportError:
+    HAVE_RAPIDFUZZ = False
+
+PERSON_COLUMNS = ['id', 'first_name', 'last_name', 'email', 'phone', 'dob', 'postal_code']
+
+# Field weights in the pair score (only fields present on both sides count)
+WEIGHTS = {'first_name': 0.2, 'last_name': 0.25, 'dob': 0.2, 'email': 0.2, 'phone': 0.1, 'postcode': 0.05}
+EVIDENCE = ('dob', 'email', 'phone', 'postcode')
+# A name-only match is never enough, and a shared postcode only says "same household"
+IDENTIFIERS = ('dob', 'email', 'phone')
+
+_SOUNDEX = str.maketrans('bfpvcgjkqsxzdtlmnr', '111122222222334556')
+_NOT_LETTERS = re.compile(r'[^a-z]')
+_NOT_DIGITS = re.compile(r'\D')
+
+
+def soundex(name: Optional[str]) -> str:
+    """American Soundex code: 'Robert'/'Rupert' → 'R163', '' for no letters"""
+    name = _NOT_LETTERS.sub('', (name or '').lower())
+    if not name:
+        return ''
+    codes = name.translate(_SOUNDEX)
+    out = name[0].upper()
+    last = codes[0]
+    for letter, code in zip(name[1:], codes[1:]):
+        if code.isdigit() and code != last:
+            out += code
+            if len(out) == 4:
+                break
+        if letter not in 'hw':  # h/w don't separate equal codes; vowels do
+            last = code
+    return out.ljust(4, '0')
+
+
+def _jaro_winkler(a: str, b: str) -> float:
+    if a == b:
+        return 1.0 if a else 0.0
+    if not a or not b:
+        return 0.0
+    span = max(len(a), len(b)) // 2 - 1
+    a_hit = [False] * len(a)
+    b_hit = [False] * len(b)
+    matches = 0
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - span), min(len(b), i + span + 1)):
+            if not b_hit[j] and b[j] == ch:
+                a_hit[i] = b_hit[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    b_matched = [ch for ch, hit in zip(b, b_hit) if hit]
+    transpositions = sum(ch != b_matched[k] for k, ch in enumerate(ch for ch, hit in zip(a, a_hit) if hit)) / 2
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def jaro_winkler(a: str, b: str) -> float:
+    """Jaro-Winkler similarity in [0, 1]"""
+    if HAVE_RAPIDFUZZ:
+        return JaroWinkler.similarity(a, b)
+    return _jaro_winkler(a, b)
+
+
+def _similarities(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """jaro_winkler element-wise, computed once per distinct (x, y)"""
+    if not len(xs):
+        return np.zeros(0)
+    pairs = pd.DataFrame({'x': xs, 'y': ys})
+    codes, distinct = pd.factorize(pd.MultiIndex.from_frame(pairs))
+    scores = np.array([jaro_winkler(x, y) for x, y in distinct])
+    return scores[codes]
+
+
+def prepare_people(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalized comparison columns for a PERSON_COLUMNS frame (values str or None)"""
+    def text(column):
+        return df[column].fillna('').astype(str)
+
+    people = pd.DataFrame({'id': df['id'].to_numpy()})
+    people['first_name'] = text('first_name').str.lower().str.replace(_NOT_LETTERS, '', regex=True).to_numpy()
+    people['last_name'] = text('last_name').str.lower().str.replace(_NOT_LETTERS, '', regex=True).to_numpy()
+    email = text('email').str.strip().str.lower()
+    people['email'] = email.to_numpy()
+    people['email_domain'] = email.str.split('@', n=1).str[1].fillna('').to_numpy()
+    phone = text('phone').str.replace(_NOT_DIGITS, '', regex=True).str.replace(r'^44', '0', regex=True)
+    people['phone'] = phone.str[-10:].where(phone.str.len() >= 10, '').to_numpy()
+    people['dob'] = text('dob').str[:10].to_numpy()
+    people['postcode'] = text('postal_code').str.upper().str.replace(r'\s+', '', regex=True).to_numpy()
+    people['surname_sound'] = [soundex(n) for n in people['last_name']]
+    return people
+
+
+BLOCKING_KEYS: Dict[str, Callable[[pd.DataFrame], pd.Series]] = {
+    'postcode': lambda p: p['postcode'],
+    'dob': lambda p: p['dob'],
+    'email_domain': lambda p: p['email_domain'],
+    'email': lambda p: p['email'],
+    'phone': lambda p: p['phone'],
+    'surname_sound': lambda p: p['surname_sound'] + p['first_name'].str[:1],
+}
+
+
+def candidate_pairs(people: pd.DataFrame, window: int = 10,
+                    keys: Optional[Dict[str, Callable]] = None) -> pd.DataFrame:
+    """
+    (a, b) row positions (a < b) to compare: for each blocking key, people
+    sorted by (key, last name, first name), each paired with the next window - 1
+    people that have the same key. Empty keys don't block.
+    """
+    parts = []
+    for name, key_of in (keys or BLOCKING_KEYS).items():
+        key = key_of(people).to_numpy()
+        order = pd.DataFrame({'key': key, 'ln': people['last_name'], 'fn': people['first_name']})
+        order = order[order['key'] != ''].sort_values(['key', 'ln', 'fn'], kind='stable')
+        positions = order.index.to_numpy()
+        sorted_keys = order['key'].to_numpy()
+        for offset in range(1, window):
+            if offset >= len(positions):
+                break
+            same = sorted_keys[:-offset] == sorted_keys[offset:]
+            parts.append(np.stack([positions[:-offset][same], positions[offset:][same]], axis=1))
+    if not parts:
+        return pd.DataFrame({'a': [], 'b': []}, dtype=np.int64)
+    pairs = np.concatenate(parts)
+    pairs.sort(axis=1)
+    pairs = np.unique(pairs, axis=0)
+    return pd.DataFrame(pairs, columns=['a', 'b'])
+
+
+def score_pairs(people: pd.DataFrame, pairs: pd.DataFrame) -> pd.DataFrame:
+    """
+    pairs with a score column: the weighted mean of per-field similarities over
+    fields present on both sides. Names use Jaro-Winkler (either name order);
+    dob counts 0.8 for a swapped day/month; other fields are exact. Pairs
+    without a dob, email or phone on both sides (names and postcode at most)
+    score 0.
+    """
+    a = pairs['a'].to_numpy()
+    b = pairs['b'].to_numpy()
+    total = np.zeros(len(pairs))
+    weight = np.zeros(len(pairs))
+    evidence = np.zeros(len(pairs), dtype=bool)
+
+    def add(field, similarity, present):
+        nonlocal total, weight
+        total = total + np.where(present, similarity * WEIGHTS[field], 0.0)
+        weight = weight + np.where(present, WEIGHTS[field], 0.0)
+
+    first = people['first_name'].to_numpy()
+    last = people['last_name'].to_numpy()
+    straight_first = _similarities(first[a], first[b])
+    straight_last = _similarities(last[a], last[b])
+    # First/last swapped: only worth checking when the initials cross over
+    cross = np.flatnonzero((people['first_name'].str[:1].to_numpy()[a] == people['last_name'].str[:1].to_numpy()[b])
+                           & (people['last_name'].str[:1].to_numpy()[a] == people['first_name'].str[:1].to_numpy()[b])
+                           & (first[a] != ''))
+    swapped = np.zeros(len(pairs))
+    swapped[cross] = (_similarities(first[a[cross]], last[b[cross]])
+                      + _similarities(last[a[cross]], first[b[cross]])) / 2
+    use_swapped = swapped > (straight_first + straight_last) / 2
+    add('first_name', np.where(use_swapped, swapped, straight_first), (first[a] != '') & (first[b] != ''))
+    add('last_name', np.where(use_swapped, swapped, straight_last), (last[a] != '') & (last[b] != ''))
+
+    for field in EVIDENCE:
+        values = people[field].to_numpy()
+        present = (values[a] != '') & (values[b] != '')
+        similarity = (values[a] == values[b]).astype(float)
+        if field == 'dob':
+            swapped_dob = np.array([x[:5] + x[8:10] + x[4:7] if len(x) == 10 else x for x in values[a]], dtype=object)
+            similarity = np.where((similarity == 0) & (swapped_dob == values[b]), 0.8, similarity)
+        add(field, similarity, present)
+        if field in IDENTIFIERS:
+            evidence |= present
+
+    scored = pairs.copy()
+    scored['score'] = np.where(evidence & (weight > 0), total / np.maximum(weight, 1e-9), 0.0).round(4)
+    return scored
+
+
+def cluster_pairs(pairs: pd.DataFrame, threshold: float) -> Dict[int, int]:
+    """Row position → cluster number (union-find over pairs scoring >= threshold)"""
+    parent: Dict[int, int] = {}
+
+    def find(x):
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while parent.get(x, x) != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for a, b in pairs.loc[pairs['score'] >= threshold, ['a', 'b']].itertuples(index=False, name=None):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    roots: Dict[int, int] = {}
+    clusters = {}
+    for position in sorted(set(parent) | set(parent.values())):
+        clusters[position] = roots.setdefault(find(position), len(roots) + 1)
+    return clusters
+
+
+def find_duplicates(df: pd.DataFrame, window: int = 10,
+                    threshold: float = 0.85) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Candidate duplicate clusters in a PERSON_COLUMNS frame.
+
+    Returns (clusters, pairs): clusters has one row per member (cluster, the
+    original columns, best_score = its highest pair score within the cluster);
+    pairs has every scored pair at or above threshold (id_a, id_b, score).
+    """
+    people = prepare_people(df)
+    pairs = score_pairs(people, candidate_pairs(people, window))
+    print(f"    Compared {len(pairs):,} candidate pairs "
+          f"({len(pairs) / max(len(people), 1):.1f} per person)", flush=True)
+
+    matches = pairs[pairs['score'] >= threshold]
+    clusters = cluster_pairs(matches, threshold)
+    best = pd.concat([matches[['a', 'score']].rename(columns={'a': 'position'}),
+                      matches[['b', 'score']].rename(columns={'b': 'position'})])
+    best = best.groupby('position')['score'].max()
+
+    positions = np.array(sorted(clusters), dtype=np.int64)
+    members = df.iloc[positions].reset_index(drop=True)
+    members.insert(0, 'cluster', [clusters[p] for p in positions])
+    members['best_score'] = best.reindex(positions).to_numpy()
+    members = members.sort_values(['cluster', 'best_score'], ascending=[True, False], kind='stable')
+
+    ids = df['id'].to_numpy()
+    matched_pairs = pd.DataFrame({'id_a': ids[matches['a'].to_numpy()], 'id_b': ids[matches['b'].to_numpy()],
+                                  'score': matches['score'].to_numpy()})
+    return members.reset_index(drop=True), matched_pairs.sort_values('score', ascending=False, kind='stable')
@@ -0,0 +1,34 @@
+"""
+Email → contact lookups.
+
+Spreadsheet emails are matched to contacts.email_normalized (lower-cased,
+trimmed; migrations/import_010_email_normalized.sql), so only the emails in the
+file are looked up through its index instead of loading every contact.
+"""
+
+from typing import Dict, Iterable, Sequence
+
+
+def normalize_email(email) -> str:
+    """The contacts.email_normalized form of an email ('' for none)"""
+    if email is None:
+        return ''
+    return str(email).strip().lower()
+
+
+def load_contacts_by_email(cur, emails: Iterable[str], columns: Sequence[str] = ()) -> Dict[str, tuple]:
+    """
+    normalized email → (id, *columns) for contacts with one of the given emails.
+
+    columns are SQL expressions over contacts. When several contacts share an
+    email the newest (highest id) wins.
+    """
+    wanted = sorted({normalize_email(e) for e in emails} - {''})
+    select = ', '.join(['c.email_normalized', 'c.id', *columns])
+    cur.execute(f"""
+        SELECT DISTINCT ON (c.email_normalized) {select}
+        FROM unnest(%s::text[]) AS wanted(key)
+        JOIN contacts c ON c.email_normalized = wanted.key
+        ORDER BY c.email_normalized, c.id DESC
+    """, (wanted,))
+    return {row[0]: row[1:] for row in cur.fetchall()}
@@ -0,0 +1,100 @@
+"""
+Columnar cache for slow Excel reads.
+
+pd.read_excel (openpyxl) dominates the runtime of the importers and several of
+them parse the same workbook. The first read of a workbook is stored as
+Parquet under ~/.cache/crm_import, keyed by the file's content hash, and later
+reads of an unchanged file come from there. pyarrow is optional: without it
+(or for sheets Parquet can't represent, e.g. mixed-type columns) the frame is
+pickled instead.
+"""
+
+import hashlib
+import os
+from typing import Optional, Sequence
+
+import pandas as pd
+
+from .refcache import CACHE_DIR
+from .xlsx import read_xlsx_frame
+
+try:
+    import pyarrow  # noqa: F401
+    HAVE_PARQUET = True
+except ImportError:
+    HAVE_PARQUET = False
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """sha256 of the file contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_base(path: str, sheet_name, spec: tuple) -> str:
+    base = f"xlsx_{file_hash(path)[:32]}_{sheet_name}"
+    if any(spec):
+        # Projected/typed reads are cached separately from the plain full-sheet read
+        base += '_' + hashlib.sha256(repr(spec).encode()).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, base)
+
+
+def _write_cache(df: pd.DataFrame, base: str):
+    """Write atomically so an interrupted run never leaves a truncated cache file"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if HAVE_PARQUET:
+        try:
+            df.to_parquet(base + '.parquet.tmp')
+            os.replace(base + '.parquet.tmp', base + '.parquet')
+            return
+        except (ValueError, TypeError, pyarrow.ArrowException):
+            if os.path.exists(base + '.parquet.tmp'):
+                os.remove(base + '.parquet.tmp')
+    df.to_pickle(base + '.pkl.tmp', compression=None)
+    os.replace(base + '.pkl.tmp', base + '.pkl')
+
+
+def load_excel(path: str, sheet_name=0, columns: Optional[Sequence[str]] = None,
+               dtype: Optional[dict] = None, strip_columns: bool = False) -> pd.DataFrame:
+    """
+    Parse a workbook (no cache). The first sheet of an .xlsx goes through the
+    streaming reader (xlsx.py); anything else through pd.read_excel.
+    """
+    if sheet_name == 0 and path.lower().endswith('.xlsx'):
+        return read_xlsx_frame(path, columns=columns, dtype=dtype, strip_columns=strip_columns)
+
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    if strip_columns:
+        df.columns = df.columns.str.strip()
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    if dtype:
+        df = df.astype({c: t for c, t in dtype.items() if c in df.columns})
+    return df
+
+
+def read_excel_cached(path: str, sheet_name=0, columns: Optional[Sequence[str]] = None,
+                      dtype: Optional[dict] = None, strip_columns: bool = False,
+                      refresh: bool = False) -> pd.DataFrame:
+    """
+    load_excel() served from the columnar cache when the file is unchanged.
+
+    The cache entry is keyed by the file hash plus the columns/dtype/strip_columns
+    asked for. refresh ignores and rewrites an existing entry.
+    """
+    spec = (tuple(columns or ()), tuple(sorted((c, str(t)) for c, t in (dtype or {}).items())), strip_columns)
+    base = _cache_base(path, sheet_name, spec)
+    if not refresh:
+        if HAVE_PARQUET and os.path.exists(base + '.parquet'):
+            print("    (from Parquet cache)", flush=True)
+            return pd.read_parquet(base + '.parquet')
+        if os.path.exists(base + '.pkl'):
+            print("    (from pickle cache)", flush=True)
+            return pd.read_pickle(base + '.pkl', compression=None)
+
+    df = load_excel(path, sheet_name, columns=columns, dtype=dtype, strip_columns=strip_columns)
+    _write_cache(df, base)
+    return df
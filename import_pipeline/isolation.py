@@ -0,0 +1,40 @@
+"""
+Bad-row isolation for failed batches.
+
+When a batch statement fails, the batch is retried by recursive bisection
+under savepoints: a failing half is split again until single rows remain. With
+k bad rows in a batch of n this takes O(k log n) statements instead of n, every
+good row still lands in the same transaction, and each bad row comes back with
+the error that rejected it.
+"""
+
+from typing import Callable, List, Sequence, Tuple
+
+
+def bisect_rows(cur, execute: Callable[[Sequence], object], rows: Sequence,
+                depth: int = 0) -> List[Tuple[object, Exception]]:
+    """
+    Run execute(rows) under a savepoint, bisecting on failure.
+
+    Returns [(row, error)] for the rows that fail on their own; the rest are
+    applied in the current transaction (the caller commits). Connection-level
+    errors raised while managing savepoints propagate.
+    """
+    if not rows:
+        return []
+    savepoint = f"bisect_{depth}"
+    cur.execute(f"SAVEPOINT {savepoint}")
+    try:
+        execute(rows)
+    except Exception as e:
+        cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+        if len(rows) == 1:
+            bad = [(rows[0], e)]
+        else:
+            mid = len(rows) // 2
+            bad = (bisect_rows(cur, execute, rows[:mid], depth + 1)
+                   + bisect_rows(cur, execute, rows[mid:], depth + 1))
+    else:
+        bad = []
+    cur.execute(f"RELEASE SAVEPOINT {savepoint}")
+    return bad
@@ -0,0 +1,84 @@
+"""
+Row-hash import ledger.
+
+Updated versions of the same spreadsheets arrive every week with most rows
+unchanged. The ledger keeps, per importer ("source") and business key, a hash
+of the values last applied (import_row_hashes, migrations/import_006). Before
+processing, rows whose key hashes the same as last time are dropped; after the
+writes commit, the hashes of the keys actually applied are recorded.
+
+Rows sharing a key (several lenders for one Reference) hash together, so a
+change to any of them re-processes all of them.
+"""
+
+import hashlib
+from typing import Dict, Iterable, Sequence
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from .db import apply_migration
+from .staging import stage_rows
+
+
+def key_hashes(df: pd.DataFrame, key: str, columns: Sequence[str]) -> Dict[str, str]:
+    """business key -> hash of its rows' values in columns (row order doesn't matter)"""
+    columns = [c for c in columns if c in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns].astype(object), index=False).to_numpy()
+    grouped = {}
+    for k, h in zip(df[key].to_numpy(dtype=object), row_hashes):
+        if k is not None and not pd.isna(k):
+            grouped.setdefault(str(k), []).append(int(h))
+    return {
+        k: hashlib.blake2b(b''.join(h.to_bytes(8, 'little') for h in sorted(hs)), digest_size=16).hexdigest()
+        for k, hs in grouped.items()
+    }
+
+
+class ImportLedger:
+    def __init__(self, conn, source: str, enabled: bool = True):
+        """With enabled=False (--full) nothing is skipped, but hashes are still recorded"""
+        self.conn = conn
+        self.source = source
+        self.enabled = enabled
+        self.hashes: Dict[str, str] = {}
+        self.skipped = 0
+        apply_migration(conn, 'import_006_import_row_hashes')
+
+    def changed_rows(self, df: pd.DataFrame, key: str, columns: Sequence[str]) -> pd.DataFrame:
+        """df without the rows whose key is unchanged since the last recorded import"""
+        self.hashes = key_hashes(df, key, columns)
+        if not self.enabled or not self.hashes:
+            return df
+
+        with self.conn.cursor() as cur:
+            stage_rows(cur, 'ledger_check', [('business_key', 'TEXT'), ('row_hash', 'TEXT')], self.hashes.items())
+            cur.execute("""
+                SELECT l.business_key
+                FROM ledger_check l
+                JOIN import_row_hashes r
+                  ON r.source = %s AND r.business_key = l.business_key AND r.row_hash = l.row_hash
+            """, (self.source,))
+            unchanged = {row[0] for row in cur.fetchall()}
+        self.conn.commit()
+
+        keep = ~df[key].map(lambda k: k is not None and not pd.isna(k) and str(k) in unchanged).astype(bool)
+        self.skipped = int((~keep).sum())
+        print(f"    Ledger: skipping {self.skipped} unchanged rows ({len(unchanged)} keys), "
+              f"{int(keep.sum())} new or changed", flush=True)
+        return df[keep]
+
+    def record(self, keys: Iterable[str]):
+        """Store the current hashes of keys that were applied, and commit"""
+        rows = [(self.source, k, self.hashes[k]) for k in {str(k) for k in keys} if k in self.hashes]
+        if not rows:
+            return
+        with self.conn.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO import_row_hashes (source, business_key, row_hash)
+                VALUES %s
+                ON CONFLICT (source, business_key) DO UPDATE
+                SET row_hash = EXCLUDED.row_hash, imported_at = NOW()
+            """, rows, page_size=1000)
+        self.conn.commit()
+        print(f"    Ledger: recorded {len(rows)} keys", flush=True)
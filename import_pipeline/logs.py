@@ -0,0 +1,20 @@
+"""
+Plain-text run logs written by the importers.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+
+def write_log(path: str, title: str, entries: Iterable[str], summary: Optional[Dict[str, object]] = None):
+    """Write a timestamped log file: title, optional summary block, then one entry per line"""
+    with open(path, 'w') as f:
+        f.write(f"{title} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write("=" * 80 + "\n")
+        if summary:
+            for label, value in summary.items():
+                f.write(f"{label}: {value}\n")
+            f.write("=" * 80 + "\n")
+        f.write("\n")
+        for entry in entries:
+            f.write(entry + "\n")
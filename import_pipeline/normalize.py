@@ -0,0 +1,94 @@
+"""
+Vectorized column cleaning.
+
+Same rules as the cell-level helpers in cleaning.py, applied to whole DataFrame
+columns at once so per-row loops only deal with matching logic.
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+NULL_STRINGS = ('', 'nan', 'none')
+
+
+def _clean_strings(col: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    """Positions and stripped values of col's non-null, non-empty entries"""
+    positions = np.flatnonzero(col.notna().to_numpy())
+    text = pd.Series(col.to_numpy(dtype=object)[positions], dtype=object).astype(str).str.strip()
+    keep = (~text.str.lower().isin(NULL_STRINGS)).to_numpy()
+    return positions[keep], text[keep]
+
+
+def _to_column(positions: np.ndarray, values: pd.Series, like: pd.Series) -> pd.Series:
+    """Full-length object column shaped like `like`, None everywhere but positions"""
+    out = np.full(len(like), None, dtype=object)
+    out[positions] = values.to_numpy(dtype=object)
+    return pd.Series(out, index=like.index, dtype=object)
+
+
+def clean_text_column(col: pd.Series) -> pd.Series:
+    """Strip values, turn NaN/empty/'nan' into None (object dtype)"""
+    return _to_column(*_clean_strings(col), col)
+
+
+def clean_number_string_column(col: pd.Series) -> pd.Series:
+    """clean_text_column plus removal of the trailing .0 Excel adds to numeric references/phones"""
+    positions, text = _clean_strings(col)
+    text = text.str.replace(r'\.0$', '', regex=True)
+    keep = (text != '').to_numpy()
+    return _to_column(positions[keep], text[keep], col)
+
+
+def _case_column(col: pd.Series, upper: bool) -> pd.Series:
+    positions, text = _clean_strings(col)
+    return _to_column(positions, text.str.upper() if upper else text.str.lower(), col)
+
+
+def _by_category(col: pd.Series, clean) -> pd.Series:
+    """Apply a column cleaner to a categorical's categories only, keeping it categorical"""
+    cleaned = clean(pd.Series(col.cat.categories.to_numpy(dtype=object), dtype=object)).to_numpy(dtype=object)
+    present = pd.notna(cleaned)
+    categories = pd.unique(cleaned[present])
+    position = {value: i for i, value in enumerate(categories)}
+    # old code → new code; the trailing -1 keeps missing (code -1) missing
+    remap = np.array([position[v] if p else -1 for v, p in zip(cleaned, present)] + [-1])
+    codes = remap[col.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=col.index, name=col.name)
+
+
+def _clean(col: pd.Series, clean) -> pd.Series:
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return _by_category(col, clean)
+    return clean(col)
+
+
+def _present(df: pd.DataFrame, columns: Iterable[str]):
+    return [c for c in columns if c in df.columns]
+
+
+def clean_frame(df: pd.DataFrame, text: Iterable[str] = (), numbers: Iterable[str] = (),
+                lower: Iterable[str] = (), upper: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Return a copy of df with the named columns cleaned.
+
+    text/lower/upper columns get clean_text_column (lower/upper also change case);
+    numbers get clean_number_string_column. Columns missing from df are ignored.
+    Categorical columns stay categorical: only their categories are cleaned.
+    """
+    cleaned = {}
+    for c in _present(df, text):
+        cleaned[c] = _clean(df[c], clean_text_column)
+    for c in _present(df, numbers):
+        cleaned[c] = _clean(df[c], clean_number_string_column)
+    for c in _present(df, lower):
+        cleaned[c] = _clean(df[c], lambda col: _case_column(col, upper=False))
+    for c in _present(df, upper):
+        cleaned[c] = _clean(df[c], lambda col: _case_column(col, upper=True))
+    return df.assign(**cleaned) if cleaned else df
+
+
+def unique_values(df: pd.DataFrame, column: str) -> list:
+    """Distinct non-null values of a (cleaned) column, e.g. the references in an input file"""
+    return df[column].dropna().unique().tolist()
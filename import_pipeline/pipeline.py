@@ -0,0 +1,222 @@
+"""
+Reader → transform → sink pipeline.
+
+Stages are plain iterators: the reader yields rows, the transform turns each row
+into a record (or raises to reject it), and records are grouped into bounded
+batches before reaching the sink, so memory stays flat regardless of file size.
+With threaded=True the reader and transform run on a background thread that
+fills a bounded queue of batches while the sink writes, so parsing overlaps DB
+round-trips and commits.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .batching import BatchController
+
+
+@dataclass
+class PipelineStats:
+    read: int = 0
+    written: int = 0
+    errors: int = 0
+    batches: int = 0
+    write_time: float = 0.0  # seconds spent in sink.write
+    rejected: List[Tuple[object, str]] = field(default_factory=list)  # (record, error) for records not written
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to size items"""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+_DONE = object()
+
+
+def prefetch(iterable: Iterable, size: int = 4) -> Iterator:
+    """
+    Iterate iterable on a background thread, up to size items ahead.
+
+    Exceptions from the producer are re-raised in the consumer; stopping early
+    tells the producer to stop after its current item.
+    """
+    items = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def transform_rows(rows: Iterable, transform: Callable, stats: PipelineStats,
+                   max_logged: int = 5) -> Iterator:
+    """Apply transform to each row, counting and skipping rows it rejects"""
+    for row in rows:
+        stats.read += 1
+        try:
+            record = transform(row)
+        except Exception as e:
+            stats.errors += 1
+            if stats.errors <= max_logged:
+                print(f"  Skipping bad row: {e}", flush=True)
+            continue
+        if record is not None:
+            yield record
+
+
+def _unchanged(row):
+    return row
+
+
+def _numbered(transform: Callable) -> Callable:
+    """transform for (position, row) items that keeps the position with the record"""
+    def apply(item):
+        position, row = item
+        record = transform(row)
+        return None if record is None else (position, record)
+    return apply
+
+
+def _record_rejected(bad: list, stats: PipelineStats, max_logged: int):
+    stats.errors += len(bad)
+    for record, error in bad:
+        stats.rejected.append((record, str(error).strip()))
+        if len(stats.rejected) <= max_logged:
+            print(f"  Bad row: {str(error).strip()} | {record}", flush=True)
+
+
+def _drop_batch(batch: list, error: Exception, stats: PipelineStats):
+    stats.errors += len(batch)
+    stats.rejected.extend((record, str(error).strip()) for record in batch)
+
+
+def _isolate_batch(sink, batch: list, before_commit, stats: PipelineStats, max_logged: int):
+    """Bisect a failed batch: commit its good rows, record the bad ones in stats.rejected"""
+    try:
+        bad = sink.write_isolating(batch, before_commit)
+    except Exception as e:
+        sink.rollback()
+        print(f"  Could not isolate bad rows, batch dropped: {e}", flush=True)
+        _drop_batch(batch, e, stats)
+        return
+    stats.written += len(batch) - len(bad)
+    _record_rejected(bad, stats, max_logged)
+    print(f"  Isolated {len(bad)} bad row(s), committed {len(batch) - len(bad)}", flush=True)
+
+
+def run_pipeline(rows: Iterable, transform: Optional[Callable], sink, batch_size: Union[int, BatchController] = 500,
+                 threaded: bool = False, queue_batches: int = 4,
+                 checkpoint=None, start: int = 0, phase: str = 'rows', position: Optional[Callable] = None,
+                 isolate: bool = True, max_logged: int = 20, verb: str = 'Inserted') -> PipelineStats:
+    """
+    Stream rows through transform (None: rows are the records) into sink in batches of batch_size.
+
+    batch_size may be a BatchController, which then times each sink.write and
+    resizes the batches that follow.
+
+    threaded parses and transforms on a producer thread, at most queue_batches
+    batches ahead of the sink (which stays on the calling thread).
+    checkpoint (a Checkpoint) records under phase, with each batch's commit, how
+    many source rows are done; rows is then expected to begin at source row
+    start + 1, unless position(row) gives each row's source row number.
+    isolate retries a failed batch by bisection (isolation.py) so only the bad
+    rows are lost. Every record that was not written ends up in stats.rejected
+    with its error: bad rows, dropped batches and rows the sink rejects in
+    finish() (CopySink's staging move).
+    verb labels the progress lines ("Updated 2000 rows...").
+    """
+    stats = PipelineStats()
+    transform = transform or _unchanged
+    if checkpoint is not None:
+        if position:
+            rows = ((position(row), row) for row in rows)
+        else:
+            rows = enumerate(rows, start=start + 1)
+        transform = _numbered(transform)
+    controller = batch_size if isinstance(batch_size, BatchController) else None
+    records = transform_rows(rows, transform, stats)
+    batches = controller.batches(records) if controller else batched(records, batch_size)
+    if threaded:
+        batches = prefetch(batches, queue_batches)
+    try:
+        for batch in batches:
+            stats.batches += 1
+            before_commit = None
+            if checkpoint is not None:
+                done = batch[-1][0]
+                batch = [record for _, record in batch]
+                before_commit = lambda cur, done=done: checkpoint.record(cur, done, phase)  # noqa: E731
+            try:
+                write_started = time.monotonic()
+                stats.written += sink.write(batch, before_commit)
+                write_seconds = time.monotonic() - write_started
+                stats.write_time += write_seconds
+                if controller:
+                    controller.record(len(batch), write_seconds)
+                print(f"  {verb} {stats.written} rows... ({stats.rows_per_sec:,.0f} rows/sec)", flush=True)
+            except Exception as e:
+                sink.rollback()
+                print(f"  ERROR on batch at row ~{stats.written}: {e}", flush=True)
+                if controller:
+                    controller.failed(e)
+                if isolate:
+                    _isolate_batch(sink, batch, before_commit, stats, max_logged)
+                else:
+                    _drop_batch(batch, e, stats)
+        bad = sink.finish()
+        if bad:
+            stats.written -= len(bad)
+            _record_rejected(bad, stats, max_logged)
+        if controller:
+            print(f"  {controller.summary()}", flush=True)
+    finally:
+        if threaded:
+            batches.close()
+        sink.close()
+    return stats
@@ -0,0 +1,57 @@
+"""
+Reader stages: turn an input file into an iterator of rows.
+"""
+
+from typing import Iterator, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .excel_cache import load_excel, read_excel_cached
+from .xlsx import iter_xlsx_rows
+
+
+def iter_excel_rows(path: str, min_row: int = 2, columns: Optional[Sequence[int]] = None) -> Iterator[tuple]:
+    """Stream raw value tuples from the first sheet (see xlsx.py); columns picks 0-based column indexes"""
+    return iter_xlsx_rows(path, min_row=min_row, columns=columns)
+
+
+def read_frame(path: str, limit: Optional[int] = None, required: Optional[str] = None,
+               strip_columns: bool = False, cache: bool = True,
+               columns: Optional[Sequence[str]] = None, dtype: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Read a workbook into a DataFrame.
+
+    required drops rows where that column is empty; limit keeps only the first N rows (TEST MODE).
+    columns reads only those columns and dtype sets their types (e.g. references as str,
+    lenders as 'category'). cache serves unchanged workbooks from the columnar cache (excel_cache.py).
+    """
+    print("\n[1] Reading Excel file...", flush=True)
+    df = (read_excel_cached if cache else load_excel)(path, columns=columns, dtype=dtype,
+                                                     strip_columns=strip_columns)
+    if required:
+        print(f"    Raw rows in Excel: {len(df)}", flush=True)
+        df = df[df[required].notna()]
+        print(f"    Rows with data: {len(df)}", flush=True)
+
+    if limit:
+        df = df.head(limit)
+        print(f"    TEST MODE: Limited to first {limit} rows", flush=True)
+
+    print(f"    Total rows to process: {len(df)}", flush=True)
+    return df
+
+
+def _column_values(col: pd.Series):
+    """Python values of a column; missing categorical entries come out as None"""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        categories = [*col.cat.categories.tolist(), None]  # code -1 (missing) → None
+        return (categories[code] for code in col.cat.codes.to_numpy())
+    return iter(col)
+
+
+def iter_frame_rows(df: pd.DataFrame) -> Iterator[Tuple[int, dict]]:
+    """Yield (index, row dict) pairs - a cheaper drop-in for df.iterrows()"""
+    columns = list(df.columns)
+    values = [_column_values(df.iloc[:, i]) for i in range(len(columns))]
+    for idx, row in zip(df.index, zip(*values)):
+        yield idx, dict(zip(columns, row))
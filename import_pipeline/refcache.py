@@ -0,0 +1,128 @@
+"""
+On-disk reference → contact id cache.
+
+A SQLite snapshot of contacts.reference per database, refreshed incrementally:
+only contacts written since the last refresh (by xmin, the inserting/updating
+transaction id) are refetched. The snapshot also keeps every contact id it has
+seen; when contacts' count no longer matches, some were deleted and the id list
+is re-read to drop them, so the ids only cross the wire after a delete.
+Importers then resolve their references locally and fetch columns only for
+matched contacts. Use it as a context manager (or call close()).
+"""
+
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, Optional, Tuple
+
+from .db import DB_CONFIG
+from .references import split_references
+
+CACHE_DIR = os.path.expanduser('~/.cache/crm_import')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS refs (reference TEXT NOT NULL, contact_id INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_refs_reference ON refs (reference);
+CREATE INDEX IF NOT EXISTS idx_refs_contact ON refs (contact_id);
+CREATE TABLE IF NOT EXISTS contact_ids (id INTEGER PRIMARY KEY);
+"""
+
+
+def default_cache_path() -> str:
+    """One cache file per host/port/database"""
+    key = f"{DB_CONFIG['host']}_{DB_CONFIG['port']}_{DB_CONFIG['database']}"
+    return os.path.join(CACHE_DIR, 'refmap_' + re.sub(r'[^A-Za-z0-9._-]', '_', key) + '.sqlite')
+
+
+class ReferenceCache:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_cache_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def refresh(self, cur) -> Tuple[int, int]:
+        """
+        Bring the snapshot up to date. Returns (contacts refetched, contacts removed).
+
+        The oldest transaction still running when we start becomes the next
+        watermark, so rows committed during this refresh are picked up next time.
+        A full reload happens on first use or when the 32-bit xid counter wrapped.
+        """
+        cur.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        snapshot_xmin = cur.fetchone()[0]
+        epoch, watermark = snapshot_xmin >> 32, snapshot_xmin & 0xFFFFFFFF
+
+        last_epoch = self._meta('xid_epoch')
+        last_watermark = self._meta('xmin_watermark')
+        full = last_watermark is None or int(last_epoch) != epoch
+
+        if full:
+            cur.execute("SELECT id, reference FROM contacts")
+            self.db.execute("DELETE FROM refs")
+            self.db.execute("DELETE FROM contact_ids")
+        else:
+            cur.execute("SELECT id, reference FROM contacts WHERE xmin::text::bigint >= %s",
+                        (int(last_watermark),))
+        changed = cur.fetchall()
+
+        if not full:
+            self.db.executemany("DELETE FROM refs WHERE contact_id = ?", ((cid,) for cid, _ in changed))
+        self.db.executemany("INSERT INTO refs (reference, contact_id) VALUES (?, ?)",
+                            ((ref, cid) for cid, reference in changed for ref in split_references(reference)))
+        self.db.executemany("INSERT OR IGNORE INTO contact_ids (id) VALUES (?)", ((cid,) for cid, _ in changed))
+
+        # Every known id is still live unless contacts has fewer rows than we know of;
+        # only then (or when contacts were added concurrently) is the id list re-read
+        cur.execute("SELECT COUNT(*) FROM contacts")
+        live = cur.fetchone()[0]
+        known = self.db.execute("SELECT COUNT(*) FROM contact_ids").fetchone()[0]
+        removed = 0
+        if live != known:
+            cur.execute("SELECT id FROM contacts")
+            self.db.execute("DELETE FROM contact_ids")
+            self.db.executemany("INSERT INTO contact_ids (id) VALUES (?)", cur.fetchall())
+            removed = self.db.execute(
+                "DELETE FROM refs WHERE contact_id NOT IN (SELECT id FROM contact_ids)").rowcount
+
+        self._set_meta('xid_epoch', epoch)
+        self._set_meta('xmin_watermark', watermark)
+        self.db.commit()
+
+        kind = "Full" if full else "Incremental"
+        print(f"    {kind} reference cache refresh: {len(changed)} contacts fetched, "
+              f"{removed} stale references dropped ({self.path})", flush=True)
+        return len(changed), removed
+
+    def lookup(self, references: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """reference → contact id, for the given references (or all of them)"""
+        if references is None:
+            rows = self.db.execute("SELECT reference, contact_id FROM refs ORDER BY contact_id")
+            return dict(rows)
+
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (reference TEXT PRIMARY KEY)")
+        self.db.execute("DELETE FROM wanted")
+        self.db.executemany("INSERT OR IGNORE INTO wanted (reference) VALUES (?)", ((r,) for r in references))
+        rows = self.db.execute("""
+            SELECT r.reference, r.contact_id FROM refs r
+            JOIN wanted w ON w.reference = r.reference
+            ORDER BY r.contact_id
+        """)
+        return dict(rows)
+
+    def close(self):
+        self.db.close()
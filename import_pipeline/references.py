@@ -0,0 +1,156 @@
+"""
+Reference → contact lookups.
+
+contacts.reference is comma-separated. Without a references list the whole
+contacts table is scanned and split here; with one, only those references are
+looked up through the contact_references index table
+(migrations/import_003_contact_references.sql, sync_contact_references.py).
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .bulk_read import iter_copy_chunks
+
+CONTACT_JSON_COLUMNS = ('previous_addresses',)
+
+
+def split_references(reference: Optional[str]) -> List[str]:
+    """Split a comma-separated contacts.reference value"""
+    if not reference:
+        return []
+    return [r.strip() for r in reference.split(',') if r.strip()]
+
+
+def _reference_rows(cur, columns: Sequence[str], references: Optional[Iterable[str]], cache
+                    ) -> Iterator[Tuple[str, tuple]]:
+    """(reference, (id, <unused>, *columns)) pairs from whichever lookup applies"""
+    if cache is not None:
+        cache.refresh(cur)
+        ref_ids = cache.lookup(references)
+        select = ', '.join(['id', 'NULL', *columns])
+        cur.execute(f"SELECT {select} FROM contacts WHERE id = ANY(%s)", (list(set(ref_ids.values())),))
+        rows = {row[0]: row for row in cur.fetchall()}
+        return ((ref, rows[cid]) for ref, cid in ref_ids.items() if cid in rows)
+
+    if references is None:
+        names = ['id', 'reference', *columns]
+        chunks = iter_copy_chunks(
+            cur, f"SELECT {', '.join(names)} FROM contacts WHERE reference IS NOT NULL AND reference != ''",
+            names, json_columns=CONTACT_JSON_COLUMNS)
+        return ((ref, (int(row[0]), *row[1:]))
+                for chunk in chunks
+                for row in chunk.itertuples(index=False, name=None)
+                for ref in split_references(row[1]))
+
+    select = ', '.join(['c.id', 'cr.reference', *(f'c.{c}' for c in columns)])
+    cur.execute(f"""
+        SELECT DISTINCT ON (cr.reference) {select}
+        FROM unnest(%s::text[]) AS wanted(reference)
+        JOIN contact_references cr ON cr.reference = wanted.reference
+        JOIN contacts c ON c.id = cr.contact_id
+        ORDER BY cr.reference, c.id DESC
+    """, (list(references),))
+    return ((row[1], row) for row in cur.fetchall())
+
+
+def load_reference_map(cur, columns: Sequence[str] = (),
+                       build: Optional[Callable[[dict], dict]] = None,
+                       references: Optional[Iterable[str]] = None,
+                       cache=None) -> Dict[str, dict]:
+    """
+    Map references to their contact.
+
+    Each value is {'id': ..., <column>: ...}; pass build to reshape it once per
+    contact (the same object is shared by all of that contact's references).
+    Pass references to fetch only those via contact_references, or a
+    ReferenceCache to resolve them from the local snapshot.
+    """
+    ref_map = {}
+    contacts = {}
+    for ref, row in _reference_rows(cur, columns, references, cache):
+        contact = contacts.get(row[0])
+        if contact is None:
+            contact = {'id': row[0], **dict(zip(columns, row[2:]))}
+            if build:
+                contact = build(contact)
+            contacts[row[0]] = contact
+        ref_map[ref] = contact
+
+    print(f"    Loaded {len(ref_map)} reference mappings from {len(contacts)} contacts", flush=True)
+    return ref_map
+
+
+class ContactRow:
+    """Read-only view of one ReferenceTable row: row['first_name']"""
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table: 'ReferenceTable', row: int):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, column: str):
+        return self.table.data[column][self.row]
+
+    def get(self, column: str, default=None):
+        values = self.table.data.get(column)
+        return values[self.row] if values is not None else default
+
+
+class ReferenceTable:
+    """
+    Contacts stored column-wise (one list per column, one entry per contact)
+    with reference → row index, instead of a dict per reference.
+
+    get(ref) returns a ContactRow view, created only for references actually looked up.
+    """
+
+    __slots__ = ('data', 'index', 'rows')
+
+    def __init__(self, columns: Sequence[str]):
+        self.data = {column: [] for column in ['id', *columns]}
+        self.index = {}  # reference -> row
+        self.rows = 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, reference: str) -> bool:
+        return reference in self.index
+
+    def get(self, reference: str) -> Optional[ContactRow]:
+        row = self.index.get(reference)
+        return ContactRow(self, row) if row is not None else None
+
+
+def load_reference_table(cur, columns: Sequence[str] = (),
+                         references: Optional[Iterable[str]] = None,
+                         cache=None) -> ReferenceTable:
+    """load_reference_map, stored as a compact ReferenceTable"""
+    table = ReferenceTable(columns)
+    names = list(table.data)
+    contact_rows = {}  # contact id -> row
+    for ref, row in _reference_rows(cur, columns, references, cache):
+        row_no = contact_rows.get(row[0])
+        if row_no is None:
+            row_no = contact_rows[row[0]] = table.rows
+            table.rows += 1
+            for name, value in zip(names, (row[0], *row[2:])):
+                table.data[name].append(value)
+        table.index[ref] = row_no
+
+    print(f"    Loaded {len(table)} reference mappings from {table.rows} contacts", flush=True)
+    return table
+
+
+def load_reference_owners(cur, references: Iterable[str]) -> Dict[str, Set[int]]:
+    """Contact ids holding each of the given references (via contact_references)"""
+    cur.execute("""
+        SELECT cr.reference, cr.contact_id
+        FROM unnest(%s::text[]) AS wanted(reference)
+        JOIN contact_references cr ON cr.reference = wanted.reference
+    """, (list(references),))
+    owners = {}
+    for reference, contact_id in cur.fetchall():
+        owners.setdefault(reference, set()).add(contact_id)
+    return owners
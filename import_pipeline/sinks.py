@@ -0,0 +1,187 @@
+"""
+Sink stages: write batches of row tuples to Postgres.
+"""
+
+import io
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+
+from .isolation import bisect_rows
+
+
+class Sink:
+    """
+    Base sink: write() a batch, finish() once after the last batch, close() always.
+    finish() returns [(record, error)] for rows it had to reject, like write_isolating.
+
+    before_commit, if given, is called with the sink's cursor inside the batch's
+    transaction (e.g. Checkpoint.record), so it commits or rolls back with it.
+    Sinks that implement _execute(rows) get write() and write_isolating() for free.
+    """
+
+    conn = None
+    cur = None
+
+    def _execute(self, rows: list):
+        raise NotImplementedError
+
+    def write(self, batch: list, before_commit: Optional[Callable] = None) -> int:
+        self._execute(batch)
+        if before_commit:
+            before_commit(self.cur)
+        self.conn.commit()
+        return len(batch)
+
+    def write_isolating(self, batch: list, before_commit: Optional[Callable] = None) -> List[Tuple[tuple, Exception]]:
+        """Retry a batch that failed (and was rolled back) by bisection; commit the good rows, return the bad"""
+        bad = bisect_rows(self.cur, self._execute, batch)
+        if before_commit:
+            before_commit(self.cur)
+        self.conn.commit()
+        return bad
+
+    def rollback(self):
+        pass
+
+    def finish(self) -> List[Tuple[tuple, Exception]]:
+        return []
+
+    def close(self):
+        pass
+
+
+class ExecuteValuesSink(Sink):
+    """Insert each batch with execute_values and commit it"""
+
+    def __init__(self, conn, sql: str, page_size: int = 500):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.sql = sql
+        self.page_size = page_size
+
+    def _execute(self, rows: list):
+        execute_values(self.cur, self.sql, rows, page_size=self.page_size)
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.cur.close()
+
+
+class StatementSink(Sink):
+    """
+    Run execute(cur, rows) for each batch and commit it.
+
+    For writes that don't fit one INSERT ... VALUES (per-row UPDATEs, staged
+    UPDATE ... FROM, RETURNING). Whatever execute returns for the rows that
+    committed (e.g. RETURNING rows) is collected in self.returned.
+    """
+
+    def __init__(self, conn, execute: Callable[[object, list], Optional[list]]):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.execute = execute
+        self.returned = []
+        self._pending = []
+
+    def _execute(self, rows: list):
+        self._pending.extend(self.execute(self.cur, rows) or ())
+
+    def write(self, batch: list, before_commit: Optional[Callable] = None) -> int:
+        self._pending = []
+        written = super().write(batch, before_commit)
+        self.returned.extend(self._pending)
+        return written
+
+    def write_isolating(self, batch: list, before_commit: Optional[Callable] = None) -> List[Tuple[tuple, Exception]]:
+        # Halves rolled back by bisect_rows raised before returning anything
+        self._pending = []
+        bad = super().write_isolating(batch, before_commit)
+        self.returned.extend(self._pending)
+        return bad
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.cur.close()
+
+
+def copy_text_value(val) -> str:
+    """Encode one value for COPY ... FROM STDIN text format"""
+    if val is None:
+        return '\\N'
+    return (str(val).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def copy_text_buffer(rows: Sequence[tuple]) -> io.StringIO:
+    """Render rows as an in-memory COPY text-format buffer"""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write('\t'.join(map(copy_text_value, row)))
+        buf.write('\n')
+    buf.seek(0)
+    return buf
+
+
+class CopySink(Sink):
+    """
+    Load each batch with COPY FROM STDIN.
+
+    With staging set, batches are copied into an UNLOGGED staging table shaped
+    like the target columns (plus a staged_row serial) and moved with a single
+    INSERT ... SELECT in finish(). If that fails, the move is bisected on
+    staged_row ranges so only the offending rows stay behind; finish() returns
+    them with their errors.
+    """
+
+    def __init__(self, conn, table: str, columns: Sequence[str], staging: Optional[str] = None):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.table = table
+        self.columns = ', '.join(columns)
+        self.staging = staging
+
+        if staging:
+            self.cur.execute(f"DROP TABLE IF EXISTS {staging}")
+            self.cur.execute(f"CREATE UNLOGGED TABLE {staging} AS SELECT {self.columns} FROM {table} WITH NO DATA")
+            self.cur.execute(f"ALTER TABLE {staging} ADD COLUMN staged_row BIGSERIAL PRIMARY KEY")
+            self.conn.commit()
+
+    def _execute(self, rows: list):
+        target = self.staging or self.table
+        self.cur.copy_expert(f"COPY {target} ({self.columns}) FROM STDIN", copy_text_buffer(rows))
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def _move(self, staged_rows: Sequence[int]):
+        self.cur.execute(f"""
+            INSERT INTO {self.table} ({self.columns})
+            SELECT {self.columns} FROM {self.staging}
+            WHERE staged_row BETWEEN %s AND %s
+        """, (staged_rows[0], staged_rows[-1]))
+
+    def finish(self) -> List[Tuple[tuple, Exception]]:
+        if not self.staging:
+            return []
+        print(f"  Moving staged rows from {self.staging} into {self.table}...", flush=True)
+        self.cur.execute(f"SELECT MIN(staged_row), MAX(staged_row), COUNT(*) FROM {self.staging}")
+        first, last, staged = self.cur.fetchone()
+        bad = []
+        if staged:
+            # One statement for the whole range unless it fails; gaps in staged_row are empty ranges
+            for staged_row, error in bisect_rows(self.cur, self._move, range(first, last + 1)):
+                self.cur.execute(f"SELECT {self.columns} FROM {self.staging} WHERE staged_row = %s", (staged_row,))
+                bad.append((self.cur.fetchone(), error))
+        print(f"  Inserted {staged - len(bad)} rows into {self.table}"
+              + (f", {len(bad)} rejected" if bad else ""), flush=True)
+        self.cur.execute(f"DROP TABLE {self.staging}")
+        self.conn.commit()
+        return bad
+
+    def close(self):
+        self.cur.close()
@@ -0,0 +1,36 @@
+"""
+Temp-table staging for set-based writes.
+
+Rows are bulk-loaded into a session TEMP table with COPY, then applied to the
+real tables with a single UPDATE ... FROM / INSERT ... SELECT statement.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterable, Sequence, Tuple
+
+from .sinks import copy_text_buffer
+
+
+@contextmanager
+def timed(label: str):
+    """Print how long the wrapped statement(s) took"""
+    started = time.monotonic()
+    yield
+    print(f"    {label}: {time.monotonic() - started:.2f}s", flush=True)
+
+
+def stage_rows(cur, table: str, columns: Sequence[Tuple[str, str]], rows: Iterable[tuple]) -> int:
+    """
+    Create TEMP table `table` with (name, type) columns and COPY rows into it.
+
+    The table is dropped at the end of the transaction. Returns the row count.
+    """
+    column_defs = ', '.join(f'{name} {type_}' for name, type_ in columns)
+    names = ', '.join(name for name, _ in columns)
+
+    cur.execute(f"DROP TABLE IF EXISTS {table}")
+    cur.execute(f"CREATE TEMP TABLE {table} ({column_defs}) ON COMMIT DROP")
+    cur.copy_expert(f"COPY {table} ({names}) FROM STDIN", copy_text_buffer(list(rows)))
+    cur.execute(f"SELECT COUNT(*) FROM {table}")
+    return cur.fetchone()[0]
@@ -0,0 +1,109 @@
+"""
+Trigger-maintained index tables: verify and repair against contacts.
+
+contact_references (import_003) and contact_addresses (import_009) are derived
+from contacts columns and kept in step by triggers. A DerivedTable says how to
+compute the table's rows from contacts; run_sync applies the table's migration,
+compares the table with what it should hold (missing and stale rows by key) and
+fixes the drift, or only reports it with --check. Each sync_*.py script is just
+its DerivedTable.
+"""
+
+import argparse
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Tuple
+
+from .db import apply_migration, connect
+from .staging import timed
+
+
+@dataclass
+class DerivedTable:
+    table: str                   # e.g. 'contact_references'
+    source: str                  # what it is derived from, for messages: 'contacts.reference'
+    migration: str               # migrations/<migration>.sql creating the table and its triggers
+    expected_sql: str            # SELECT of the rows the table should hold
+    columns: Sequence[str]       # expected_sql's output columns, in order (inserted as-is)
+    key: Sequence[str]           # columns identifying a row
+    requires: Optional[Callable] = None  # called with the cursor before the migration, e.g. require_functions
+
+
+def sync_derived_table(conn, spec: DerivedTable, check: bool = False) -> Tuple[int, int, int]:
+    """
+    Compare spec.table with its expected rows; insert missing and delete stale
+    rows unless check. Returns (expected, missing, stale); commits only changes.
+    """
+    cur = conn.cursor()
+    expected_table = f"expected_{spec.table}"
+    match = ' AND '.join(f"t.{k} = e.{k}" for k in spec.key)
+    columns = ', '.join(spec.columns)
+
+    with timed(f"Expand {spec.source}"):
+        cur.execute(f"DROP TABLE IF EXISTS {expected_table}")
+        cur.execute(f"CREATE TEMP TABLE {expected_table} ON COMMIT DROP AS {spec.expected_sql}")
+        cur.execute(f"SELECT COUNT(*) FROM {expected_table}")
+        expected = cur.fetchone()[0]
+
+    cur.execute(f"""
+        SELECT COUNT(*) FROM {expected_table} e
+        WHERE NOT EXISTS (SELECT 1 FROM {spec.table} t WHERE {match})
+    """)
+    missing = cur.fetchone()[0]
+    stale_where = f"NOT EXISTS (SELECT 1 FROM {expected_table} e WHERE {match})"
+    cur.execute(f"SELECT COUNT(*) FROM {spec.table} t WHERE {stale_where}")
+    stale = cur.fetchone()[0]
+    print(f"    Expected rows: {expected} | Missing: {missing} | Stale: {stale}", flush=True)
+
+    if check or (not missing and not stale):
+        conn.rollback()
+    else:
+        print("\n[3] Applying changes...", flush=True)
+        with timed("Insert missing"):
+            cur.execute(f"""
+                INSERT INTO {spec.table} ({columns})
+                SELECT {columns} FROM {expected_table}
+                ON CONFLICT DO NOTHING
+            """)
+        with timed("Delete stale"):
+            cur.execute(f"DELETE FROM {spec.table} t WHERE {stale_where}")
+        conn.commit()
+        print("    Done!", flush=True)
+    cur.close()
+    return expected, missing, stale
+
+
+def run_sync(spec: DerivedTable, add_args: Optional[Callable] = None, before_sync: Optional[Callable] = None):
+    """
+    Command-line entry point of a sync_*.py script: --check only reports drift.
+
+    add_args(parser) adds script options; before_sync(args, cur), if it returns
+    True, has handled the run on its own (e.g. a lookup) and nothing is synced.
+    """
+    parser = argparse.ArgumentParser(description=f"Sync {spec.table} from {spec.source}")
+    parser.add_argument('--check', action='store_true', help="Report drift without changing anything")
+    if add_args:
+        add_args(parser)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"SYNC {spec.table.replace('_', ' ').upper()}")
+    print("=" * 60)
+
+    print("\n[1] Connecting to database...", flush=True)
+    conn = connect()
+    cur = conn.cursor()
+    if spec.requires:
+        spec.requires(cur)
+    apply_migration(conn, spec.migration)
+    print("    Connected, migration applied", flush=True)
+
+    if before_sync is None or not before_sync(args, cur):
+        print(f"\n[2] Comparing with {spec.source}...", flush=True)
+        sync_derived_table(conn, spec, check=args.check)
+
+    cur.close()
+    conn.close()
+
+    print("\n" + "=" * 60)
+    print("DONE!")
+    print("=" * 60)
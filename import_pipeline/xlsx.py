@@ -0,0 +1,241 @@
+"""
+Streaming .xlsx row reader.
+
+An xlsx file is a zip of XML parts. This reads the first worksheet with
+iterparse, one <row> at a time (detaching parsed rows as it goes), so memory
+stays flat however long the sheet is. Shared strings are held as one UTF-8 blob
+plus an offset array instead of a Python str per entry; pass use_mmap=True to keep
+that blob in a temporary memory-mapped file for very large string tables.
+
+Cells are converted like openpyxl/pandas: shared/inline strings → str, numbers
+→ int when integral else float, booleans → bool, date-formatted numbers →
+datetime. Only the requested columns are materialised.
+"""
+
+import mmap
+import re
+import tempfile
+import zipfile
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Sequence
+from xml.etree.ElementTree import iterparse, parse
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Built-in number formats that display dates/times (ECMA-376 18.8.30)
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+_DATE_FORMAT_RE = re.compile(r'[dmyhs]', re.IGNORECASE)
+_QUOTED_RE = re.compile(r'"[^"]*"|\[[^\]]*\]|\\.')
+
+EPOCH_1900 = datetime(1899, 12, 30)
+EPOCH_1904 = datetime(1904, 1, 1)
+
+
+def column_index(ref: str) -> int:
+    """0-based column index of a cell reference: 'A1' → 0, 'AB7' → 27"""
+    index = 0
+    for ch in ref:
+        if ch.isdigit():
+            break
+        index = index * 26 + (ord(ch.upper()) - 64)
+    return index - 1
+
+
+class SharedStrings:
+    """The shared string table as one UTF-8 blob plus offsets"""
+
+    def __init__(self, archive: zipfile.ZipFile, use_mmap: bool = False):
+        self.offsets = array('q', [0])
+        self._file = tempfile.TemporaryFile() if use_mmap else None
+        blob = bytearray()
+        if 'xl/sharedStrings.xml' in archive.namelist():
+            with archive.open('xl/sharedStrings.xml') as f:
+                for _, elem in iterparse(f):
+                    if elem.tag != NS + 'si':
+                        continue
+                    # Plain <t> or rich text runs <r><t>; skip phonetic <rPh> runs
+                    phonetic = {id(t) for rph in elem.iter(NS + 'rPh') for t in rph.iter(NS + 't')}
+                    text = ''.join(t.text or '' for t in elem.iter(NS + 't') if id(t) not in phonetic)
+                    blob += text.encode('utf-8')
+                    self.offsets.append(len(blob))
+                    elem.clear()
+        if self._file is not None and blob:
+            self._file.write(blob)
+            self._file.flush()
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = bytes(blob)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def _first_sheet_path(archive: zipfile.ZipFile) -> str:
+    with archive.open('xl/workbook.xml') as f:
+        workbook = parse(f).getroot()
+    sheet = workbook.find(f'{NS}sheets/{NS}sheet')
+    rel_id = sheet.get(REL_NS + 'id')
+    with archive.open('xl/_rels/workbook.xml.rels') as f:
+        rels = parse(f).getroot()
+    for rel in rels.iter(PKG_REL_NS + 'Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            return target.lstrip('/') if target.startswith('/') else 'xl/' + target
+    raise ValueError(f"Worksheet relationship {rel_id} not found")
+
+
+def _is_1904(archive: zipfile.ZipFile) -> bool:
+    with archive.open('xl/workbook.xml') as f:
+        pr = parse(f).getroot().find(NS + 'workbookPr')
+    return pr is not None and pr.get('date1904') in ('1', 'true')
+
+
+def _date_styles(archive: zipfile.ZipFile) -> set:
+    """Indexes of cellXfs styles whose number format is a date/time"""
+    if 'xl/styles.xml' not in archive.namelist():
+        return set()
+    with archive.open('xl/styles.xml') as f:
+        styles = parse(f).getroot()
+    date_formats = set(BUILTIN_DATE_FORMATS)
+    for fmt in styles.iter(NS + 'numFmt'):
+        code = _QUOTED_RE.sub('', fmt.get('formatCode', ''))
+        if _DATE_FORMAT_RE.search(code):
+            date_formats.add(int(fmt.get('numFmtId')))
+    xfs = styles.find(NS + 'cellXfs')
+    if xfs is None:
+        return set()
+    return {i for i, xf in enumerate(xfs.iter(NS + 'xf')) if int(xf.get('numFmtId', 0)) in date_formats}
+
+
+def _dimension_width(archive: zipfile.ZipFile, sheet_path: str) -> Optional[int]:
+    """Column count from <dimension ref="A1:J92000">, read from the sheet header only"""
+    with archive.open(sheet_path) as f:
+        for _, elem in iterparse(f, events=('start',)):
+            if elem.tag == NS + 'dimension':
+                ref = elem.get('ref', '')
+                return column_index(ref.split(':')[-1]) + 1 if ref else None
+            if elem.tag == NS + 'sheetData':
+                return None
+    return None
+
+
+def iter_xlsx_rows(path: str, min_row: int = 1, columns: Optional[Sequence[int]] = None,
+                   use_mmap: bool = False) -> Iterator[tuple]:
+    """
+    Stream value tuples from the first worksheet.
+
+    columns selects 0-based column indexes (in that order); otherwise rows are
+    padded to the sheet's width, as openpyxl read-only mode does. Empty rows
+    between data rows are yielded as all-None tuples.
+    """
+    with zipfile.ZipFile(path) as archive:
+        sheet_path = _first_sheet_path(archive)
+        strings = SharedStrings(archive, use_mmap)
+        date_styles = _date_styles(archive)
+        epoch = EPOCH_1904 if _is_1904(archive) else EPOCH_1900
+        width = len(columns) if columns is not None else _dimension_width(archive, sheet_path)
+        wanted = {c: i for i, c in enumerate(columns)} if columns is not None else None
+
+        def convert(cell):
+            kind = cell.get('t', 'n')
+            if kind == 'inlineStr':
+                return ''.join(t.text or '' for t in cell.iter(NS + 't'))
+            v = cell.find(NS + 'v')
+            if v is None or v.text is None:
+                return None
+            if kind == 's':
+                return strings[int(v.text)]
+            if kind in ('str', 'e'):
+                return v.text
+            if kind == 'b':
+                return v.text == '1'
+            if kind == 'd':
+                return datetime.fromisoformat(v.text)
+            number = float(v.text)
+            if int(cell.get('s', 0)) in date_styles:
+                return epoch + timedelta(days=number)
+            return int(number) if number.is_integer() else number
+
+        try:
+            with archive.open(sheet_path) as f:
+                next_row = 1
+                sheet_data = None
+                for event, elem in iterparse(f, events=('start', 'end')):
+                    if event == 'start':
+                        if elem.tag == NS + 'sheetData':
+                            sheet_data = elem
+                        continue
+                    if elem.tag != NS + 'row':
+                        continue
+                    row_no = int(elem.get('r', next_row))
+                    if row_no >= min_row:
+                        values: List = [None] * (width or 0)
+                        for position, cell in enumerate(elem.iter(NS + 'c')):
+                            ref = cell.get('r')
+                            col = column_index(ref) if ref else position
+                            if wanted is not None:
+                                col = wanted.get(col)
+                                if col is None:
+                                    continue
+                            if col >= len(values):
+                                values.extend([None] * (col + 1 - len(values)))
+                            values[col] = convert(cell)
+                        for _ in range(max(next_row, min_row), row_no):
+                            yield (None,) * len(values)
+                        yield tuple(values)
+                    next_row = row_no + 1
+                    # Detach finished rows; clearing the row alone leaves it in <sheetData>
+                    if sheet_data is not None:
+                        sheet_data.clear()
+                    else:
+                        elem.clear()
+        finally:
+            strings.close()
+
+
+def read_xlsx_frame(path: str, columns: Optional[Sequence[str]] = None, dtype: Optional[dict] = None,
+                    strip_columns: bool = False) -> pd.DataFrame:
+    """
+    pd.read_excel(path) on the streaming reader: the first row is the header and
+    the cells go through the same TextParser inference pd.read_excel uses.
+
+    columns keeps only those header names (names not in the sheet are skipped);
+    dtype is passed to the parser, e.g. {'Reference': str, 'Lender': 'category'};
+    strip_columns strips whitespace from the header names first.
+    """
+    rows = iter_xlsx_rows(path)
+    header = [h.strip() if strip_columns and isinstance(h, str) else h for h in next(rows, ())]
+    if columns is not None:
+        rows.close()
+        header_index = {name: i for i, name in reversed(list(enumerate(header)))}
+        header = [c for c in columns if c in header_index]
+        rows = iter_xlsx_rows(path, min_row=2, columns=[header_index[c] for c in header])
+    if dtype:
+        dtype = {c: t for c, t in dtype.items() if c in header}
+
+    # Empty cells are '' (as read_excel's openpyxl reader has them), trailing empty rows dropped
+    data = [['' if v is None else v for v in header]]
+    last_with_data = 0
+    for row in rows:
+        data.append(['' if v is None else v for v in row])
+        if any(v != '' for v in data[-1]):
+            last_with_data = len(data)
+    del data[last_with_data or 1:]
+    if len(data) == 1 and not any(v != '' for v in data[0]):
+        return pd.DataFrame()
+    return TextParser(data, header=0, dtype=dtype or None, skip_blank_lines=False).read()
@@ -123,21 +123,54 @@ class MigrationLogger:
 
 def load_excel_references(filepath: str) -> List[str]:
     """Load reference numbers from Excel file"""
-    df = pd.read_excel(filepath)
-    references = df['reference'].astype(str).tolist()
+    df = pd.read_excel(filepath, usecols=['reference'], dtype={'reference': str})
+    references = df['reference'].dropna().str.strip().tolist()
     print(f"Loaded {len(references)} references from Excel")
     return references
 
 
-def build_reference_map(conn) -> Dict[str, Dict]:
+def build_reference_map(conn, references: Optional[List[str]] = None) -> Dict[str, Dict]:
     """
     Build mapping from reference number to contact details
 
+    With references, only those are looked up through the contact_references
+    index table instead of scanning every contact.
+
     Returns:
         Dict[reference] = {contact_id, first_name, last_name, cases: [{id, lender}]}
     """
     cur = conn.cursor()
 
+    if references is not None:
+        cur.execute("""
+            SELECT DISTINCT ON (cr.reference)
+                c.id,
+                c.first_name,
+                c.last_name,
+                cr.reference,
+                COALESCE(
+                    (SELECT json_agg(json_build_object('id', cs.id, 'lender', cs.lender))
+                     FROM cases cs WHERE cs.contact_id = c.id),
+                    '[]'
+                ) as cases
+            FROM unnest(%s::text[]) AS wanted(reference)
+            JOIN contact_references cr ON cr.reference = wanted.reference
+            JOIN contacts c ON c.id = cr.contact_id
+            ORDER BY cr.reference, c.id DESC
+        """, (references,))
+
+        ref_map = {}
+        for contact_id, first_name, last_name, reference, cases in cur.fetchall():
+            ref_map[reference] = {
+                'contact_id': contact_id,
+                'first_name': first_name or 'Unknown',
+                'last_name': last_name or 'Unknown',
+                'cases': cases if cases else []
+            }
+
+        print(f"Built reference map with {len(ref_map)} unique references")
+        return ref_map
+
     # Get all contacts with references and their cases
     cur.execute("""
         SELECT
@@ -406,6 +439,8 @@ def main():
     parser.add_argument('--limit', type=int, help='Limit number of references to process')
     parser.add_argument('--no-bedrock', action='store_true', help='Disable AI classification')
     parser.add_argument('--reference', type=str, help='Process single reference')
+    parser.add_argument('--ref-index', action='store_true',
+                        help='Look up only the needed references via contact_references')
     args = parser.parse_args()
 
     print("=" * 60)
@@ -431,10 +466,6 @@ def main():
     print("\nConnecting to database...")
     conn = get_db_connection()
 
-    # Build reference map
-    print("Building reference map...")
-    ref_map = build_reference_map(conn)
-
     # Load Excel references
     if args.reference:
         excel_refs = [args.reference]
@@ -446,6 +477,13 @@ def main():
         excel_refs = excel_refs[:args.limit]
         print(f"Limited to {args.limit} references")
 
+    # Build reference map
+    print("Building reference map...")
+    if args.ref_index:
+        ref_map = build_reference_map(conn, [str(r).strip() for r in excel_refs])
+    else:
+        ref_map = build_reference_map(conn)
+
     # Process each reference
     print(f"\nProcessing {len(excel_refs)} references...")
     total_stats = {'processed': 0, 'success': 0, 'errors': 0, 'not_found': 0}
@@ -0,0 +1,8 @@
+-- =============================================================================
+-- Importers — cases.reference_specified is unique (ON CONFLICT upserts)
+-- =============================================================================
+
+-- Fails if duplicates already exist; find them with:
+--   SELECT reference_specified, COUNT(*) FROM cases
+--   WHERE reference_specified IS NOT NULL GROUP BY 1 HAVING COUNT(*) > 1;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cases_reference_specified_unique ON cases (reference_specified);
@@ -0,0 +1,45 @@
+-- =============================================================================
+-- Importers — normalized contact_references(reference, contact_id) index
+-- =============================================================================
+
+-- contacts.reference is a comma-separated string; this table holds one row per
+-- (reference, contact) so importers can look up just the references in their
+-- input file instead of splitting every contact's reference in Python.
+CREATE TABLE IF NOT EXISTS contact_references (
+  reference VARCHAR(255) NOT NULL,
+  contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+  PRIMARY KEY (reference, contact_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_contact_references_contact ON contact_references (contact_id);
+
+-- Same rules as import_pipeline.split_references: split on ',', trim, drop empties
+CREATE OR REPLACE FUNCTION split_contact_references(reference TEXT)
+RETURNS TABLE (ref TEXT)
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT DISTINCT btrim(r) FROM unnest(string_to_array(reference, ',')) AS r WHERE btrim(r) <> ''
+$$;
+
+-- Keep the table in step with contacts.reference
+CREATE OR REPLACE FUNCTION sync_contact_references()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  DELETE FROM contact_references WHERE contact_id = NEW.id;
+  INSERT INTO contact_references (reference, contact_id)
+  SELECT ref, NEW.id FROM split_contact_references(NEW.reference);
+  RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_contacts_references_insert ON contacts;
+CREATE TRIGGER trg_contacts_references_insert
+  AFTER INSERT ON contacts
+  FOR EACH ROW WHEN (NEW.reference IS NOT NULL)
+  EXECUTE FUNCTION sync_contact_references();
+
+DROP TRIGGER IF EXISTS trg_contacts_references_update ON contacts;
+CREATE TRIGGER trg_contacts_references_update
+  AFTER UPDATE OF reference ON contacts
+  FOR EACH ROW WHEN (OLD.reference IS DISTINCT FROM NEW.reference)
+  EXECUTE FUNCTION sync_contact_references();
@@ -0,0 +1,41 @@
+-- =============================================================================
+-- Importers — canonical previous-address dedupe key
+-- =============================================================================
+
+-- Same key as address_key() in import_pipeline/addresses.py: first line and
+-- city trimmed, whitespace-collapsed and lower-cased; postcode upper-cased with
+-- all whitespace removed. '12  High St|London|sw1a 1aa' and
+-- '12 high st|LONDON|SW1A 1AA' are the same address.
+CREATE OR REPLACE FUNCTION canonical_address_key(addr JSONB)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT lower(btrim(regexp_replace(COALESCE(addr->>'address_line_1', ''), '\s+', ' ', 'g')))
+      || '|' || lower(btrim(regexp_replace(COALESCE(addr->>'city', ''), '\s+', ' ', 'g')))
+      || '|' || upper(regexp_replace(COALESCE(addr->>'postal_code', ''), '\s+', '', 'g'))
+$$;
+
+-- Server-side merge of contacts.previous_addresses, so only new addresses need
+-- to be sent: appends the addresses in `additions` whose canonical key is not
+-- already in `existing` (or earlier in `additions`). A non-array `existing` is
+-- treated as empty; order is preserved.
+CREATE OR REPLACE FUNCTION merge_previous_addresses(existing JSONB, additions JSONB)
+RETURNS JSONB
+LANGUAGE sql IMMUTABLE AS $$
+  WITH base AS (
+    SELECT CASE WHEN jsonb_typeof(existing) = 'array' THEN existing ELSE '[]'::jsonb END AS arr
+  ),
+  candidates AS (
+    SELECT DISTINCT ON (canonical_address_key(n.addr)) n.addr, n.ord
+    FROM jsonb_array_elements(
+           CASE WHEN jsonb_typeof(additions) = 'array' THEN additions ELSE '[]'::jsonb END
+         ) WITH ORDINALITY AS n(addr, ord)
+    WHERE NOT EXISTS (
+      SELECT 1
+      FROM base, jsonb_array_elements(base.arr) AS e(addr)
+      WHERE canonical_address_key(e.addr) = canonical_address_key(n.addr)
+    )
+    ORDER BY canonical_address_key(n.addr), n.ord
+  )
+  SELECT base.arr || COALESCE((SELECT jsonb_agg(addr ORDER BY ord) FROM candidates), '[]'::jsonb)
+  FROM base
+$$;
@@ -0,0 +1,15 @@
+-- =============================================================================
+-- Importers — resumable runs (--resume)
+-- =============================================================================
+
+-- How far each phase of an import got, per input file (sha256 of its bytes).
+-- Written in the same transaction as the batch it describes, so `done` is
+-- always exactly the committed work: source rows 1..done are finished.
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+  job          TEXT NOT NULL,
+  source_hash  TEXT NOT NULL,
+  phase        TEXT NOT NULL,
+  done         INTEGER NOT NULL,
+  updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (job, source_hash, phase)
+);
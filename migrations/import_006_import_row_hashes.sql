@@ -0,0 +1,14 @@
+-- =============================================================================
+-- Importers — row-hash ledger for incremental re-imports
+-- =============================================================================
+
+-- One row per (importer, business key, e.g. a Reference or Lead ID): a hash of
+-- the spreadsheet values that importer last applied for that key. A re-import
+-- of an updated sheet skips keys whose hash is unchanged.
+CREATE TABLE IF NOT EXISTS import_row_hashes (
+  source       TEXT NOT NULL,
+  business_key TEXT NOT NULL,
+  row_hash     TEXT NOT NULL,
+  imported_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (source, business_key)
+);
@@ -0,0 +1,59 @@
+-- =============================================================================
+-- Importers — unique lead dedupe key + server-side lender merging
+-- =============================================================================
+
+-- copy_contacts_to_leads.py treats leads with the same first name, last name and
+-- email (case-insensitive) and date of birth as one person. A missing dob is its
+-- own value ('-infinity'), as '' is in dedupe_key(). ON CONFLICT clauses must
+-- repeat these four expressions exactly.
+--
+-- Fails if duplicates already exist; find them with:
+--   SELECT LOWER(COALESCE(first_name, '')), LOWER(COALESCE(last_name, '')),
+--          LOWER(COALESCE(email, '')), dob, COUNT(*)
+--   FROM leads GROUP BY 1, 2, 3, 4 HAVING COUNT(*) > 1;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_dedupe_key ON leads (
+  LOWER(COALESCE(first_name, '')),
+  LOWER(COALESCE(last_name, '')),
+  LOWER(COALESCE(email, '')),
+  COALESCE(dob, '-infinity'::date)
+);
+
+-- Same result as merge_lenders()/merge_extra_lenders() in copy_contacts_to_leads.py,
+-- for any number of additions: both lists are split on `sep`, trimmed, empties
+-- dropped, de-duplicated and re-joined sorted (byte order, like Python's sorted()).
+CREATE OR REPLACE FUNCTION merge_lender_list(existing TEXT, additions TEXT, sep TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT COALESCE(string_agg(lender, sep ORDER BY lender COLLATE "C"), '')
+  FROM (
+    SELECT DISTINCT btrim(l) AS lender
+    FROM unnest(string_to_array(COALESCE(existing, ''), sep)
+                || string_to_array(COALESCE(additions, ''), sep)) AS l
+    WHERE btrim(l) <> ''
+  ) AS merged
+$$;
+
+-- contacts address columns / previous_addresses → the leads address format
+-- (lead_addresses() in copy_contacts_to_leads.py)
+CREATE OR REPLACE FUNCTION lead_address(line_1 TEXT, city TEXT, county TEXT, postal_code TEXT)
+RETURNS JSONB
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT CASE WHEN COALESCE(line_1, '') <> '' THEN
+    jsonb_build_object('street', line_1, 'city', COALESCE(city, ''),
+                       'province', COALESCE(county, ''), 'postalCode', COALESCE(postal_code, ''))
+  END
+$$;
+
+CREATE OR REPLACE FUNCTION lead_previous_addresses(previous JSONB)
+RETURNS JSONB
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT COALESCE(jsonb_agg(jsonb_build_object(
+           'street', COALESCE(p.addr->>'address_line_1', ''),
+           'city', COALESCE(p.addr->>'city', ''),
+           'province', COALESCE(p.addr->>'county', ''),
+           'postalCode', COALESCE(p.addr->>'postal_code', '')
+         ) ORDER BY p.ord), '[]'::jsonb)
+  FROM jsonb_array_elements(
+         CASE WHEN jsonb_typeof(previous) = 'array' THEN previous ELSE '[]'::jsonb END
+       ) WITH ORDINALITY AS p(addr, ord)
+$$;
@@ -0,0 +1,54 @@
+-- =============================================================================
+-- Importers — lender lists as text[] (GIN-indexed) + array-union merging
+-- =============================================================================
+
+-- leads.lender (comma-separated), leads.extra_lender and contacts.extra_lenders
+-- (newline-separated) stay the columns the app reads and writes. Each gets a
+-- generated text[] twin holding the same list split, trimmed, de-duplicated
+-- and sorted, so lender membership is an index lookup:
+--   SELECT id FROM leads WHERE lender_list @> ARRAY['Vanquis'];
+-- instead of a LIKE scan over the delimited string.
+--
+-- Adding a STORED generated column rewrites the table: run outside busy hours.
+
+-- Delimited list → sorted distinct array (byte order, like Python's sorted())
+CREATE OR REPLACE FUNCTION lender_array(list TEXT, sep TEXT)
+RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT COALESCE(array_agg(lender ORDER BY lender COLLATE "C"), '{}')
+  FROM (
+    SELECT DISTINCT btrim(l) AS lender
+    FROM unnest(string_to_array(COALESCE(list, ''), sep)) AS l
+    WHERE btrim(l) <> ''
+  ) AS split
+$$;
+
+-- Set union of two lender arrays, in the same normal form
+CREATE OR REPLACE FUNCTION lender_union(a TEXT[], b TEXT[])
+RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT COALESCE(array_agg(lender ORDER BY lender COLLATE "C"), '{}')
+  FROM (
+    SELECT DISTINCT btrim(l) AS lender
+    FROM unnest(COALESCE(a, '{}') || COALESCE(b, '{}')) AS l
+    WHERE btrim(l) <> ''
+  ) AS merged
+$$;
+
+-- Replaces the string version from import_007 with the array union (same result)
+CREATE OR REPLACE FUNCTION merge_lender_list(existing TEXT, additions TEXT, sep TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT array_to_string(lender_union(lender_array(existing, sep), lender_array(additions, sep)), sep)
+$$;
+
+ALTER TABLE leads
+  ADD COLUMN IF NOT EXISTS lender_list TEXT[] GENERATED ALWAYS AS (lender_array(lender, ',')) STORED;
+ALTER TABLE leads
+  ADD COLUMN IF NOT EXISTS extra_lender_list TEXT[] GENERATED ALWAYS AS (lender_array(extra_lender, E'\n')) STORED;
+ALTER TABLE contacts
+  ADD COLUMN IF NOT EXISTS extra_lender_list TEXT[] GENERATED ALWAYS AS (lender_array(extra_lenders, E'\n')) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_leads_lender_list ON leads USING GIN (lender_list);
+CREATE INDEX IF NOT EXISTS idx_leads_extra_lender_list ON leads USING GIN (extra_lender_list);
+CREATE INDEX IF NOT EXISTS idx_contacts_extra_lender_list ON contacts USING GIN (extra_lender_list);
@@ -0,0 +1,82 @@
+-- =============================================================================
+-- Importers — normalized contact_addresses(contact_id, address_key) table
+-- =============================================================================
+
+-- contacts.previous_addresses is a JSONB array; this table holds one row per
+-- distinct previous address of a contact, keyed by canonical_address_key()
+-- (import_004, which must be applied first), so duplicates are rejected by the
+-- primary key (ON CONFLICT DO NOTHING) and postcode lookups use an index:
+--   SELECT contact_id FROM contact_addresses WHERE postcode_key = 'SW1A1AA';
+-- (contacts_at_postcode() below normalizes the postcode for you).
+-- Not to be confused with the app's own previous_addresses table (init_db.js).
+CREATE TABLE IF NOT EXISTS contact_addresses (
+  contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+  address_key TEXT NOT NULL,
+  address_line_1 TEXT,
+  city TEXT,
+  county TEXT,
+  postal_code TEXT,
+  postcode_key TEXT NOT NULL,
+  ordinal INTEGER NOT NULL,  -- 1-based position in previous_addresses
+  PRIMARY KEY (contact_id, address_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_contact_addresses_postcode ON contact_addresses (postcode_key);
+
+-- One row per distinct address in a previous_addresses document, first
+-- occurrence wins; non-objects and all-empty entries are skipped
+CREATE OR REPLACE FUNCTION contact_address_rows(owner_id INTEGER, addresses JSONB)
+RETURNS TABLE (contact_id INTEGER, address_key TEXT, address_line_1 TEXT, city TEXT, county TEXT,
+               postal_code TEXT, postcode_key TEXT, ordinal INTEGER)
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT DISTINCT ON (canonical_address_key(a.addr))
+         $1, canonical_address_key(a.addr),
+         a.addr->>'address_line_1', a.addr->>'city', a.addr->>'county', a.addr->>'postal_code',
+         upper(regexp_replace(COALESCE(a.addr->>'postal_code', ''), '\s+', '', 'g')),
+         a.ord::integer
+  FROM jsonb_array_elements(
+         CASE WHEN jsonb_typeof($2) = 'array' THEN $2 ELSE '[]'::jsonb END
+       ) WITH ORDINALITY AS a(addr, ord)
+  WHERE jsonb_typeof(a.addr) = 'object' AND canonical_address_key(a.addr) <> '||'
+  ORDER BY canonical_address_key(a.addr), a.ord
+$$;
+
+-- Contacts that have lived at a postcode (any spacing/case)
+CREATE OR REPLACE FUNCTION contacts_at_postcode(postcode TEXT)
+RETURNS TABLE (contact_id INTEGER, address_line_1 TEXT, city TEXT, postal_code TEXT)
+LANGUAGE sql STABLE AS $$
+  SELECT ca.contact_id, ca.address_line_1, ca.city, ca.postal_code
+  FROM contact_addresses ca
+  WHERE ca.postcode_key = upper(regexp_replace(COALESCE($1, ''), '\s+', '', 'g'))
+  ORDER BY ca.contact_id, ca.ordinal
+$$;
+
+-- Keep the table in step with contacts.previous_addresses: drop addresses no
+-- longer in the document, add new ones (existing keys are left as they are)
+CREATE OR REPLACE FUNCTION sync_contact_addresses()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  DELETE FROM contact_addresses ca
+  WHERE ca.contact_id = NEW.id
+    AND NOT EXISTS (SELECT 1 FROM contact_address_rows(NEW.id, NEW.previous_addresses) r
+                    WHERE r.address_key = ca.address_key);
+  INSERT INTO contact_addresses (contact_id, address_key, address_line_1, city, county,
+                                 postal_code, postcode_key, ordinal)
+  SELECT * FROM contact_address_rows(NEW.id, NEW.previous_addresses)
+  ON CONFLICT (contact_id, address_key) DO NOTHING;
+  RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_contacts_addresses_insert ON contacts;
+CREATE TRIGGER trg_contacts_addresses_insert
+  AFTER INSERT ON contacts
+  FOR EACH ROW WHEN (NEW.previous_addresses IS NOT NULL)
+  EXECUTE FUNCTION sync_contact_addresses();
+
+DROP TRIGGER IF EXISTS trg_contacts_addresses_update ON contacts;
+CREATE TRIGGER trg_contacts_addresses_update
+  AFTER UPDATE OF previous_addresses ON contacts
+  FOR EACH ROW WHEN (OLD.previous_addresses IS DISTINCT FROM NEW.previous_addresses)
+  EXECUTE FUNCTION sync_contact_addresses();
@@ -0,0 +1,17 @@
+-- =============================================================================
+-- Importers — contacts.email_normalized (indexed) for server-side email joins
+-- =============================================================================
+
+-- The importers match spreadsheet emails to contacts case- and
+-- whitespace-insensitively. Joining on LOWER(c.email) can't use an index, so
+-- every lookup was a sequential scan (or a full contacts download hashed in
+-- Python). email_normalized is the same key stored and indexed:
+--   SELECT id FROM contacts WHERE email_normalized = 'jane@example.com';
+-- Blank emails are NULL, so they never match.
+--
+-- Adding a STORED generated column rewrites the table: run outside busy hours.
+ALTER TABLE contacts
+  ADD COLUMN IF NOT EXISTS email_normalized TEXT
+  GENERATED ALWAYS AS (NULLIF(LOWER(BTRIM(email, E' \t\r\n')), '')) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_contacts_email_normalized ON contacts (email_normalized);
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Backfill / re-sync the contact_addresses table from contacts.previous_addresses.
+
+The triggers in migrations/import_009_contact_addresses.sql keep the table in
+step for new writes; run this once after applying the migration, and any time
+you want to check for drift. migrations/import_004_canonical_address_key.sql
+must already be applied.
+
+Usage:
+    python sync_contact_addresses.py                       # apply import_009, fix any drift
+    python sync_contact_addresses.py --check               # report drift only
+    python sync_contact_addresses.py --postcode "SW1A 1AA" # who has lived at a postcode
+"""
+
+from functools import partial
+
+from import_pipeline import DerivedTable, require_functions, run_sync
+
+CONTACT_ADDRESSES = DerivedTable(
+    table='contact_addresses',
+    source='contacts.previous_addresses',
+    migration='import_009_contact_addresses',
+    expected_sql="""
+        SELECT r.*
+        FROM contacts c
+        CROSS JOIN LATERAL contact_address_rows(c.id, c.previous_addresses) r
+        WHERE c.previous_addresses IS NOT NULL
+    """,
+    columns=['contact_id', 'address_key', 'address_line_1', 'city', 'county', 'postal_code', 'postcode_key',
+             'ordinal'],
+    key=['contact_id', 'address_key'],
+    requires=partial(require_functions, functions=['canonical_address_key', 'merge_previous_addresses'],
+                     migration='import_004_canonical_address_key'),
+)
+
+
+def add_args(parser):
+    parser.add_argument('--postcode', help="Only list the contacts that have lived at this postcode")
+
+
+def show_postcode(args, cur) -> bool:
+    """With --postcode, print the contacts with a previous address there (uses the postcode index)"""
+    if not args.postcode:
+        return False
+    cur.execute("SELECT * FROM contacts_at_postcode(%s)", [args.postcode])
+    rows = cur.fetchall()
+    print(f"\n{len(rows)} previous address(es) at {args.postcode}:", flush=True)
+    for contact_id, line_1, city, postal_code in rows:
+        print(f"    Contact {contact_id}: {line_1 or ''}, {city or ''}, {postal_code or ''}", flush=True)
+    return True
+
+
+if __name__ == '__main__':
+    run_sync(CONTACT_ADDRESSES, add_args=add_args, before_sync=show_postcode)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Backfill / re-sync the contact_references index table from contacts.reference.
+
+The triggers in migrations/import_003_contact_references.sql keep the table in
+step for new writes; run this once after applying the migration, and any time
+you want to check for drift.
+
+Usage:
+    python sync_contact_references.py           # apply migration, fix any drift
+    python sync_contact_references.py --check   # report drift only
+"""
+
+from import_pipeline import DerivedTable, run_sync
+
+CONTACT_REFERENCES = DerivedTable(
+    table='contact_references',
+    source='contacts.reference',
+    migration='import_003_contact_references',
+    expected_sql="""
+        SELECT r.ref AS reference, c.id AS contact_id
+        FROM contacts c
+        CROSS JOIN LATERAL split_contact_references(c.reference) r
+        WHERE c.reference IS NOT NULL AND c.reference != ''
+    """,
+    columns=['reference', 'contact_id'],
+    key=['reference', 'contact_id'],
+)
+
+
+if __name__ == '__main__':
+    run_sync(CONTACT_REFERENCES)
@@ -0,0 +1,81 @@
+"""
+In-memory stand-ins for a psycopg2 connection, enough for the savepoint and
+commit handling in isolation.py, sinks.py and pipeline.py.
+"""
+
+from import_pipeline.sinks import Sink
+
+
+class FakeCursor:
+    """Keeps the rows written in the open transaction; SAVEPOINT / ROLLBACK TO / RELEASE act on them"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.savepoints = []
+
+    def execute(self, sql, params=None):
+        command, name = sql.rsplit(' ', 1)
+        if command == 'SAVEPOINT':
+            self.savepoints.append((name, len(self.conn.pending)))
+        elif command == 'ROLLBACK TO SAVEPOINT':
+            while self.savepoints[-1][0] != name:
+                self.savepoints.pop()
+            del self.conn.pending[self.savepoints[-1][1]:]
+        elif command == 'RELEASE SAVEPOINT':
+            while self.savepoints.pop()[0] != name:
+                pass
+        else:
+            raise ValueError(f"unexpected statement: {sql}")
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.pending = []
+        self.committed = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed.extend(self.pending)
+        self.pending = []
+        self.commits += 1
+
+    def rollback(self):
+        self.pending = []
+
+
+def write_rows(conn, rows, bad=()):
+    """Write rows one at a time like a multi-row statement that fails on the first bad one"""
+    for row in rows:
+        if row in bad:
+            raise ValueError(f"bad row {row}")
+        conn.pending.append(row)
+
+
+class ListSink(Sink):
+    """Sink writing into a FakeConnection; rows in bad fail their statement"""
+
+    def __init__(self, bad=()):
+        self.conn = FakeConnection()
+        self.cur = self.conn.cursor()
+        self.bad = set(bad)
+        self.batches = []
+
+    def _execute(self, rows):
+        self.batches.append(list(rows))
+        write_rows(self.conn, rows, self.bad)
+
+    def rollback(self):
+        self.conn.rollback()
+
+
+class FakeCheckpoint:
+    """Checkpoint.record(cur, done, phase) writes a marker row into the batch's transaction"""
+
+    def record(self, cur, done, phase='rows'):
+        cur.conn.pending.append(('checkpoint', phase, done))
@@ -0,0 +1,81 @@
+import pytest
+
+from import_pipeline.batching import INITIAL_SIZE, MAXIMUM_SIZE, MINIMUM_SIZE, BatchController
+
+
+class LockTimeout(Exception):
+    pgcode = '55P03'
+
+
+class UniqueViolation(Exception):
+    pgcode = '23505'
+
+
+def test_defaults():
+    batches = BatchController('rows')
+    assert (batches.size, batches.minimum, batches.maximum) == (INITIAL_SIZE, MINIMUM_SIZE, MAXIMUM_SIZE)
+
+
+def test_batches_follow_current_size():
+    batches = BatchController('rows', initial=3, minimum=1, maximum=10)
+    sizes = []
+    for batch in batches.batches(range(10)):
+        sizes.append(len(batch))
+        batches.size = 2
+    assert sizes == [3, 2, 2, 2, 1]
+
+
+def test_grows_on_fast_full_batches_up_to_maximum():
+    batches = BatchController('rows', initial=100, minimum=10, maximum=150, step=40)
+    batches.record(100, 0.1)
+    assert batches.size == 140
+    batches.record(140, 0.14)
+    assert batches.size == 150
+
+
+def test_short_batch_does_not_grow():
+    batches = BatchController('rows', initial=100, minimum=10, maximum=1000)
+    batches.record(30, 0.01)
+    assert batches.size == 100
+
+
+def test_backs_off_on_slow_batch_and_rising_statement_time():
+    batches = BatchController('rows', initial=100, minimum=10, maximum=1000, target=2.0)
+    batches.record(100, 3.0)
+    assert batches.size == 50
+    batches = BatchController('rows', initial=100, minimum=10, maximum=1000, step=10)
+    batches.record(100, 0.1)  # 1ms/row
+    batches.record(110, 0.5)  # ~4.5ms/row
+    assert batches.size == 55
+    assert batches.backoffs == 1
+
+
+def test_failed_backs_off_only_for_lock_and_timeout_errors():
+    batches = BatchController('rows', initial=100, minimum=30, maximum=1000)
+    batches.failed(UniqueViolation())
+    assert batches.size == 100
+    batches.failed(LockTimeout())
+    assert batches.size == 50
+    batches.failed(LockTimeout())
+    assert batches.size == 30
+
+
+def test_measure_records_success_and_reraises_failures():
+    batches = BatchController('rows', initial=100, minimum=10, maximum=1000)
+    with batches.measure(100):
+        pass
+    assert (batches.batches_run, batches.rows) == (1, 100)
+    with pytest.raises(LockTimeout):
+        with batches.measure(batches.size):
+            raise LockTimeout()
+    assert batches.batches_run == 1
+    assert batches.backoffs == 1
+
+
+def test_pinned_size_never_changes():
+    batches = BatchController('rows', initial=200, minimum=200, maximum=200)
+    batches.record(200, 10.0)
+    batches.failed(LockTimeout())
+    batches.record(200, 0.01)
+    assert batches.fixed
+    assert batches.size == 200
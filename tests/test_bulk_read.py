@@ -0,0 +1,21 @@
+from import_pipeline.bulk_read import _parse_chunk
+
+
+def test_parse_chunk_unescapes_copy_text():
+    text = 'a\\tb\tline\\none\n\\\\N\tback\\\\slash\n'
+    df = _parse_chunk(text, ['x', 'y'], ())
+    assert df['x'].tolist() == ['a\tb', '\\N']
+    assert df['y'].tolist() == ['line\none', 'back\\slash']
+
+
+def test_parse_chunk_null_and_empty():
+    df = _parse_chunk('\\N\t\n1\t2\n', ['x', 'y'], ())
+    assert df['x'].tolist() == [None, '1']
+    assert df['y'].tolist() == ['', '2']
+
+
+def test_parse_chunk_decodes_json_columns():
+    text = '1\t[{"city": "Leeds", "note": "a\\\\tb"}]\n2\t\\N\n'
+    df = _parse_chunk(text, ['id', 'addresses'], ['addresses'])
+    assert df['id'].tolist() == ['1', '2']
+    assert df['addresses'].tolist() == [[{'city': 'Leeds', 'note': 'a\tb'}], None]
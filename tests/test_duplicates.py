@@ -0,0 +1,27 @@
+import pytest
+
+from import_pipeline import duplicates
+from import_pipeline.duplicates import jaro_winkler, soundex
+
+
+@pytest.mark.parametrize('name, code', [
+    ('Robert', 'R163'), ('Rupert', 'R163'), ('Rubin', 'R150'), ('Ashcraft', 'A261'),
+    ('Tymczak', 'T522'), ('Pfister', 'P236'), ('Honeyman', 'H555'), ("O'Brien", 'O165'),
+    ('Lee', 'L000'), ('', ''), (None, ''), ('123', ''),
+])
+def test_soundex(name, code):
+    assert soundex(name) == code
+
+
+@pytest.mark.parametrize('a, b, expected', [
+    ('martha', 'marhta', 0.9611),
+    ('dwayne', 'duane', 0.84),
+    ('dixon', 'dicksonx', 0.8133),
+    ('same', 'same', 1.0),
+    ('abc', 'xyz', 0.0),
+    ('', 'abc', 0.0),
+])
+def test_jaro_winkler(a, b, expected):
+    assert duplicates._jaro_winkler(a, b) == pytest.approx(expected, abs=1e-4)
+    assert duplicates._jaro_winkler(b, a) == pytest.approx(expected, abs=1e-4)
+    assert jaro_winkler(a, b) == pytest.approx(expected, abs=1e-4)
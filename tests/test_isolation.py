@@ -0,0 +1,35 @@
+from import_pipeline.isolation import bisect_rows
+
+from .fakes import FakeConnection, write_rows
+
+
+def test_bisect_rows_keeps_good_rows_and_returns_bad_ones():
+    conn = FakeConnection()
+    cur = conn.cursor()
+    rows = list(range(10))
+    bad = bisect_rows(cur, lambda part: write_rows(conn, part, bad={3, 7}), rows)
+
+    assert [(row, str(error)) for row, error in bad] == [(3, 'bad row 3'), (7, 'bad row 7')]
+    assert conn.pending == [0, 1, 2, 4, 5, 6, 8, 9]
+    assert cur.savepoints == []
+
+
+def test_bisect_rows_clean_batch_is_one_statement():
+    conn = FakeConnection()
+    calls = []
+
+    def execute(part):
+        calls.append(list(part))
+        write_rows(conn, part)
+
+    assert bisect_rows(conn.cursor(), execute, [1, 2, 3]) == []
+    assert calls == [[1, 2, 3]]
+    assert conn.pending == [1, 2, 3]
+
+
+def test_bisect_rows_every_row_bad():
+    conn = FakeConnection()
+    bad = bisect_rows(conn.cursor(), lambda part: write_rows(conn, part, bad={1, 2}), [1, 2])
+    assert [row for row, _ in bad] == [1, 2]
+    assert conn.pending == []
+    assert bisect_rows(conn.cursor(), lambda part: write_rows(conn, part), []) == []
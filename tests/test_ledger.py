@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from import_pipeline.ledger import key_hashes
+
+COLUMNS = ['Reference', 'Lender', 'Amount']
+
+
+def frame():
+    return pd.DataFrame({
+        'Reference': ['1', '2', '2', None],
+        'Lender': ['Acme', 'Beta', 'Acme', 'Gamma'],
+        'Amount': [10, None, 3, 4],
+    })
+
+
+def test_row_order_and_dtype_do_not_change_hashes():
+    df = frame()
+    hashes = key_hashes(df, 'Reference', COLUMNS)
+    assert set(hashes) == {'1', '2'}
+
+    reordered = df.iloc[::-1].reset_index(drop=True)
+    reordered['Lender'] = reordered['Lender'].astype('category')
+    assert key_hashes(reordered, 'Reference', COLUMNS) == hashes
+
+
+def test_a_changed_row_changes_only_its_key():
+    hashes = key_hashes(frame(), 'Reference', COLUMNS)
+    changed = frame()
+    changed.loc[2, 'Amount'] = 5
+    new = key_hashes(changed, 'Reference', COLUMNS)
+    assert new['1'] == hashes['1']
+    assert new['2'] != hashes['2']
+
+
+def test_missing_columns_are_ignored():
+    assert key_hashes(frame(), 'Reference', COLUMNS + ['Not There']) == key_hashes(frame(), 'Reference', COLUMNS)
+
+
+def test_hashes_are_stable_across_processes():
+    """Stored hashes are compared on the next run, so they must not depend on PYTHONHASHSEED"""
+    script = (
+        "import pandas as pd; from import_pipeline.ledger import key_hashes; "
+        "df = pd.DataFrame({'Reference': ['1', '2'], 'Lender': ['Acme', 'Beta']}); "
+        "print(sorted(key_hashes(df, 'Reference', ['Reference', 'Lender']).items()))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = {
+        subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True, check=True,
+                       env={**os.environ, 'PYTHONHASHSEED': seed}).stdout
+        for seed in ('1', '2')
+    }
+    assert len(outputs) == 1
@@ -0,0 +1,80 @@
+import pytest
+
+from import_pipeline.batching import BatchController
+from import_pipeline.pipeline import run_pipeline
+from import_pipeline.sinks import StatementSink
+
+from .fakes import FakeCheckpoint, FakeConnection, ListSink, write_rows
+
+
+def double(row):
+    if row == 'skip':
+        raise ValueError('not a number')
+    return row * 2
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_checkpoint_commits_with_each_batch(threaded):
+    sink = ListSink()
+    stats = run_pipeline(range(1, 8), double, sink, batch_size=3, threaded=threaded,
+                         checkpoint=FakeCheckpoint(), start=10)
+
+    assert (stats.read, stats.written, stats.batches, stats.errors) == (7, 7, 3, 0)
+    assert sink.conn.committed == [
+        2, 4, 6, ('checkpoint', 'rows', 13),
+        8, 10, 12, ('checkpoint', 'rows', 16),
+        14, ('checkpoint', 'rows', 17),
+    ]
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_bad_rows_are_isolated_and_checkpointed(threaded):
+    sink = ListSink(bad={6})
+    stats = run_pipeline([1, 'skip', 2, 3, 4], double, sink, batch_size=2, threaded=threaded,
+                         checkpoint=FakeCheckpoint())
+
+    assert (stats.read, stats.written, stats.errors) == (5, 3, 2)
+    assert stats.rejected == [(6, 'bad row 6')]
+    # The skipped source row still counts towards the checkpointed position
+    assert sink.conn.committed == [2, 4, ('checkpoint', 'rows', 3), 8, ('checkpoint', 'rows', 5)]
+
+
+def test_without_isolation_a_failed_batch_is_rejected_whole():
+    sink = ListSink(bad={4})
+    stats = run_pipeline([1, 2, 3], double, sink, batch_size=2, isolate=False)
+    assert stats.written == 1
+    assert stats.rejected == [(2, 'bad row 4'), (4, 'bad row 4')]
+    assert sink.conn.committed == [6]
+
+
+def test_position_and_phase():
+    sink = ListSink()
+    rows = [{'row': 4, 'v': 1}, {'row': 9, 'v': 2}, {'row': 12, 'v': 3}]
+    run_pipeline(rows, None, sink, batch_size=2, checkpoint=FakeCheckpoint(), phase='contacts',
+                 position=lambda r: r['row'])
+    assert [item for item in sink.conn.committed if isinstance(item, tuple)] == [
+        ('checkpoint', 'contacts', 9), ('checkpoint', 'contacts', 12),
+    ]
+
+
+def test_batch_controller_sizes_batches():
+    sink = ListSink()
+    controller = BatchController('rows', initial=2, minimum=2, maximum=4, step=1)
+    stats = run_pipeline(range(10), None, sink, batch_size=controller)
+    assert [len(b) for b in sink.batches] == [2, 3, 4, 1]
+    assert stats.written == 10
+    assert controller.batches_run == 4
+
+
+def test_statement_sink_collects_returned_rows_of_committed_batches():
+    conn = FakeConnection()
+
+    def execute(cur, rows):
+        write_rows(conn, rows, bad={5})
+        return [row * 10 for row in rows]
+
+    sink = StatementSink(conn, execute)
+    stats = run_pipeline(range(8), None, sink, batch_size=4, verb='Updated')
+    assert stats.rejected == [(5, 'bad row 5')]
+    assert sink.returned == [0, 10, 20, 30, 40, 60, 70]
+    assert conn.committed == [0, 1, 2, 3, 4, 6, 7]
@@ -0,0 +1,35 @@
+import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from import_pipeline.xlsx import read_xlsx_frame
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'contacts.xlsx'
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append([' Reference', 'Lender', 'Amount', 'Signed', 'Notes'])
+    ws.append(['00123', 'Acme', 10, datetime.datetime(2024, 1, 31), 'first'])
+    ws.append([456, 'Beta', 2.5, None, None])
+    ws.append([None, 'Acme', None, datetime.datetime(2023, 12, 1), 'shared "strings"'])
+    ws.append([None, None, None, None, None])
+    wb.save(path)
+    return str(path)
+
+
+def test_matches_read_excel(workbook):
+    pd.testing.assert_frame_equal(read_xlsx_frame(workbook), pd.read_excel(workbook))
+
+
+def test_matches_read_excel_with_columns_and_dtype(workbook):
+    dtype = {'Lender': 'category', 'Amount': float}
+    expected = pd.read_excel(workbook, dtype=dtype)
+    expected.columns = expected.columns.str.strip()
+    expected = expected[['Lender', 'Amount', 'Reference']]
+    frame = read_xlsx_frame(workbook, columns=['Lender', 'Amount', 'Missing', 'Reference'], dtype=dtype,
+                            strip_columns=True)
+    pd.testing.assert_frame_equal(frame, expected)
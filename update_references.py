@@ -9,6 +9,8 @@ import csv
 import os
 from dotenv import load_dotenv
 
+from import_pipeline import require_columns
+
 # Load environment variables
 load_dotenv()
 
@@ -35,6 +37,7 @@ try:
         sslmode='require'
     )
     cursor = conn.cursor()
+    require_columns(cursor, 'contacts', ['email_normalized'], 'import_010_email_normalized')
     print("✅ Successfully connected to the database!")
 except Exception as e:
     print(f"❌ Error connecting to database: {e}")
@@ -97,12 +100,13 @@ cursor.execute("""
     CREATE TEMP TABLE ref_updates (ref VARCHAR(255), email VARCHAR(255))
 """)
 execute_values(cursor, "INSERT INTO ref_updates (ref, email) VALUES %s", values)
+cursor.execute("ANALYZE ref_updates")
 
 cursor.execute("""
     UPDATE contacts c
     SET reference = r.ref
     FROM ref_updates r
-    WHERE LOWER(c.email) = r.email
+    WHERE c.email_normalized = r.email
 """)
 updated_count = cursor.rowcount
 conn.commit()
@@ -110,7 +114,7 @@ conn.commit()
 # Find not-found emails
 cursor.execute("""
     SELECT r.email FROM ref_updates r
-    LEFT JOIN contacts c ON LOWER(c.email) = r.email
+    LEFT JOIN contacts c ON c.email_normalized = r.email
     WHERE c.id IS NULL
 """)
 not_found_emails = [row[0] for row in cursor.fetchall()]